@@ -0,0 +1,123 @@
+from datetime import date, datetime, time, timedelta
+
+from sqlalchemy import func
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+
+from .config import ANALYTICS_CLOSE_LAG_DAYS
+from .ml import probabilities
+from .ml.labels import DISEASE_LABELS
+from .models import AIPrediction, DailyRollup, MedicalRecord, RollupWatermark, User
+
+DOMAINS = {
+    "healthai": AIPrediction.created_at,
+    "medvault": MedicalRecord.created_at,
+    "users": User.created_at,
+}
+
+
+def _as_date(value):
+    # SQLite returns func.date() as a string
+    return value if isinstance(value, date) else date.fromisoformat(str(value))
+
+
+def close_days(db: Session, domain: str, today: date = None,
+               lag_days: int = ANALYTICS_CLOSE_LAG_DAYS):
+    """
+    Roll up every day since the watermark that started at least `lag_days`
+    ago with one range-bounded GROUP BY. Closed days are never recomputed,
+    so the lag leaves late-committing rows time to arrive.
+    """
+    column = DOMAINS[domain]
+    today = today or datetime.utcnow().date()
+    through = today - timedelta(days=lag_days)
+
+    watermark = db.get(RollupWatermark, domain)
+    if watermark and watermark.closed_through >= through:
+        return
+
+    query = db.query(func.date(column), func.count()).filter(
+        column < datetime.combine(through + timedelta(days=1), time.min)
+    )
+    if watermark:
+        start = watermark.closed_through + timedelta(days=1)
+        query = query.filter(column >= datetime.combine(start, time.min))
+
+    for day, count in query.group_by(func.date(column)).all():
+        db.add(DailyRollup(domain=domain, day=_as_date(day), count=count))
+
+    if watermark:
+        watermark.closed_through = through
+    else:
+        db.add(RollupWatermark(domain=domain, closed_through=through))
+
+    try:
+        db.commit()
+    except IntegrityError:
+        # Another worker closed the same days first
+        db.rollback()
+
+
+def daily_counts(db: Session, domain: str, start: date = None, end: date = None):
+    """Per-day counts: closed days from the rollup table plus the open ones, live."""
+    column = DOMAINS[domain]
+    today = datetime.utcnow().date()
+    close_days(db, domain, today)
+    watermark = db.get(RollupWatermark, domain)
+    open_from = watermark.closed_through + timedelta(days=1)
+
+    query = db.query(DailyRollup.day, DailyRollup.count).filter(
+        DailyRollup.domain == domain
+    )
+    if start:
+        query = query.filter(DailyRollup.day >= start)
+    if end:
+        query = query.filter(DailyRollup.day <= end)
+
+    data = [
+        {"date": str(day), "count": count}
+        for day, count in query.order_by(DailyRollup.day).all()
+    ]
+
+    live = db.query(func.date(column), func.count()).filter(
+        column >= datetime.combine(max(open_from, start or open_from), time.min)
+    )
+    if end:
+        live = live.filter(column < datetime.combine(end + timedelta(days=1), time.min))
+    data.extend(
+        {"date": str(_as_date(day)), "count": count}
+        for day, count in live.group_by(func.date(column)).order_by(func.date(column)).all()
+    )
+
+    return data
+
+
+def finding_summary(db: Session, start: date = None, end: date = None, threshold: float = 0.5):
+    """
+    Per-finding mean probability and count at or above `threshold`, over
+    every prediction with a stored probability vector, as one matrix.
+    """
+    query = db.query(AIPrediction.probabilities).filter(
+        AIPrediction.probabilities.isnot(None)
+    )
+    if start:
+        query = query.filter(AIPrediction.created_at >= datetime.combine(start, time.min))
+    if end:
+        query = query.filter(AIPrediction.created_at < datetime.combine(end + timedelta(days=1), time.min))
+
+    matrix = probabilities.matrix(blob for (blob,) in query.yield_per(1000))
+    means = matrix.mean(axis=0) if len(matrix) else matrix.sum(axis=0)
+    positives = (matrix >= threshold).sum(axis=0)
+
+    return {
+        "predictions": len(matrix),
+        "threshold": threshold,
+        "findings": [
+            {
+                "disease": label,
+                "mean_probability": round(float(means[i]), 3),
+                "at_or_above_threshold": int(positives[i])
+            }
+            for i, label in enumerate(DISEASE_LABELS)
+        ]
+    }
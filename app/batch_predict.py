@@ -0,0 +1,124 @@
+"""
+Offline bulk HealthAI scoring for a folder of X-rays:
+
+    python -m app.batch_predict /data/xrays --patient-id <patient id>
+
+Images are decoded by a multi-worker DataLoader, scored in batched forward
+passes and written to ai_predictions in bulk, each with its full
+probability vector.
+"""
+import argparse
+import os
+import uuid
+from datetime import datetime
+
+from dotenv import load_dotenv
+load_dotenv()
+
+import torch
+from torch.utils.data import DataLoader, Dataset
+
+from . import blobstore, stats
+from .database import SessionLocal
+from .jobs import result_columns
+from .models import AIPrediction, Patient
+from .ml.predictor import format_predictions, load_image, preprocess
+from .ml.registry import model_registry
+from .uploads import store_file
+
+XRAY_EXTENSIONS = (".png", ".jpg", ".jpeg", ".bmp")
+
+
+class XrayFolder(Dataset):
+    def __init__(self, root: str):
+        self.paths = sorted(
+            os.path.join(dirpath, name)
+            for dirpath, _, names in os.walk(root)
+            for name in names
+            if name.lower().endswith(XRAY_EXTENSIONS)
+        )
+
+    def __len__(self):
+        return len(self.paths)
+
+    def __getitem__(self, idx):
+        try:
+            return preprocess(load_image(self.paths[idx])), idx, True
+        except Exception:
+            # Unreadable files are reported, not fatal
+            return torch.zeros(3, 224, 224), idx, False
+
+
+def _store_batch(db, patient_id: str, paths, outputs):
+    predictions, sizes = [], {}
+    now = datetime.utcnow()
+
+    for path, probs in zip(paths, outputs):
+        stored = store_file(path, os.path.basename(path))
+        sizes[blobstore.key_of(stored.path)] = stored.size
+
+        predictions.append({
+            "id": str(uuid.uuid4()),
+            "patient_id": patient_id,
+            "image_path": stored.path,
+            "doctor_verified": "NO",
+            "status": "DONE",
+            "created_at": now,
+            **result_columns(format_predictions(probs)),
+        })
+
+    db.bulk_insert_mappings(AIPrediction, predictions)
+    blobstore.add_refs(db, [p["image_path"] for p in predictions], sizes)
+    stats.bump(db, ai_predictions=len(predictions), pending_predictions=len(predictions))
+    db.commit()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Score a folder of X-rays in bulk")
+    parser.add_argument("directory")
+    parser.add_argument("--patient-id", required=True)
+    parser.add_argument("--batch-size", type=int, default=32)
+    parser.add_argument("--workers", type=int, default=4)
+    args = parser.parse_args()
+
+    dataset = XrayFolder(args.directory)
+    if not len(dataset):
+        raise SystemExit(f"No X-ray images found in {args.directory}")
+
+    db = SessionLocal()
+    try:
+        if not db.query(Patient).filter(Patient.id == args.patient_id).first():
+            raise SystemExit(f"Patient {args.patient_id} not found")
+
+        model = model_registry.get()
+        loader = DataLoader(
+            dataset,
+            batch_size=args.batch_size,
+            num_workers=args.workers
+        )
+
+        scored, failed = 0, []
+        for images, indices, ok in loader:
+            with torch.no_grad():
+                outputs = model(images).numpy()
+
+            keep = ok.nonzero().flatten().tolist()
+            failed.extend(dataset.paths[int(indices[i])] for i in range(len(ok)) if not ok[i])
+            _store_batch(
+                db,
+                args.patient_id,
+                [dataset.paths[int(indices[i])] for i in keep],
+                [outputs[i] for i in keep]
+            )
+
+            scored += len(keep)
+            print(f"{scored}/{len(dataset)} scored")
+    finally:
+        db.close()
+
+    for path in failed:
+        print(f"FAILED {path}")
+
+
+if __name__ == "__main__":
+    main()
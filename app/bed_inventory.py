@@ -0,0 +1,159 @@
+import threading
+import time as clock
+
+from sqlalchemy.orm import Session
+
+from .config import BED_INVENTORY_REFRESH_SECONDS
+from .models import Bed
+
+
+class BedInventory:
+    """
+    In-memory index of free beds per ward, rebuilt from the database at
+    startup and again once it is refresh_seconds old, so allocations made
+    by other workers show up. The database stays the source of truth:
+    allocations flip beds.is_available with a compare-and-set UPDATE, and
+    the index is only adjusted after that commit succeeds. A stale index
+    entry (e.g. a bed taken by another worker) is corrected the first time
+    its CAS fails, or by the next rebuild.
+    """
+
+    def __init__(self, refresh_seconds: int = 60):
+        self.refresh_seconds = refresh_seconds
+        self._lock = threading.Lock()
+        self._beds = {}  # bed_id -> (ward, bed_number)
+        self._free = {}  # ward -> {bed_id: None}, an insertion-ordered set
+        self._totals = {}  # ward -> number of beds
+        # Changes made while a rebuild reads the table, replayed onto its result
+        self._journal = None
+        self.loaded_at = None
+        self.rebuilds = 0
+
+    @property
+    def loaded(self) -> bool:
+        return self.loaded_at is not None
+
+    def rebuild(self, db: Session):
+        with self._lock:
+            if self._journal is not None:
+                return  # another thread is rebuilding; keep serving the old index
+            self._journal = []
+
+        try:
+            rows = (
+                db.query(Bed.id, Bed.ward, Bed.bed_number, Bed.is_available)
+                .order_by(Bed.created_at, Bed.id)
+                .all()
+            )
+        except BaseException:
+            with self._lock:
+                self._journal = None
+            raise
+
+        state = ({}, {}, {})
+        for bed_id, ward, bed_number, is_available in rows:
+            self._add(state, bed_id, ward, bed_number, is_available)
+
+        with self._lock:
+            # Changes are idempotent, so replaying one the read already saw
+            # is harmless, and one committed after the read is not lost
+            for change, args in self._journal:
+                change(state, *args)
+            self._beds, self._free, self._totals = state
+            self._journal = None
+            self.loaded_at = clock.monotonic()
+            self.rebuilds += 1
+
+    def ensure_fresh(self, db: Session):
+        loaded_at = self.loaded_at
+        if loaded_at is None or clock.monotonic() - loaded_at >= self.refresh_seconds:
+            self.rebuild(db)
+
+    # =========================
+    # INDEX MAINTENANCE
+    # =========================
+    def _change(self, change, *args):
+        with self._lock:
+            change((self._beds, self._free, self._totals), *args)
+            if self._journal is not None:
+                self._journal.append((change, args))
+
+    @staticmethod
+    def _add(state, bed_id, ward, bed_number, is_available):
+        beds, free, totals = state
+        if bed_id in beds:
+            return
+        beds[bed_id] = (ward, bed_number)
+        totals[ward] = totals.get(ward, 0) + 1
+        free.setdefault(ward, {})
+        if is_available:
+            free[ward][bed_id] = None
+
+    @staticmethod
+    def _taken(state, bed_id):
+        beds, free, _ = state
+        ward, _ = beds.get(bed_id, (None, None))
+        if ward is not None:
+            free[ward].pop(bed_id, None)
+
+    @staticmethod
+    def _freed(state, bed_id):
+        beds, free, _ = state
+        ward, _ = beds.get(bed_id, (None, None))
+        if ward is not None:
+            free[ward][bed_id] = None
+
+    def add(self, bed_id: str, ward: str, bed_number: str, is_available: bool = True):
+        self._change(self._add, bed_id, ward, bed_number, is_available)
+
+    def mark_taken(self, bed_id: str):
+        self._change(self._taken, bed_id)
+
+    def mark_free(self, bed_id: str):
+        self._change(self._freed, bed_id)
+
+    # =========================
+    # QUERIES
+    # =========================
+    def next_free(self, ward: str):
+        with self._lock:
+            for bed_id in self._free.get(ward, ()):
+                return {"bed_id": bed_id, "ward": ward, "bed_number": self._beds[bed_id][1]}
+        return None
+
+    def occupancy(self):
+        with self._lock:
+            return [
+                {
+                    "ward": ward,
+                    "total": total,
+                    "free": len(self._free.get(ward, ())),
+                    "occupied": total - len(self._free.get(ward, ())),
+                }
+                for ward, total in sorted(self._totals.items())
+            ]
+
+    # =========================
+    # ATOMIC ALLOCATION
+    # =========================
+    def take(self, db: Session, bed_id: str) -> bool:
+        """
+        Compare-and-set beds.is_available from true to false inside the
+        caller's transaction. Returns False if the bed was already taken.
+        """
+        claimed = (
+            db.query(Bed)
+            .filter(Bed.id == bed_id, Bed.is_available.is_(True))
+            .update({"is_available": False}, synchronize_session=False)
+        )
+        if not claimed:
+            self.mark_taken(bed_id)
+        return bool(claimed)
+
+    def give_back(self, db: Session, bed_id: str):
+        db.query(Bed).filter(Bed.id == bed_id).update(
+            {"is_available": True}, synchronize_session=False
+        )
+
+
+bed_inventory = BedInventory(BED_INVENTORY_REFRESH_SECONDS)
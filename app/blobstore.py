@@ -0,0 +1,383 @@
+"""
+Content-addressed storage for uploaded files.
+
+Each file is stored once under its SHA-256, in a sharded layout
+(uploads/blobs/ab/cd/abcd...<ext>), however many records point at it.
+The blobs table counts the medical_records / ai_predictions rows that
+reference each blob; garbage collection recounts from those columns and
+deletes blobs that have been unreferenced for BLOB_GC_GRACE_HOURS.
+Storing a file claims its row first (see put), so a blob that a new upload
+is reusing is never collected before that upload's rows reference it.
+
+    python -m app.blobstore gc              # collect unreferenced blobs
+    python -m app.blobstore import-legacy   # move uuid-named uploads into the store
+"""
+import os
+import re
+import sys
+import time
+from collections import Counter
+from datetime import datetime, timedelta
+
+from dotenv import load_dotenv
+load_dotenv()
+
+from sqlalchemy import func
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+
+from .config import (
+    BLOB_BACKEND,
+    BLOB_CACHE_DIR,
+    BLOB_GC_GRACE_HOURS,
+    BLOB_S3_BUCKET,
+    BLOB_S3_ENDPOINT_URL,
+    BLOB_S3_PREFIX,
+    UPLOAD_DIR,
+)
+from .database import SessionLocal, unit_of_work
+from .models import AIPrediction, Blob, MedicalRecord
+
+PATH_PREFIX = "uploads/blobs/"
+_EXTENSION = re.compile(r"^\.[a-z0-9]{1,8}$")
+# Derived files (thumbnails, previews) live next to their blob as
+# "<blob key><suffix>" and share its lifetime
+DERIVATIVE_SUFFIXES = (".thumb.jpg", ".preview.webp")
+
+
+def blob_key(sha256: str, filename: str = None) -> str:
+    ext = os.path.splitext(filename or "")[1].lower()
+    if not _EXTENSION.match(ext):
+        ext = ""
+    return f"{sha256[:2]}/{sha256[2:4]}/{sha256}{ext}"
+
+
+def blob_path(key: str) -> str:
+    """The path stored in file_path / image_path columns."""
+    return PATH_PREFIX + key
+
+
+def original_key(key: str) -> str:
+    """The blob a derivative key belongs to (the key itself for blobs)."""
+    for suffix in DERIVATIVE_SUFFIXES:
+        if key.endswith(suffix):
+            return key[:-len(suffix)]
+    return key
+
+
+def key_of(path: str):
+    """Blob key of a stored path, or None for legacy uuid-named uploads."""
+    if path and path.startswith(PATH_PREFIX):
+        return path[len(PATH_PREFIX):]
+    return None
+
+
+# =========================
+# BACKENDS
+# =========================
+class LocalBackend:
+    name = "local"
+
+    def __init__(self, root: str):
+        self.root = root
+
+    def local_path(self, key: str) -> str:
+        return os.path.join(self.root, key)
+
+    def exists(self, key: str) -> bool:
+        return os.path.exists(self.local_path(key))
+
+    def put_file(self, source: str, key: str) -> bool:
+        """Move `source` into the store; returns False if the blob already existed."""
+        destination = self.local_path(key)
+        if os.path.exists(destination):
+            os.remove(source)
+            # GC leaves files modified within its grace period alone
+            os.utime(destination)
+            return False
+
+        os.makedirs(os.path.dirname(destination), exist_ok=True)
+        os.replace(source, destination)
+        return True
+
+    def delete(self, key: str):
+        try:
+            os.remove(self.local_path(key))
+        except FileNotFoundError:
+            pass
+
+    def modified(self, key: str):
+        """Modification timestamp of a stored blob, or None if it is missing."""
+        try:
+            return os.path.getmtime(self.local_path(key))
+        except FileNotFoundError:
+            return None
+
+    def keys(self):
+        """(key, modified timestamp) for every stored blob."""
+        for dirpath, _, names in os.walk(self.root):
+            for name in names:
+                full = os.path.join(dirpath, name)
+                yield os.path.relpath(full, self.root).replace(os.sep, "/"), os.path.getmtime(full)
+
+
+class S3Backend:
+    """
+    S3-compatible bucket (AWS, MinIO, ...). Blobs read by the app are kept
+    in a local cache directory, since inference needs a file on disk.
+    """
+    name = "s3"
+
+    def __init__(self, bucket: str, prefix: str, endpoint_url: str, cache_dir: str):
+        try:
+            import boto3
+        except ImportError:
+            raise RuntimeError("BLOB_BACKEND=s3 requires boto3 (pip install boto3)")
+        if not bucket:
+            raise RuntimeError("BLOB_BACKEND=s3 requires BLOB_S3_BUCKET")
+
+        self.client = boto3.client("s3", endpoint_url=endpoint_url)
+        self.bucket = bucket
+        self.prefix = prefix
+        self.cache = LocalBackend(cache_dir)
+
+    def _object(self, key: str) -> str:
+        return self.prefix + key
+
+    def local_path(self, key: str) -> str:
+        path = self.cache.local_path(key)
+        if not os.path.exists(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            partial = f"{path}.{os.getpid()}.part"
+            self.client.download_file(self.bucket, self._object(key), partial)
+            os.replace(partial, path)
+        return path
+
+    def exists(self, key: str) -> bool:
+        from botocore.exceptions import ClientError
+
+        try:
+            self.client.head_object(Bucket=self.bucket, Key=self._object(key))
+            return True
+        except ClientError:
+            return False
+
+    def put_file(self, source: str, key: str) -> bool:
+        created = not self.exists(key)
+        if created:
+            self.client.upload_file(source, self.bucket, self._object(key))
+        # The uploader usually reads it back right away (inference, thumbnails)
+        self.cache.put_file(source, key)
+        return created
+
+    def delete(self, key: str):
+        self.client.delete_object(Bucket=self.bucket, Key=self._object(key))
+        self.cache.delete(key)
+
+    def modified(self, key: str):
+        from botocore.exceptions import ClientError
+
+        try:
+            head = self.client.head_object(Bucket=self.bucket, Key=self._object(key))
+        except ClientError:
+            return None
+        return head["LastModified"].timestamp()
+
+    def keys(self):
+        pages = self.client.get_paginator("list_objects_v2").paginate(
+            Bucket=self.bucket, Prefix=self.prefix
+        )
+        for page in pages:
+            for item in page.get("Contents", []):
+                yield item["Key"][len(self.prefix):], item["LastModified"].timestamp()
+
+
+def _make_backend():
+    if BLOB_BACKEND == "local":
+        return LocalBackend(os.path.join(UPLOAD_DIR, "blobs"))
+    if BLOB_BACKEND == "s3":
+        return S3Backend(BLOB_S3_BUCKET, BLOB_S3_PREFIX, BLOB_S3_ENDPOINT_URL, BLOB_CACHE_DIR)
+    raise RuntimeError(f"Unknown BLOB_BACKEND {BLOB_BACKEND!r}; use local or s3")
+
+
+blob_store = _make_backend()
+
+
+# =========================
+# REFERENCE COUNTS
+# =========================
+def _touch(db: Session, key: str, values: dict, new_row: dict):
+    """Update blob `key`'s row, creating it from new_row if there is none."""
+    if db.query(Blob).filter(Blob.key == key).update(values, synchronize_session=False):
+        return
+    try:
+        with db.begin_nested():
+            db.add(Blob(key=key, **new_row))
+    except IntegrityError:
+        # Another upload of the same content created the row first
+        db.query(Blob).filter(Blob.key == key).update(values, synchronize_session=False)
+
+
+def put(source: str, key: str, size: int = None) -> bool:
+    """
+    Store `source` as blob `key` (see put_file). The blob's row is created
+    or its updated_at bumped, and committed, before the file is stored or
+    reused, so GC sees it in use until the uploader's add_refs commits.
+    """
+    now = datetime.utcnow()
+    db = SessionLocal()
+    try:
+        with unit_of_work(db):
+            _touch(db, key, {"updated_at": now}, {
+                "size": size, "refcount": 0, "created_at": now, "updated_at": now
+            })
+    finally:
+        db.close()
+    return blob_store.put_file(source, key)
+
+
+def add_refs(db: Session, paths, sizes: dict = None):
+    """
+    Count new references inside the caller's transaction, so a blob's
+    refcount commits (or rolls back) together with the rows using it.
+    """
+    now = datetime.utcnow()
+    counts = Counter(key for key in map(key_of, paths) if key)
+
+    for key, count in counts.items():
+        _touch(db, key, {"refcount": Blob.refcount + count, "updated_at": now}, {
+            "size": (sizes or {}).get(key),
+            "refcount": count,
+            "created_at": now,
+            "updated_at": now
+        })
+
+
+def add_ref(db: Session, path: str, size: int = None):
+    key = key_of(path)
+    add_refs(db, [path], {key: size} if key else None)
+
+
+def _reference_counts(db: Session) -> Counter:
+    counts = Counter()
+    for column in (MedicalRecord.file_path, AIPrediction.image_path):
+        rows = (
+            db.query(column, func.count())
+            .filter(column.like(PATH_PREFIX + "%"))
+            .group_by(column)
+            .all()
+        )
+        for path, count in rows:
+            counts[key_of(path)] += count
+    return counts
+
+
+def collect_garbage(db: Session, grace_hours: int = BLOB_GC_GRACE_HOURS) -> dict:
+    """
+    Recount references from the source columns, then delete blobs that
+    have had none for `grace_hours`, plus stored files with no blobs row
+    at all (an upload whose transaction never committed). A file is only
+    deleted if it, too, is older than the cutoff and its row is gone.
+    """
+    cutoff = datetime.utcnow() - timedelta(hours=grace_hours)
+    counts = _reference_counts(db)
+
+    recounted = 0
+    for blob in db.query(Blob).all():
+        actual = counts.get(blob.key, 0)
+        if blob.refcount != actual:
+            blob.refcount = actual
+            blob.updated_at = datetime.utcnow()
+            recounted += 1
+    db.commit()
+
+    unreferenced = [
+        key for (key,) in db.query(Blob.key).filter(
+            Blob.refcount <= 0,
+            Blob.updated_at < cutoff
+        )
+    ]
+    oldest = time.time() - grace_hours * 3600
+    deleted = 0
+    for key in unreferenced:
+        # Re-check at delete time: an upload may have just claimed it
+        if not db.query(Blob).filter(
+            Blob.key == key,
+            Blob.refcount <= 0,
+            Blob.updated_at < cutoff
+        ).delete(synchronize_session=False):
+            db.rollback()
+            continue
+
+        # The file goes while the row delete is still uncommitted: put()
+        # claims the row before it stores or reuses the file, so it waits
+        # on this delete and then finds no row and no file, and stores both
+        # afresh. A fresh file means it was reused before this round began.
+        modified = blob_store.modified(key)
+        if modified is None or modified < oldest:
+            blob_store.delete(key)
+            for suffix in DERIVATIVE_SUFFIXES:
+                blob_store.delete(key + suffix)
+            deleted += 1
+        db.commit()
+
+    known = {key for (key,) in db.query(Blob.key)}
+    orphans = 0
+    for key, modified in list(blob_store.keys()):
+        if original_key(key) not in known and modified < oldest and not key.endswith(".part"):
+            blob_store.delete(key)
+            orphans += 1
+
+    return {"recounted": recounted, "deleted": deleted, "orphans_deleted": orphans}
+
+
+# =========================
+# LEGACY UPLOADS
+# =========================
+def import_legacy(db: Session) -> int:
+    """Move uuid-named uploads into the store and repoint their rows."""
+    from .uploads import disk_path, store_file
+
+    moved = 0
+    for model, column in (
+        (MedicalRecord, "file_path"),
+        (AIPrediction, "image_path"),
+    ):
+        rows = db.query(model).filter(
+            ~getattr(model, column).like(PATH_PREFIX + "%")
+        ).all()
+
+        for row in rows:
+            legacy = disk_path(getattr(row, column))
+            if not os.path.exists(legacy):
+                continue
+
+            stored = store_file(legacy, os.path.basename(legacy))
+            setattr(row, column, stored.path)
+            add_ref(db, stored.path, stored.size)
+            db.commit()
+
+            os.remove(legacy)
+            moved += 1
+
+    return moved
+
+
+def main():
+    from .database import SessionLocal
+
+    command = sys.argv[1] if len(sys.argv) > 1 else "gc"
+    db = SessionLocal()
+    try:
+        if command == "gc":
+            print(collect_garbage(db))
+        elif command == "import-legacy":
+            print(f"{import_legacy(db)} legacy uploads moved into the blob store")
+        else:
+            raise SystemExit("usage: python -m app.blobstore [gc|import-legacy]")
+    finally:
+        db.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,217 @@
+import os
+
+from dotenv import load_dotenv
+# Settings are read at import time, which can come before main.py loads .env
+load_dotenv()
+
+# =========================
+# HEALTHAI INFERENCE
+# =========================
+# Micro-batching: concurrent /healthai/predict calls are grouped into one
+# forward pass of up to BATCH_MAX_SIZE images, waiting at most
+# BATCH_MAX_WAIT_MS for the batch to fill up.
+BATCH_MAX_SIZE = int(os.getenv("BATCH_MAX_SIZE", "8"))
+BATCH_MAX_WAIT_MS = float(os.getenv("BATCH_MAX_WAIT_MS", "10"))
+
+# Model weights are read from a local checkpoint; the network is only used
+# when MODEL_ALLOW_DOWNLOAD is enabled and no checkpoint is configured.
+MODEL_CHECKPOINT_PATH = os.getenv("MODEL_CHECKPOINT_PATH", "")
+MODEL_ALLOW_DOWNLOAD = os.getenv("MODEL_ALLOW_DOWNLOAD", "false").lower() == "true"
+# Load + warm up the model in a background thread when the app starts,
+# instead of on the first /healthai/predict call.
+MODEL_PRELOAD = os.getenv("MODEL_PRELOAD", "true").lower() == "true"
+
+# Bump MODEL_VERSION whenever the checkpoint changes; it is part of the
+# prediction cache key.
+MODEL_VERSION = os.getenv("MODEL_VERSION", "densenet121-v1")
+
+# Prediction cache keyed by image content hash (0 disables the memory tier,
+# an empty PREDICTION_CACHE_DIR disables the disk tier).
+PREDICTION_CACHE_SIZE = int(os.getenv("PREDICTION_CACHE_SIZE", "1024"))
+PREDICTION_CACHE_DIR = os.getenv("PREDICTION_CACHE_DIR", "")
+
+# CPU inference backend: eager | torchscript | quantized_dynamic | quantized_static
+INFERENCE_BACKEND = os.getenv("INFERENCE_BACKEND", "eager")
+# Optimized backends are compared with eager on load and fall back to eager
+# when any of the 14 outputs drifts by more than the tolerance.
+INFERENCE_PARITY_CHECK = os.getenv("INFERENCE_PARITY_CHECK", "true").lower() == "true"
+INFERENCE_PARITY_TOLERANCE = float(os.getenv("INFERENCE_PARITY_TOLERANCE", "0.02"))
+# Folder of representative X-rays used to calibrate quantized_static
+INFERENCE_CALIBRATION_DIR = os.getenv("INFERENCE_CALIBRATION_DIR", "")
+
+# =========================
+# EXECUTOR POOLS
+# =========================
+# Inference and password hashing get their own bounded pools so bursts of
+# either are rejected with 503 + Retry-After instead of starving cheap GETs.
+# INFERENCE_POOL=thread keeps every request in one process so the batcher
+# and prediction cache are shared; "process" isolates the model per worker.
+# In thread mode the workers mostly wait on the batcher, so keep
+# INFERENCE_WORKERS >= BATCH_MAX_SIZE or batches can never fill up.
+INFERENCE_POOL = os.getenv("INFERENCE_POOL", "thread")
+INFERENCE_WORKERS = int(os.getenv("INFERENCE_WORKERS", str(BATCH_MAX_SIZE)))
+INFERENCE_QUEUE_SIZE = int(os.getenv("INFERENCE_QUEUE_SIZE", "16"))
+AUTH_WORKERS = int(os.getenv("AUTH_WORKERS", "4"))
+AUTH_QUEUE_SIZE = int(os.getenv("AUTH_QUEUE_SIZE", "32"))
+RETRY_AFTER_SECONDS = int(os.getenv("RETRY_AFTER_SECONDS", "2"))
+
+# =========================
+# ASYNC PREDICTION JOBS
+# =========================
+# Uploads to /healthai/predict/async are queued and scored by this many
+# concurrent background jobs; event streams poll job state at this interval.
+PREDICTION_JOB_CONCURRENCY = int(os.getenv("PREDICTION_JOB_CONCURRENCY", "4"))
+PREDICTION_EVENTS_POLL_SECONDS = float(os.getenv("PREDICTION_EVENTS_POLL_SECONDS", "0.5"))
+# A RUNNING job whose claim is older than this is assumed to belong to a
+# dead worker and is queued again at startup; keep it well above the
+# slowest inference wait.
+PREDICTION_JOB_LEASE_SECONDS = int(os.getenv("PREDICTION_JOB_LEASE_SECONDS", "900"))
+# Upper bound on images accepted by one /healthai/predict/batch call
+BATCH_PREDICT_MAX_FILES = int(os.getenv("BATCH_PREDICT_MAX_FILES", "500"))
+
+# =========================
+# PAGINATION
+# =========================
+DEFAULT_PAGE_SIZE = int(os.getenv("DEFAULT_PAGE_SIZE", "50"))
+MAX_PAGE_SIZE = int(os.getenv("MAX_PAGE_SIZE", "200"))
+
+# =========================
+# ADMIN STATS
+# =========================
+# /admin/stats reads incrementally maintained counters; a background job
+# recomputes them from the source tables this often (0 disables it).
+STATS_RECONCILE_SECONDS = int(os.getenv("STATS_RECONCILE_SECONDS", "3600"))
+
+# =========================
+# ANALYTICS ROLLUPS
+# =========================
+# A day's counts are frozen into daily_rollups this many days after it
+# starts (at least 1). The lag lets rows stamped just before midnight whose
+# transaction commits after it land before the day is closed; newer days
+# are counted live.
+ANALYTICS_CLOSE_LAG_DAYS = max(1, int(os.getenv("ANALYTICS_CLOSE_LAG_DAYS", "2")))
+
+# =========================
+# RESPONSE CACHE
+# =========================
+# Public read endpoints (/doctors, /medislot/beds) are cached per process
+# for this long; their write paths invalidate them immediately.
+RESPONSE_CACHE_TTL_SECONDS = int(os.getenv("RESPONSE_CACHE_TTL_SECONDS", "60"))
+# Entries per process, least recently used evicted first
+RESPONSE_CACHE_MAX_ENTRIES = int(os.getenv("RESPONSE_CACHE_MAX_ENTRIES", "1024"))
+
+# =========================
+# APPOINTMENT SLOTS
+# =========================
+# Appointments occupy fixed-length slots on a grid starting at
+# WORKDAY_START; free-slot search only offers slots inside working hours.
+SLOT_MINUTES = int(os.getenv("SLOT_MINUTES", "30"))
+WORKDAY_START = os.getenv("WORKDAY_START", "09:00")
+WORKDAY_END = os.getenv("WORKDAY_END", "17:00")
+# Per-doctor calendars are reloaded from the database after this long so
+# bookings made by other workers show up.
+SLOT_CALENDAR_REFRESH_SECONDS = int(os.getenv("SLOT_CALENDAR_REFRESH_SECONDS", "60"))
+MAX_FREE_SLOT_DAYS = int(os.getenv("MAX_FREE_SLOT_DAYS", "31"))
+
+# =========================
+# BED INVENTORY
+# =========================
+# The per-process free-bed index is rebuilt from the database after this
+# long so allocations made by other workers show up.
+BED_INVENTORY_REFRESH_SECONDS = int(os.getenv("BED_INVENTORY_REFRESH_SECONDS", "60"))
+
+# =========================
+# UPLOADS
+# =========================
+_REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+UPLOAD_DIR = os.getenv("UPLOAD_DIR", os.path.join(_REPO_ROOT, "uploads"))
+# Partial resumable uploads live here until completed; keep it on the same
+# filesystem as UPLOAD_DIR so completion is a rename, not a copy.
+UPLOAD_SESSION_DIR = os.getenv("UPLOAD_SESSION_DIR", os.path.join(_REPO_ROOT, "upload_sessions"))
+UPLOAD_CHUNK_BYTES = int(os.getenv("UPLOAD_CHUNK_BYTES", str(1024 * 1024)))
+UPLOAD_SESSION_TTL_HOURS = int(os.getenv("UPLOAD_SESSION_TTL_HOURS", "24"))
+# Per-type size limits, checked against Content-Length before the body is read
+MEDVAULT_MAX_UPLOAD_MB = int(os.getenv("MEDVAULT_MAX_UPLOAD_MB", "50"))
+XRAY_MAX_UPLOAD_MB = int(os.getenv("XRAY_MAX_UPLOAD_MB", "20"))
+BATCH_MAX_UPLOAD_MB = int(os.getenv("BATCH_MAX_UPLOAD_MB", "500"))
+
+# =========================
+# BLOB STORE
+# =========================
+# Uploaded files are stored once per SHA-256 under uploads/blobs/ab/cd/...
+# BLOB_BACKEND=s3 keeps them in an S3-compatible bucket instead (needs
+# boto3); BLOB_S3_ENDPOINT_URL points it at MinIO or similar.
+BLOB_BACKEND = os.getenv("BLOB_BACKEND", "local")
+BLOB_S3_BUCKET = os.getenv("BLOB_S3_BUCKET")
+BLOB_S3_PREFIX = os.getenv("BLOB_S3_PREFIX", "")
+BLOB_S3_ENDPOINT_URL = os.getenv("BLOB_S3_ENDPOINT_URL")
+# Local copies of remote blobs, for inference and file delivery
+BLOB_CACHE_DIR = os.getenv("BLOB_CACHE_DIR", os.path.join(_REPO_ROOT, "blob_cache"))
+# Unreferenced blobs are kept this long before garbage collection, which
+# runs this often in the background (0 disables it).
+BLOB_GC_GRACE_HOURS = int(os.getenv("BLOB_GC_GRACE_HOURS", "24"))
+BLOB_GC_SECONDS = int(os.getenv("BLOB_GC_SECONDS", "86400"))
+
+# =========================
+# FILE DELIVERY
+# =========================
+# /files/{key} serves blobs with Range support and immutable caching.
+# Listings hand out URLs signed for at least this long, stable within a
+# window so browsers can reuse cached files.
+FILE_URL_TTL_SECONDS = int(os.getenv("FILE_URL_TTL_SECONDS", "3600"))
+# Behind nginx, set to an internal location (e.g. /protected/blobs/) and
+# the app answers with X-Accel-Redirect instead of streaming the file.
+FILE_ACCEL_REDIRECT_PREFIX = os.getenv("FILE_ACCEL_REDIRECT_PREFIX", "")
+# The legacy /uploads static mount has no access control. It never serves
+# the blob store; turn it on only while old clients still read uuid-named
+# uploads directly.
+SERVE_UPLOADS_MOUNT = os.getenv("SERVE_UPLOADS_MOUNT", "false").lower() == "true"
+
+# =========================
+# IMAGE DERIVATIVES
+# =========================
+# Image uploads get a progressive JPEG thumbnail and a WebP preview, stored
+# next to the original blob and listed as thumbnail_url / preview_url.
+THUMBNAIL_MAX_PX = int(os.getenv("THUMBNAIL_MAX_PX", "256"))
+PREVIEW_MAX_PX = int(os.getenv("PREVIEW_MAX_PX", "1024"))
+DERIVATIVE_QUALITY = int(os.getenv("DERIVATIVE_QUALITY", "80"))
+DERIVATIVE_WORKERS = int(os.getenv("DERIVATIVE_WORKERS", "2"))
+
+# =========================
+# AUTH
+# =========================
+# Verified JWTs (and the profile id resolved for them) are kept per
+# process, keyed by token digest, until they expire.
+PRINCIPAL_CACHE_SIZE = int(os.getenv("PRINCIPAL_CACHE_SIZE", "10000"))
+
+# =========================
+# DATABASE
+# =========================
+# Connection pool per worker process. Handlers hold a connection for the
+# whole request, so size + overflow bounds concurrent DB-bound requests;
+# checkouts wait up to DB_POOL_TIMEOUT seconds. Connections are tested
+# before use (pre-ping) and replaced after DB_POOL_RECYCLE seconds.
+DB_POOL_SIZE = int(os.getenv("DB_POOL_SIZE", "5"))
+DB_MAX_OVERFLOW = int(os.getenv("DB_MAX_OVERFLOW", "10"))
+DB_POOL_TIMEOUT = float(os.getenv("DB_POOL_TIMEOUT", "30"))
+DB_POOL_RECYCLE = int(os.getenv("DB_POOL_RECYCLE", "1800"))
+DB_POOL_PRE_PING = os.getenv("DB_POOL_PRE_PING", "true").lower() == "true"
+# DB_ASYNC=true adds an async engine (aiosqlite / asyncpg, or
+# ASYNC_DATABASE_URL) for the hot read endpoints, so they wait on the
+# database without holding a threadpool thread. It gets its own pool with
+# the same settings.
+DB_ASYNC = os.getenv("DB_ASYNC", "false").lower() == "true"
+
+# =========================
+# SQLITE
+# =========================
+# For SQLite deployments (the DATABASE_URL fallback): WAL journal so reads
+# never block the writer, synchronous=NORMAL (fsync at checkpoints, not on
+# every commit), memory-mapped reads and a busy timeout instead of an
+# immediate "database is locked". Hot write paths also go through a single
+# writer thread that commits whatever is queued as one group, up to
+# WRITE_QUEUE_MAX_BATCH writes per commit.
+SQLITE_PRODUCTION_MODE = os.getenv("SQLITE_PRODUCTION_MODE", "true").lower() == "true"
+SQLITE_MMAP_MB = int(os.getenv("SQLITE_MMAP_MB", "256"))
+SQLITE_BUSY_TIMEOUT_MS = int(os.getenv("SQLITE_BUSY_TIMEOUT_MS", "5000"))
+WRITE_QUEUE_MAX_BATCH = int(os.getenv("WRITE_QUEUE_MAX_BATCH", "64"))
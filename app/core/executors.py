@@ -0,0 +1,123 @@
+import asyncio
+import functools
+import multiprocessing
+import threading
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+
+from fastapi import HTTPException, status
+
+from ..config import (
+    AUTH_QUEUE_SIZE,
+    AUTH_WORKERS,
+    INFERENCE_POOL,
+    INFERENCE_QUEUE_SIZE,
+    INFERENCE_WORKERS,
+    RETRY_AFTER_SECONDS
+)
+
+
+class BoundedExecutor:
+    """
+    A dedicated worker pool with a bounded backlog. When workers + queue are
+    all taken, callers get an immediate 503 with Retry-After.
+    """
+
+    def __init__(self, name: str, kind: str, workers: int, queue_size: int,
+                 initializer=None):
+        self.name = name
+        self.kind = kind
+        self.workers = max(1, workers)
+        self.capacity = self.workers + max(0, queue_size)
+        self.initializer = initializer
+
+        self._executor = None
+        self._lock = threading.Lock()
+        self._in_flight = 0
+        self.rejected = 0
+        self.completed = 0
+
+    def _get_executor(self):
+        if self._executor is None:
+            with self._lock:
+                if self._executor is None:
+                    if self.kind == "process":
+                        self._executor = ProcessPoolExecutor(
+                            max_workers=self.workers,
+                            mp_context=multiprocessing.get_context("spawn"),
+                            initializer=self.initializer
+                        )
+                    else:
+                        self._executor = ThreadPoolExecutor(
+                            max_workers=self.workers,
+                            thread_name_prefix=f"{self.name}-pool",
+                            initializer=self.initializer
+                        )
+        return self._executor
+
+    def _overloaded(self):
+        self.rejected += 1
+        return HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail=f"Server busy ({self.name}), please retry",
+            headers={"Retry-After": str(RETRY_AFTER_SECONDS)}
+        )
+
+    def check_capacity(self):
+        """Fail fast before doing any work that would be wasted on a 503."""
+        if self._in_flight >= self.capacity:
+            raise self._overloaded()
+
+    async def run(self, fn, *args, wait: bool = False, **kwargs):
+        """
+        Run fn on the pool. Interactive callers get a 503 when it is full;
+        background callers pass wait=True to hold back until a slot frees up.
+        """
+        while True:
+            with self._lock:
+                if self._in_flight < self.capacity:
+                    self._in_flight += 1
+                    break
+                if not wait:
+                    raise self._overloaded()
+            await asyncio.sleep(RETRY_AFTER_SECONDS / 10)
+
+        try:
+            loop = asyncio.get_running_loop()
+            return await loop.run_in_executor(
+                self._get_executor(), functools.partial(fn, *args, **kwargs)
+            )
+        finally:
+            with self._lock:
+                self._in_flight -= 1
+                self.completed += 1
+
+    def submit(self, fn, *args, **kwargs):
+        return self._get_executor().submit(fn, *args, **kwargs)
+
+    def stats(self) -> dict:
+        return {
+            "kind": self.kind,
+            "workers": self.workers,
+            "capacity": self.capacity,
+            "in_flight": self._in_flight,
+            "queued": max(0, self._in_flight - self.workers),
+            "completed": self.completed,
+            "rejected": self.rejected,
+        }
+
+
+def _warm_inference_worker():
+    from ..ml.tasks import warm_up
+    warm_up()
+
+
+inference_pool = BoundedExecutor(
+    "inference",
+    INFERENCE_POOL,
+    INFERENCE_WORKERS,
+    INFERENCE_QUEUE_SIZE,
+    initializer=_warm_inference_worker if INFERENCE_POOL == "process" else None
+)
+
+# bcrypt releases the GIL, so threads are enough
+auth_pool = BoundedExecutor("auth", "thread", AUTH_WORKERS, AUTH_QUEUE_SIZE)
@@ -0,0 +1,56 @@
+import asyncio
+from datetime import datetime
+
+from fastapi.concurrency import run_in_threadpool
+
+
+class PeriodicTask:
+    """
+    Runs a blocking fn() in the threadpool every `seconds` (0 disables it).
+    A failing round is recorded and retried on the next one; the outcome
+    of the last rounds is reported in /health.
+    """
+
+    def __init__(self, name: str, seconds: float, fn):
+        self.name = name
+        self.seconds = seconds
+        self.fn = fn
+        self._task = None
+        self.runs = 0
+        self.failures = 0
+        self.last_run_at = None
+        self.last_success_at = None
+        self.last_error = None
+        self.last_error_at = None
+
+    def start(self):
+        if self.seconds > 0 and self._task is None:
+            self._task = asyncio.create_task(self._loop(), name=self.name)
+
+    async def _loop(self):
+        while True:
+            await asyncio.sleep(self.seconds)
+            await self.run_once()
+
+    async def run_once(self):
+        self.runs += 1
+        self.last_run_at = datetime.utcnow()
+        try:
+            await run_in_threadpool(self.fn)
+        except Exception as exc:
+            self.failures += 1
+            self.last_error = f"{type(exc).__name__}: {exc}"
+            self.last_error_at = datetime.utcnow()
+        else:
+            self.last_success_at = datetime.utcnow()
+
+    def stats(self) -> dict:
+        return {
+            "interval_seconds": self.seconds,
+            "runs": self.runs,
+            "failures": self.failures,
+            "last_run_at": self.last_run_at,
+            "last_success_at": self.last_success_at,
+            "last_error": self.last_error,
+            "last_error_at": self.last_error_at
+        }
@@ -0,0 +1,112 @@
+import hashlib
+import json
+import threading
+import time
+from collections import OrderedDict
+
+from fastapi import Request, Response
+from fastapi.encoders import jsonable_encoder
+
+from ..config import RESPONSE_CACHE_MAX_ENTRIES, RESPONSE_CACHE_TTL_SECONDS
+
+
+class ResponseCache:
+    """
+    Per-process cache of serialized JSON responses, grouped by namespace so
+    write paths can drop everything derived from the data they changed.
+    Entries also expire after a TTL, which bounds staleness across workers,
+    and at most max_entries are kept (least recently used evicted first).
+    """
+
+    def __init__(self, ttl: int = 60, max_entries: int = 1024):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._entries = OrderedDict()  # (namespace, params) -> (expires_at, etag, body)
+        self._generations = {}  # namespace -> bumped on every invalidation
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+        self.not_modified = 0
+        self.evictions = 0
+
+    def invalidate(self, *namespaces: str):
+        with self._lock:
+            for namespace in namespaces:
+                self._generations[namespace] = self._generations.get(namespace, 0) + 1
+                for key in [k for k in self._entries if k[0] == namespace]:
+                    del self._entries[key]
+
+    def _lookup(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None and entry[0] <= time.monotonic():
+                del self._entries[key]
+                entry = None
+            if entry is None:
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry
+
+    def _store(self, key, generation, body: bytes, ttl: int):
+        etag = '"' + hashlib.sha256(body).hexdigest()[:32] + '"'
+        entry = (time.monotonic() + ttl, etag, body)
+        with self._lock:
+            # Skip the store if the namespace was invalidated while building
+            if self._generations.get(key[0], 0) == generation and self.max_entries > 0:
+                self._entries[key] = entry
+                self._entries.move_to_end(key)
+                while len(self._entries) > self.max_entries:
+                    self._entries.popitem(last=False)
+                    self.evictions += 1
+        return entry
+
+    def respond(self, request: Request, namespace: str, build, params=(),
+                ttl: int = None) -> Response:
+        """
+        Serve build() through the cache with ETag / If-None-Match support.
+        build is only called (and the database only touched) on a miss.
+
+        params are the (normalized) request parameters build depends on;
+        they alone key the entry, so unrelated query strings share it.
+        """
+        ttl = self.ttl if ttl is None else ttl
+        key = (namespace, tuple(params))
+
+        entry = self._lookup(key)
+        if entry is None:
+            with self._lock:
+                generation = self._generations.get(namespace, 0)
+            body = json.dumps(jsonable_encoder(build())).encode()
+            entry = self._store(key, generation, body, ttl)
+
+        _, etag, body = entry
+        # Clients keep the body but revalidate every time, so an invalidation
+        # shows up at once (a cheap 304 otherwise); private keeps shared
+        # proxies from storing per-user responses
+        headers = {"ETag": etag, "Cache-Control": "private, no-cache"}
+
+        if_none_match = request.headers.get("if-none-match", "")
+        candidates = {tag.strip().removeprefix("W/") for tag in if_none_match.split(",")}
+        if etag in candidates or "*" in candidates:
+            with self._lock:
+                self.not_modified += 1
+            return Response(status_code=304, headers=headers)
+
+        return Response(content=body, media_type="application/json", headers=headers)
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "entries": len(self._entries),
+                "max_entries": self.max_entries,
+                "ttl_seconds": self.ttl,
+                "hits": self.hits,
+                "misses": self.misses,
+                "not_modified": self.not_modified,
+                "evictions": self.evictions,
+            }
+
+
+response_cache = ResponseCache(RESPONSE_CACHE_TTL_SECONDS, RESPONSE_CACHE_MAX_ENTRIES)
@@ -1,32 +1,119 @@
+import hashlib
+import threading
+import time
+from collections import OrderedDict
+
 from fastapi import Depends, HTTPException, status
+from fastapi.concurrency import run_in_threadpool
 from jose import jwt
 import os
 from fastapi.security import HTTPBearer, HTTPAuthorizationCredentials
+from sqlalchemy.orm import Session
+
+from ..config import PRINCIPAL_CACHE_SIZE
+from ..database import SessionLocal
+from ..models import Doctor, Patient
 
 # oauth2_scheme = OAuth2PasswordBearer(tokenUrl="/auth/login")
 security = HTTPBearer()
+optional_security = HTTPBearer(auto_error=False)
 
 
 SECRET_KEY = os.getenv("SECRET_KEY")
 ALGORITHM = os.getenv("ALGORITHM")
 
+# Role -> (token claim, profile model) for the profile id handlers need
+PROFILE_CLAIMS = {
+    "PATIENT": ("patient_id", Patient),
+    "DOCTOR": ("doctor_id", Doctor),
+}
+
+
+class PrincipalCache:
+    """
+    Bounded LRU of verified token payloads keyed by SHA-256 of the token.
+    Entries are dropped once the token's exp has passed, so a cached token
+    is never accepted for longer than jwt.decode would accept it.
+    """
+
+    def __init__(self, max_entries: int):
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, digest: bytes):
+        with self._lock:
+            payload = self._entries.get(digest)
+            if payload is not None:
+                exp = payload.get("exp")
+                if exp is not None and exp <= time.time():
+                    del self._entries[digest]
+                    payload = None
+                else:
+                    self._entries.move_to_end(digest)
+            if payload is None:
+                self.misses += 1
+            else:
+                self.hits += 1
+            return payload
+
+    def put(self, digest: bytes, payload: dict):
+        if self.max_entries <= 0:
+            return
+        with self._lock:
+            self._entries[digest] = payload
+            self._entries.move_to_end(digest)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def stats(self) -> dict:
+        return {
+            "entries": len(self._entries),
+            "max_entries": self.max_entries,
+            "hits": self.hits,
+            "misses": self.misses
+        }
+
 
-def get_current_user(
+principal_cache = PrincipalCache(PRINCIPAL_CACHE_SIZE)
+
+
+# The auth dependencies are async so a cached principal costs no threadpool hop
+async def get_current_user(
     credentials: HTTPAuthorizationCredentials = Depends(security)
 ):
     token = credentials.credentials
+    digest = hashlib.sha256(token.encode()).digest()
+
+    payload = principal_cache.get(digest)
+    if payload is not None:
+        return payload
+
     try:
         payload = jwt.decode(token, SECRET_KEY, algorithms=[ALGORITHM])
-        return payload
     except:
         raise HTTPException(
             status_code=status.HTTP_401_UNAUTHORIZED,
             detail="Invalid or expired token"
         )
 
+    principal_cache.put(digest, payload)
+    return payload
+
+
+async def get_optional_user(
+    credentials: HTTPAuthorizationCredentials = Depends(optional_security)
+):
+    """Like get_current_user, but None when no bearer token was sent."""
+    if credentials is None:
+        return None
+    return await get_current_user(credentials)
+
 
 def require_role(required_role: str):
-    def role_checker(user=Depends(get_current_user)):
+    async def role_checker(user=Depends(get_current_user)):
         if user.get("role") != required_role:
             raise HTTPException(
                 status_code=status.HTTP_403_FORBIDDEN,
@@ -34,3 +121,55 @@ def require_role(required_role: str):
             )
         return user
     return role_checker
+
+
+def profile_claims(db: Session, user_id: str, role: str) -> dict:
+    """{"patient_id": ...} / {"doctor_id": ...} for embedding in a new token."""
+    if role not in PROFILE_CLAIMS:
+        return {}
+
+    claim, model = PROFILE_CLAIMS[role]
+    row = db.query(model.id).filter(model.user_id == user_id).first()
+    return {claim: row.id} if row else {}
+
+
+def resolve_profile(db: Session, user: dict):
+    """
+    Patient / doctor profile id of the principal, or None. Tokens from
+    /auth/login carry it; older tokens (or a profile created after login)
+    are looked up once and the id is kept on the cached principal.
+    """
+    role = user.get("role")
+    if role not in PROFILE_CLAIMS:
+        return None
+
+    claim, _ = PROFILE_CLAIMS[role]
+    if not user.get(claim):
+        user.update(profile_claims(db, user["sub"], role))
+    return user.get(claim)
+
+
+def _lookup_profile(user: dict):
+    db = SessionLocal()
+    try:
+        return resolve_profile(db, user)
+    finally:
+        db.close()
+
+
+def require_profile(role: str):
+    """The principal for `role`, with "patient_id" / "doctor_id" resolved."""
+    async def resolve(user=Depends(require_role(role))):
+        claim, _ = PROFILE_CLAIMS[role]
+        # Only tokens issued without the claim need the database
+        if not user.get(claim) and not await run_in_threadpool(_lookup_profile, user):
+            raise HTTPException(
+                status_code=400,
+                detail=f"{role.title()} profile not found"
+            )
+        return user
+    return resolve
+
+
+require_patient = require_profile("PATIENT")
+require_doctor = require_profile("DOCTOR")
@@ -1,21 +1,238 @@
-from sqlalchemy import create_engine
+import threading
+import time
+from contextlib import contextmanager
+
+from fastapi.concurrency import run_in_threadpool
+from sqlalchemy import create_engine, event
+from sqlalchemy.engine import make_url
+from sqlalchemy.exc import TimeoutError as PoolTimeout
 from sqlalchemy.orm import sessionmaker, declarative_base
+from sqlalchemy.pool import AsyncAdaptedQueuePool, QueuePool
 import os
 
+from .config import (
+    DB_ASYNC,
+    DB_MAX_OVERFLOW,
+    DB_POOL_PRE_PING,
+    DB_POOL_RECYCLE,
+    DB_POOL_SIZE,
+    DB_POOL_TIMEOUT,
+    SQLITE_BUSY_TIMEOUT_MS,
+    SQLITE_MMAP_MB,
+    SQLITE_PRODUCTION_MODE,
+)
+
 DATABASE_URL = os.getenv(
     "DATABASE_URL",
     "sqlite:///./healthsphere.db"  # fallback for local
 )
 
+# Async driver for each backend when DB_ASYNC is on
+ASYNC_DRIVERS = {"sqlite": "aiosqlite", "postgresql": "asyncpg"}
+
+
+# =========================
+# POOL METRICS
+# =========================
+class PoolMeter:
+    """Checkout counts and time spent waiting for a pooled connection."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.waiting = 0
+        self.checkouts = 0
+        self.timeouts = 0
+        self.wait_seconds = 0.0
+        self.max_wait_seconds = 0.0
+
+    def enter(self):
+        with self._lock:
+            self.waiting += 1
+
+    def leave(self, waited: float, timed_out: bool):
+        with self._lock:
+            self.waiting -= 1
+            if timed_out:
+                self.timeouts += 1
+            else:
+                self.checkouts += 1
+                self.wait_seconds += waited
+                self.max_wait_seconds = max(self.max_wait_seconds, waited)
+
+    def stats(self, pool) -> dict:
+        return {
+            "size": pool.size(),
+            "checked_out": pool.checkedout(),
+            "overflow": max(0, pool.overflow()),
+            "waiting": self.waiting,
+            "checkouts": self.checkouts,
+            "timeouts": self.timeouts,
+            "avg_wait_ms": round(1000 * self.wait_seconds / self.checkouts, 3) if self.checkouts else 0.0,
+            "max_wait_ms": round(1000 * self.max_wait_seconds, 3)
+        }
+
+
+class _MeteredPool:
+    meter: PoolMeter
+
+    def _do_get(self):
+        start = time.perf_counter()
+        self.meter.enter()
+        timed_out = False
+        try:
+            return super()._do_get()
+        except PoolTimeout:
+            timed_out = True
+            raise
+        finally:
+            self.meter.leave(time.perf_counter() - start, timed_out)
+
+
+# One meter per engine; pools rebuilt by dispose() keep counting into it
+class MeteredQueuePool(_MeteredPool, QueuePool):
+    meter = PoolMeter()
+
+
+class MeteredAsyncPool(_MeteredPool, AsyncAdaptedQueuePool):
+    meter = PoolMeter()
+
+
+def _is_sqlite_file(url) -> bool:
+    return url.get_backend_name() == "sqlite" and url.database not in (None, "", ":memory:")
+
+
+def _pool_options(url) -> dict:
+    if url.get_backend_name() == "sqlite" and not _is_sqlite_file(url):
+        return {}  # in-memory SQLite must stay on its single connection
+    return {
+        "pool_size": DB_POOL_SIZE,
+        "max_overflow": DB_MAX_OVERFLOW,
+        "pool_timeout": DB_POOL_TIMEOUT,
+        "pool_recycle": DB_POOL_RECYCLE,
+        "pool_pre_ping": DB_POOL_PRE_PING,
+    }
+
+
+_url = make_url(DATABASE_URL)
+_sync_pool = _pool_options(_url)
+
 engine = create_engine(
     DATABASE_URL,
-    connect_args={"check_same_thread": False} if DATABASE_URL.startswith("sqlite") else {}
+    connect_args={"check_same_thread": False} if DATABASE_URL.startswith("sqlite") else {},
+    **({"poolclass": MeteredQueuePool, **_sync_pool} if _sync_pool else {})
 )
 
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
+
+# =========================
+# SQLITE PRODUCTION MODE
+# =========================
+# Single-writer queue (app.write_queue) is used when this is on
+SQLITE_TUNED = SQLITE_PRODUCTION_MODE and _is_sqlite_file(_url)
+
+
+def _sqlite_pragmas(dbapi_connection):
+    cursor = dbapi_connection.cursor()
+    cursor.execute("PRAGMA journal_mode=WAL")
+    cursor.execute("PRAGMA synchronous=NORMAL")
+    cursor.execute(f"PRAGMA mmap_size={SQLITE_MMAP_MB * 1024 * 1024}")
+    cursor.execute(f"PRAGMA busy_timeout={SQLITE_BUSY_TIMEOUT_MS}")
+    cursor.close()
+
+
+def _sqlite_connect(dbapi_connection, _):
+    _sqlite_pragmas(dbapi_connection)
+
+
+def _sqlite_begin(conn):
+    dbapi_connection = conn.connection.dbapi_connection
+    if conn.get_execution_options().get("sqlite_immediate"):
+        # The writer takes the write lock up front and lets SQLAlchemy emit
+        # BEGIN, so its per-write SAVEPOINTs nest inside one transaction
+        dbapi_connection.isolation_level = None
+        conn.exec_driver_sql("BEGIN IMMEDIATE")
+    else:
+        # Everyone else keeps pysqlite's implicit BEGIN before the first
+        # write: a WAL transaction that read first cannot upgrade to a write
+        # once another commit landed, and fails without waiting
+        dbapi_connection.isolation_level = ""
+
+
+if SQLITE_TUNED:
+    event.listen(engine, "connect", _sqlite_connect)
+    event.listen(engine, "begin", _sqlite_begin)
+
+# Sessions for the single writer (BEGIN IMMEDIATE in SQLite mode)
+WriterSession = sessionmaker(
+    autocommit=False,
+    autoflush=False,
+    bind=engine.execution_options(sqlite_immediate=True)
+)
+
 Base = declarative_base()
 
+
+# =========================
+# ASYNC ENGINE (DB_ASYNC)
+# =========================
+def _async_url(url):
+    driver = ASYNC_DRIVERS.get(url.get_backend_name())
+    if driver is None:
+        raise RuntimeError(f"DB_ASYNC has no async driver for {url.get_backend_name()}")
+    return url.set(drivername=f"{url.get_backend_name()}+{driver}")
+
+
+async_engine = None
+AsyncSessionLocal = None
+
+if DB_ASYNC:
+    from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+
+    _async_pool = _pool_options(_url)
+    try:
+        async_engine = create_async_engine(
+            os.getenv("ASYNC_DATABASE_URL") or _async_url(_url),
+            **({"poolclass": MeteredAsyncPool, **_async_pool} if _async_pool else {})
+        )
+    except ImportError as exc:
+        raise RuntimeError(
+            "DB_ASYNC=true requires sqlalchemy[asyncio] and the driver "
+            f"(pip install aiosqlite / asyncpg): {exc}"
+        )
+    if SQLITE_TUNED:
+        event.listen(
+            async_engine.sync_engine, "connect",
+            lambda dbapi_connection, _: _sqlite_pragmas(dbapi_connection)
+        )
+    AsyncSessionLocal = async_sessionmaker(async_engine, autoflush=False, expire_on_commit=False)
+
+
+def pool_stats() -> dict:
+    stats = {}
+    if isinstance(engine.pool, MeteredQueuePool):
+        stats["sync"] = MeteredQueuePool.meter.stats(engine.pool)
+    if async_engine is not None and isinstance(async_engine.sync_engine.pool, MeteredAsyncPool):
+        stats["async"] = MeteredAsyncPool.meter.stats(async_engine.sync_engine.pool)
+    return stats
+
+
+@contextmanager
+def unit_of_work(db):
+    """
+    One transaction for one logical operation: commits once at the end,
+    rolls everything back if any step (including non-DB work) raises.
+    Assign primary keys client-side inside it, rather than flushing or
+    refreshing to learn them.
+    """
+    try:
+        yield db
+        db.commit()
+    except BaseException:
+        db.rollback()
+        raise
+
+
 # ✅ THIS WAS MISSING OR BROKEN
 def get_db():
     db = SessionLocal()
@@ -23,3 +240,44 @@ def get_db():
         yield db
     finally:
         db.close()
+
+
+def _read_alone(fn, args):
+    db = SessionLocal()
+    try:
+        return fn(db, *args)
+    finally:
+        db.close()
+
+
+class Reader:
+    """
+    Session handle for async read handlers. Query functions are written
+    against a plain Session; with DB_ASYNC they run on the async engine
+    (no worker thread held while waiting on the database), otherwise in the
+    threadpool on a session opened and closed by that same call, so no
+    connection is held while the handler waits for a thread.
+    """
+
+    def __init__(self):
+        self._session = None
+
+    async def run(self, fn, *args):
+        if AsyncSessionLocal is None:
+            return await run_in_threadpool(_read_alone, fn, args)
+
+        if self._session is None:
+            self._session = AsyncSessionLocal()
+        return await self._session.run_sync(fn, *args)
+
+    async def close(self):
+        if self._session is not None:
+            await self._session.close()
+
+
+async def get_reader():
+    reader = Reader()
+    try:
+        yield reader
+    finally:
+        await reader.close()
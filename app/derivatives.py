@@ -0,0 +1,145 @@
+"""
+Thumbnails and web previews for image uploads.
+
+Each image blob gets a small progressive JPEG ("<key>.thumb.jpg") for list
+views and a larger WebP ("<key>.preview.webp") for the review screen,
+stored next to the blob. They are rendered on a small background pool
+after upload; X-rays reuse the image already decoded for inference. A
+request for a derivative that is not there yet renders it on the spot.
+
+    python -m app.derivatives   # backfill derivatives for existing blobs
+"""
+import os
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+
+from PIL import Image
+
+from .blobstore import blob_store, key_of, original_key
+from .config import (
+    DERIVATIVE_QUALITY,
+    DERIVATIVE_WORKERS,
+    PREVIEW_MAX_PX,
+    THUMBNAIL_MAX_PX,
+    UPLOAD_SESSION_DIR,
+)
+
+# variant -> (longest side, PIL format, key suffix, save options)
+VARIANTS = {
+    "thumbnail": (THUMBNAIL_MAX_PX, "JPEG", ".thumb.jpg", {"progressive": True, "optimize": True}),
+    "preview": (PREVIEW_MAX_PX, "WEBP", ".preview.webp", {"method": 4}),
+}
+IMAGE_EXTENSIONS = (".png", ".jpg", ".jpeg", ".bmp", ".gif", ".webp", ".tif", ".tiff")
+
+_pool = ThreadPoolExecutor(max_workers=DERIVATIVE_WORKERS, thread_name_prefix="derivatives")
+
+
+def is_image(key: str) -> bool:
+    return key.lower().endswith(IMAGE_EXTENSIONS)
+
+
+def derivative_key(key: str, variant: str) -> str:
+    return key + VARIANTS[variant][2]
+
+
+def _render(image: Image.Image, variant: str, key: str):
+    max_px, fmt, _, options = VARIANTS[variant]
+
+    scale = min(1.0, max_px / max(image.size))
+    size = (max(1, round(image.width * scale)), max(1, round(image.height * scale)))
+    # resize() returns a new image, so the caller's copy (possibly still in
+    # use by inference) is left untouched
+    small = image.resize(size, Image.Resampling.LANCZOS)
+    if small.mode not in ("L", "RGB"):
+        small = small.convert("RGB")
+
+    os.makedirs(UPLOAD_SESSION_DIR, exist_ok=True)
+    staged = os.path.join(UPLOAD_SESSION_DIR, f"{uuid.uuid4()}.derivative.part")
+    small.save(staged, fmt, quality=DERIVATIVE_QUALITY, **options)
+    blob_store.put_file(staged, derivative_key(key, variant))
+
+
+def generate(key: str, image: Image.Image = None, variants=tuple(VARIANTS)):
+    """Render the missing derivatives of blob `key`, decoding it if no image is given."""
+    missing = [v for v in variants if not blob_store.exists(derivative_key(key, v))]
+    if not missing:
+        return
+
+    if image is not None:
+        # The caller's decoded copy; it owns (and closes) it
+        for variant in missing:
+            _render(image, variant, key)
+        return
+
+    with Image.open(blob_store.local_path(key)) as source:
+        # JPEG can decode straight at a reduced scale
+        source.draft(None, (PREVIEW_MAX_PX, PREVIEW_MAX_PX))
+        for variant in missing:
+            _render(source, variant, key)
+
+
+def _generate_quietly(key: str, image: Image.Image = None):
+    try:
+        generate(key, image)
+    except Exception:
+        pass  # rendered on demand by /files if it is ever requested
+
+
+def schedule(key: str, image: Image.Image = None):
+    if key and is_image(key):
+        _pool.submit(_generate_quietly, key, image)
+
+
+def ensure(key: str) -> bool:
+    """Make sure derivative `key` exists; False if it is not a derivative of an image."""
+    source = original_key(key)
+    variant = next(
+        (v for v in VARIANTS if key == derivative_key(source, v)),
+        None
+    )
+    if variant is None or not is_image(source) or not blob_store.exists(source):
+        return False
+
+    generate(source, variants=(variant,))
+    return True
+
+
+def urls(path: str) -> dict:
+    """thumbnail_url / preview_url for a stored path (None for non-images)."""
+    from .file_delivery import signed_url
+
+    key = key_of(path)
+    if not key or not is_image(key):
+        return {"thumbnail_url": None, "preview_url": None}
+    return {
+        "thumbnail_url": signed_url(derivative_key(key, "thumbnail")),
+        "preview_url": signed_url(derivative_key(key, "preview")),
+    }
+
+
+def backfill(db) -> int:
+    from .models import Blob
+
+    done = 0
+    for (key,) in db.query(Blob.key).filter(Blob.refcount > 0):
+        if is_image(key):
+            try:
+                generate(key)
+                done += 1
+            except Exception as exc:
+                print(f"FAILED {key}: {exc}")
+    return done
+
+
+def main():
+    from .database import SessionLocal
+
+    db = SessionLocal()
+    try:
+        print(f"{backfill(db)} image blobs have derivatives")
+    finally:
+        db.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,115 @@
+"""
+Delivery of stored blobs: access checks, short-lived signed URLs and
+responses with strong ETags, Range support and immutable caching.
+
+Blob keys embed the SHA-256 of the content, so the ETag is known without
+touching the file and a URL never changes meaning once issued.
+"""
+import hashlib
+import hmac
+import os
+import re
+import time
+from urllib.parse import quote
+
+from fastapi import HTTPException, Request, Response
+from fastapi.responses import FileResponse
+from fastapi.staticfiles import StaticFiles
+from sqlalchemy.orm import Session
+
+from . import derivatives
+from .blobstore import blob_path, blob_store, key_of, original_key
+from .config import FILE_ACCEL_REDIRECT_PREFIX, FILE_URL_TTL_SECONDS, SERVE_UPLOADS_MOUNT
+from .core.security import SECRET_KEY
+from .models import AIPrediction, MedicalRecord, Patient
+
+KEY_PATTERN = re.compile(
+    r"^[0-9a-f]{2}/[0-9a-f]{2}/([0-9a-f]{64})(\.[a-z0-9]{1,8})?(\.thumb\.jpg|\.preview\.webp)?$"
+)
+IMMUTABLE = "private, max-age=31536000, immutable"
+
+
+def _signature(key: str, expires: int) -> str:
+    message = f"files:{key}:{expires}".encode()
+    return hmac.new((SECRET_KEY or "").encode(), message, hashlib.sha256).hexdigest()
+
+
+def signed_url(key: str, now: float = None) -> str:
+    # Expiry is rounded to a TTL window so the URL (and the browser cache
+    # entry behind it) stays the same across page loads within the window
+    now = time.time() if now is None else now
+    expires = (int(now) // FILE_URL_TTL_SECONDS + 2) * FILE_URL_TTL_SECONDS
+    return f"/files/{quote(key)}?expires={expires}&signature={_signature(key, expires)}"
+
+
+def file_url(path: str):
+    """URL for a stored file_path / image_path, as returned in listings."""
+    key = key_of(path)
+    if key:
+        return signed_url(key)
+    return f"/{path}" if SERVE_UPLOADS_MOUNT else None
+
+
+class LegacyUploads(StaticFiles):
+    """
+    The legacy /uploads mount. It has no access control, so it only serves
+    uuid-named uploads; the blob store under it is reachable via /files.
+    """
+
+    async def get_response(self, path: str, scope):
+        if path.replace(os.sep, "/").split("/", 1)[0].lower() == "blobs":
+            raise HTTPException(status_code=404, detail="Not Found")
+        return await super().get_response(path, scope)
+
+
+def has_valid_signature(key: str, expires: int, signature: str) -> bool:
+    if expires is None or not signature or expires < time.time():
+        return False
+    return hmac.compare_digest(signature, _signature(key, expires))
+
+
+def check_key(key: str) -> str:
+    """Validated strong ETag value for a blob or derivative key."""
+    match = KEY_PATTERN.match(key)
+    if not match:
+        raise HTTPException(status_code=404, detail="File not found")
+    return match.group(1) + (match.group(3) or "")
+
+
+def can_read(db: Session, user, key: str) -> bool:
+    """Patients read blobs of their own records; doctors and admins any referenced blob."""
+    path = blob_path(original_key(key))
+    records = db.query(MedicalRecord.id).filter(MedicalRecord.file_path == path)
+    predictions = db.query(AIPrediction.id).filter(AIPrediction.image_path == path)
+
+    if user.get("role") == "PATIENT":
+        records = records.join(Patient).filter(Patient.user_id == user["sub"])
+        predictions = predictions.join(Patient).filter(Patient.user_id == user["sub"])
+    elif user.get("role") not in ("DOCTOR", "ADMIN"):
+        return False
+
+    return records.first() is not None or predictions.first() is not None
+
+
+def blob_response(request: Request, key: str) -> Response:
+    headers = {"ETag": f'"{check_key(key)}"', "Cache-Control": IMMUTABLE}
+
+    if headers["ETag"] in request.headers.get("if-none-match", ""):
+        return Response(status_code=304, headers=headers)
+
+    if key != original_key(key) and not blob_store.exists(key):
+        # Thumbnail / preview requested before the background job got to it
+        derivatives.ensure(key)
+
+    if FILE_ACCEL_REDIRECT_PREFIX:
+        # nginx serves the file itself (sendfile, ranges); we only authorize
+        headers["X-Accel-Redirect"] = FILE_ACCEL_REDIRECT_PREFIX + key
+        return Response(headers=headers)
+
+    path = blob_store.local_path(key)
+    if not os.path.exists(path):
+        raise HTTPException(status_code=404, detail="File not found")
+
+    # FileResponse answers Range / If-Range and uses the server's
+    # zero-copy path send extension when one is available
+    return FileResponse(path, headers=headers)
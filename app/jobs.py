@@ -0,0 +1,158 @@
+import asyncio
+from datetime import datetime, timedelta
+
+from fastapi.concurrency import run_in_threadpool
+from sqlalchemy.orm import Session
+
+from .config import PREDICTION_JOB_CONCURRENCY, PREDICTION_JOB_LEASE_SECONDS
+from .core.executors import inference_pool
+from .database import SessionLocal
+from .ml.tasks import predict as run_prediction
+from .ml import probabilities
+from .models import AIPrediction
+from .blobstore import key_of
+from .uploads import disk_path
+from .write_queue import write_queue
+
+TERMINAL_STATES = ("DONE", "FAILED")
+
+
+def result_columns(ai_output: dict) -> dict:
+    """AIPrediction column values for a model output."""
+    return {
+        "probabilities": probabilities.encode(ai_output["probabilities"]),
+        "model_version": ai_output["model_version"],
+    }
+
+
+def _claimed(db: Session, prediction_id: str, claimed_at: datetime):
+    query = db.query(AIPrediction).filter(AIPrediction.id == prediction_id)
+    if claimed_at is not None:
+        # Only the holder of the claim may close the job
+        query = query.filter(
+            AIPrediction.status == "RUNNING",
+            AIPrediction.claimed_at == claimed_at
+        )
+    return query
+
+
+# These run inside the caller's transaction (see write_queue.run)
+def claim_prediction(db: Session, prediction_id: str, claimed_at: datetime) -> bool:
+    """Move a QUEUED job to RUNNING; False if another worker got it first."""
+    return db.query(AIPrediction).filter(
+        AIPrediction.id == prediction_id,
+        AIPrediction.status == "QUEUED"
+    ).update(
+        {"status": "RUNNING", "claimed_at": claimed_at}, synchronize_session=False
+    ) == 1
+
+
+def save_prediction_results(db: Session, prediction_id: str, ai_output: dict,
+                            claimed_at: datetime = None):
+    # Store the probability vector and close the job
+    _claimed(db, prediction_id, claimed_at).update(
+        {"status": "DONE", "error": None, **result_columns(ai_output)},
+        synchronize_session=False
+    )
+
+
+def set_prediction_status(db: Session, prediction_id: str, status: str, error: str = None,
+                          claimed_at: datetime = None):
+    _claimed(db, prediction_id, claimed_at).update(
+        {"status": status, "error": error}, synchronize_session=False
+    )
+
+
+def release_stale_claims(db: Session, lease_seconds: int = PREDICTION_JOB_LEASE_SECONDS) -> int:
+    """Put RUNNING jobs whose claim is older than the lease back in the queue."""
+    cutoff = datetime.utcnow() - timedelta(seconds=lease_seconds)
+    return db.query(AIPrediction).filter(
+        AIPrediction.status == "RUNNING",
+        (AIPrediction.claimed_at < cutoff) | AIPrediction.claimed_at.is_(None)
+    ).update({"status": "QUEUED", "claimed_at": None}, synchronize_session=False)
+
+
+class PredictionJobQueue:
+    """
+    Background workers for queued X-ray predictions. Jobs are persisted as
+    AIPrediction rows with status QUEUED, so unfinished ones are picked up
+    again by recover() after a restart. Several processes may queue the
+    same job; a worker claims it (QUEUED -> RUNNING) before scoring, and
+    only the claim's holder writes the result. A claim older than
+    PREDICTION_JOB_LEASE_SECONDS is treated as abandoned by a dead worker.
+    """
+
+    def __init__(self, concurrency: int = 4):
+        self.concurrency = max(1, concurrency)
+        self._queue = None
+        self._workers = []
+
+    def _ensure_started(self):
+        if self._queue is None:
+            self._queue = asyncio.Queue()
+            self._workers = [
+                asyncio.create_task(self._worker())
+                for _ in range(self.concurrency)
+            ]
+
+    def enqueue(self, prediction_id: str, image_path: str):
+        """`image_path` is the stored "uploads/..." path of the X-ray."""
+        self._ensure_started()
+        self._queue.put_nowait((prediction_id, image_path))
+
+    async def recover(self):
+        """Re-queue QUEUED jobs, and RUNNING ones whose worker's lease ran out."""
+        await write_queue.run(release_stale_claims)
+
+        def _pending():
+            db = SessionLocal()
+            try:
+                return (
+                    db.query(AIPrediction.id, AIPrediction.image_path)
+                    .filter(AIPrediction.status == "QUEUED")
+                    .order_by(AIPrediction.created_at)
+                    .all()
+                )
+            finally:
+                db.close()
+
+        for prediction_id, image_path in await run_in_threadpool(_pending):
+            self.enqueue(prediction_id, image_path)
+
+    async def _worker(self):
+        while True:
+            prediction_id, image_path = await self._queue.get()
+            try:
+                claimed_at = datetime.utcnow()
+                if await write_queue.run(claim_prediction, prediction_id, claimed_at):
+                    await self._process(prediction_id, image_path, claimed_at)
+            except Exception:
+                # A job write failed: the row stays QUEUED, or RUNNING until
+                # its lease runs out, and the next recover() picks it up
+                pass
+            finally:
+                self._queue.task_done()
+
+    async def _process(self, prediction_id: str, image_path: str, claimed_at: datetime):
+        try:
+            local_path = await run_in_threadpool(disk_path, image_path)
+
+            # Interactive requests may have the pool saturated; wait our turn
+            ai_output = await inference_pool.run(
+                run_prediction, local_path, derivatives_key=key_of(image_path), wait=True
+            )
+        except Exception as exc:
+            await write_queue.run(
+                set_prediction_status, prediction_id, "FAILED", str(exc), claimed_at
+            )
+        else:
+            await write_queue.run(save_prediction_results, prediction_id, ai_output, claimed_at)
+
+    def stats(self) -> dict:
+        return {
+            "concurrency": self.concurrency,
+            "queued": self._queue.qsize() if self._queue else 0,
+        }
+
+
+job_queue = PredictionJobQueue(PREDICTION_JOB_CONCURRENCY)
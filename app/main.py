@@ -1,6 +1,5 @@
 import uuid
 from fastapi import UploadFile, File
-import shutil
 import os
 from .models import MedicalRecord
 from fastapi.middleware.cors import CORSMiddleware
@@ -12,7 +11,7 @@ from sqlalchemy.orm import Session
 from dotenv import load_dotenv
 load_dotenv()
 
-from .database import Base, engine, SessionLocal
+from .database import engine, SessionLocal
 from .models import User
 from .schemas import UserCreate, UserLogin, Token
 from .auth import hash_password, verify_password, create_access_token
@@ -42,11 +41,31 @@ from .models import Appointment, Bed, BedAllocation, BedStatus
 from .schemas import BedStatusCreate
 
 
-from .ml.predictor import predict_xray
-from .models import AIPrediction, AIPredictionResult
+from .ml.registry import model_registry
+from .ml.tasks import model_status, predict as run_prediction
+from .config import MODEL_PRELOAD, INFERENCE_POOL
+from .core.executors import inference_pool, auth_pool
+from .core.response_cache import response_cache
+from .core.periodic import PeriodicTask
+from fastapi import Request
+from fastapi.concurrency import run_in_threadpool
+from fastapi.encoders import jsonable_encoder
+from fastapi.responses import StreamingResponse
+from .config import PREDICTION_EVENTS_POLL_SECONDS, BATCH_PREDICT_MAX_FILES
+from .jobs import (
+    job_queue,
+    result_columns,
+    save_prediction_results,
+    set_prediction_status,
+    TERMINAL_STATES
+)
+import asyncio
+import json
+import zipfile
+from .models import AIPrediction
+from .ml import probabilities
 from .schemas import AIPredictionResponse
 from .schemas import AIPredictionDoctorView
-from fastapi.staticfiles import StaticFiles
 
 from fastapi import HTTPException, Depends
 from sqlalchemy.orm import Session
@@ -57,13 +76,40 @@ from .auth import hash_password
 from .core.security import get_current_user
 from typing import List
 from sqlalchemy import func
+from sqlalchemy.orm import selectinload
+from .pagination import paginate, page_size
+from .migrations import run_migrations
+from . import stats
+from . import analytics
+from .config import STATS_RECONCILE_SECONDS
+from .config import DEFAULT_PAGE_SIZE
+from .bed_inventory import bed_inventory
+from .slots import slot_calendar, ACTIVE_STATUSES
+from .config import MAX_FREE_SLOT_DAYS
+from sqlalchemy.exc import IntegrityError
+from . import uploads
+from . import blobstore
+from .config import BLOB_GC_SECONDS, SERVE_UPLOADS_MOUNT
+from . import file_delivery
+from . import derivatives
+from .file_delivery import file_url
+from .core.security import get_optional_user, require_patient, require_doctor, resolve_profile
+from .core.security import principal_cache, profile_claims
+from .models import UploadSession
+from .config import UPLOAD_CHUNK_BYTES, UPLOAD_DIR
+from .database import Reader, get_reader, pool_stats, unit_of_work
+from .write_queue import write_queue
+
+
+
+run_migrations(engine)
 
 
+app = FastAPI(title="HealthSphere API")
 
-Base.metadata.create_all(bind=engine)
-
+# 📏 Reject oversized uploads before their body is read (CORS wraps it)
+app.add_middleware(uploads.UploadLimitMiddleware)
 
-app = FastAPI(title="HealthSphere API")
 app.add_middleware(
     CORSMiddleware,
     allow_origins=[
@@ -79,34 +125,88 @@ app.add_middleware(
 )
 
 
-os.makedirs("uploads", exist_ok=True)
-app.mount("/uploads", StaticFiles(directory="uploads"), name="uploads")
+_worker_warmups = []
 
 
-def get_db():
-    db = SessionLocal()
-    try:
-        yield db
-    finally:
-        db.close()
+@app.on_event("startup")
+def preload_model():
+    # Routes that don't use the model never wait for it
+    if not MODEL_PRELOAD:
+        return
+    if INFERENCE_POOL == "process":
+        # Each worker process loads its own copy in the pool initializer
+        _worker_warmups[:] = [
+            inference_pool.submit(model_status)
+            for _ in range(inference_pool.workers)
+        ]
+    else:
+        model_registry.preload()
 
 
+@app.on_event("startup")
+async def resume_prediction_jobs():
+    await job_queue.recover()
 
 
-@app.post("/auth/register")
-def register(user: UserCreate, db: Session = Depends(get_db)):
+def inference_model_status():
+    if INFERENCE_POOL != "process" or not _worker_warmups:
+        return model_registry.status()
+
+    done = [f for f in _worker_warmups if f.done() and not f.exception()]
+    statuses = [f.result() for f in done]
+    if len(statuses) == len(_worker_warmups) and all(s["ready"] for s in statuses):
+        return {**statuses[0], "workers": len(statuses)}
+    return {"state": "LOADING", "ready": False, "workers": len(statuses)}
+
+
+@app.get("/health")
+def health():
+    return {
+        "status": "ok",
+        "model": inference_model_status(),
+        "executors": {
+            "inference": inference_pool.stats(),
+            "auth": auth_pool.stats()
+        },
+        "response_cache": response_cache.stats(),
+        "principal_cache": principal_cache.stats(),
+        "db_pool": pool_stats(),
+        "write_queue": write_queue.stats(),
+        "periodic_tasks": {
+            task.name: task.stats() for task in (stats_reconciler, blob_gc)
+        }
+    }
+
+
+@app.get("/health/ready")
+def readiness():
+    model = inference_model_status()
+    if not model["ready"]:
+        raise HTTPException(status_code=503, detail=model)
+    return {"status": "ready"}
+
+
+# Legacy direct file access to uuid-named uploads, no access control;
+# blobs are only served by /files/{key}
+if SERVE_UPLOADS_MOUNT:
+    os.makedirs(UPLOAD_DIR, exist_ok=True)
+    app.mount("/uploads", file_delivery.LegacyUploads(directory=UPLOAD_DIR), name="uploads")
+
+
+def _create_user(db: Session, user: UserCreate, password_hash: str):
     if db.query(User).filter(User.email == user.email).first():
         raise HTTPException(status_code=400, detail="Email already exists")
 
+    # Ids are assigned here, so the user and its profile go in one transaction
     new_user = User(
+        id=str(uuid.uuid4()),
         name=user.name,
         email=user.email,
-        password_hash=hash_password(user.password),
+        password_hash=password_hash,
         role=user.role
     )
     db.add(new_user)
-    db.commit()
-    db.refresh(new_user)
+    stats.bump(db, total_users=1, **stats.role_deltas(new_role=user.role))
 
     # ✅ AUTO-CREATE PROFILES
     if new_user.role == "PATIENT":
@@ -122,20 +222,33 @@ def register(user: UserCreate, db: Session = Depends(get_db)):
             )
         )
 
-    db.commit()
+
+@app.post("/auth/register")
+async def register(user: UserCreate):
+    # bcrypt runs on the auth pool, the insert on the single writer
+    password_hash = await auth_pool.run(hash_password, user.password)
+    await write_queue.run(_create_user, user, password_hash)
+    if user.role == "DOCTOR":
+        response_cache.invalidate("doctors")
     return {"message": "User registered successfully"}
 
 
 
 @app.post("/auth/login", response_model=Token)
-def login(user: UserLogin, db: Session = Depends(get_db)):
-    db_user = db.query(User).filter(User.email == user.email).first()
+async def login(user: UserLogin, db: Session = Depends(get_db)):
+    db_user = await run_in_threadpool(
+        lambda: db.query(User).filter(User.email == user.email).first()
+    )
 
-    if not db_user or not verify_password(user.password, db_user.password_hash):
+    if not db_user or not await auth_pool.run(
+        verify_password, user.password, db_user.password_hash
+    ):
         raise HTTPException(status_code=401, detail="Invalid credentials")
 
+    # 🪪 Profile id rides in the token so handlers skip the Patient/Doctor lookup
+    claims = await run_in_threadpool(profile_claims, db, db_user.id, db_user.role)
     access_token = create_access_token(
-        {"sub": str(db_user.id), "role": db_user.role}
+        {"sub": str(db_user.id), "role": db_user.role, **claims}
     )
 
     return {
@@ -150,12 +263,14 @@ def login(user: UserLogin, db: Session = Depends(get_db)):
     }
 
 @app.get("/auth/me")
-def get_me(user=Depends(get_current_user), db: Session = Depends(get_db)):
+async def get_me(user=Depends(get_current_user), db: Reader = Depends(get_reader)):
     """
     Returns currently logged-in user's full profile
     """
 
-    db_user = db.query(User).filter(User.id == user["sub"]).first()
+    db_user = await db.run(
+        lambda session: session.query(User).filter(User.id == user["sub"]).first()
+    )
 
     if not db_user:
         raise HTTPException(status_code=404, detail="User not found")
@@ -169,19 +284,26 @@ def get_me(user=Depends(get_current_user), db: Session = Depends(get_db)):
 
 @app.get("/admin/users")
 def get_all_users(
+    limit: int = DEFAULT_PAGE_SIZE,
+    cursor: str = None,
     user=Depends(require_role("ADMIN")),
     db: Session = Depends(get_db)
 ):
-    users = db.query(User).all()
-    return [
-        {
-            "id": u.id,
-            "name": u.name,
-            "email": u.email,
-            "role": u.role
-        }
-        for u in users
-    ]
+    users, next_cursor = paginate(
+        db.query(User), User.created_at, User.id, limit, cursor
+    )
+    return {
+        "items": [
+            {
+                "id": u.id,
+                "name": u.name,
+                "email": u.email,
+                "role": u.role
+            }
+            for u in users
+        ],
+        "next_cursor": next_cursor
+    }
 
 
 @app.post("/patients/profile")
@@ -213,6 +335,7 @@ def create_doctor_profile(
     )
     db.add(doctor)
     db.commit()
+    response_cache.invalidate("doctors")
     return {"message": "Doctor profile created"}
 
 
@@ -230,6 +353,7 @@ def update_user_role(
     if not user:
         raise HTTPException(status_code=404, detail="User not found")
 
+    stats.bump(db, **stats.role_deltas(user.role, role))
     user.role = role
     # ✅ CREATE DOCTOR PROFILE IF ROLE = DOCTOR
     if role == "DOCTOR":
@@ -243,29 +367,33 @@ def update_user_role(
             )
             db.add(doctor)
     db.commit()
+    response_cache.invalidate("doctors")
 
     return {"message": f"Role updated to {role}"}
 
 @app.get("/doctors")
-def list_doctors(db: Session = Depends(get_db)):
-    doctors = (
-        db.query(Doctor, User)
-        .join(User, Doctor.user_id == User.id)
-        .filter(Doctor.specialization.isnot(None))
-        .all()
-    )
+def list_doctors(request: Request, db: Session = Depends(get_db)):
+    def build():
+        doctors = (
+            db.query(Doctor, User)
+            .join(User, Doctor.user_id == User.id)
+            .filter(Doctor.specialization.isnot(None))
+            .all()
+        )
 
-    return [
-        {
-            "doctor_id": d.id,
-            "name": u.name,
-            "email": u.email,
-            "specialization": d.specialization,
-            "experience_years": d.experience_years,
-            "availability_status": d.availability_status
-        }
-        for d, u in doctors
-    ]
+        return [
+            {
+                "doctor_id": d.id,
+                "name": u.name,
+                "email": u.email,
+                "specialization": d.specialization,
+                "experience_years": d.experience_years,
+                "availability_status": d.availability_status
+            }
+            for d, u in doctors
+        ]
+
+    return response_cache.respond(request, "doctors", build)
 
 
 # @app.post("/appointments/book")
@@ -288,56 +416,44 @@ def list_doctors(db: Session = Depends(get_db)):
 #     return {"message": "Appointment booked"}
 
 
-@app.post("/medvault/upload")
-def upload_medical_record(
-    record_type: str,
-    file: UploadFile = File(...),
-    user=Depends(require_role("PATIENT")),
-    db: Session = Depends(get_db)
-):
-    patient = db.query(Patient).filter(Patient.user_id == user["sub"]).first()
-    if not patient:
-        raise HTTPException(status_code=400, detail="Patient profile not found")
-
-    BASE_DIR = os.path.dirname(os.path.abspath(__file__))
-    UPLOAD_DIR = os.path.join(BASE_DIR, "..", "uploads")
-    os.makedirs(UPLOAD_DIR, exist_ok=True)
-
-    filename = f"{uuid.uuid4()}_{file.filename}"
-    file_disk_path = os.path.join(UPLOAD_DIR, filename)
-
-    with open(file_disk_path, "wb") as buffer:
-        shutil.copyfileobj(file.file, buffer)
-
+def _create_medical_record(db: Session, patient_id: str, record_type: str, stored):
     record = MedicalRecord(
-        patient_id=patient.id,
+        id=str(uuid.uuid4()),
+        patient_id=patient_id,
         record_type=record_type,
-        file_path=f"uploads/{filename}"  # ✅ CRITICAL FIX
+        file_path=stored.path  # ✅ CRITICAL FIX
     )
 
     db.add(record)
-    db.commit()
+    blobstore.add_ref(db, stored.path, stored.size)
+    stats.bump(db, medvault_records=1)
+    return record.id
 
-    return {"message": "Medical record uploaded successfully"}
 
+@app.post("/medvault/upload")
+async def upload_medical_record(
+    record_type: str,
+    file: UploadFile = File(...),
+    user=Depends(require_patient)
+):
+    # 📦 Streamed to its final location, size-capped and hashed on the way
+    stored = await uploads.save_upload(file, "medvault")
+    await write_queue.run(_create_medical_record, user["patient_id"], record_type, stored)
+    derivatives.schedule(blobstore.key_of(stored.path))
 
+    return {"message": "Medical record uploaded successfully", "sha256": stored.sha256}
 
 
-@app.get("/medvault/records")
-def get_medical_records(
-    user=Depends(require_role("PATIENT")),
-    db: Session = Depends(get_db)
-):
-    patient = db.query(Patient).filter(
-        Patient.user_id == user["sub"]
-    ).first()
 
-    if not patient:
-        raise HTTPException(status_code=400, detail="Patient profile not found")
 
-    records = (
-        db.query(MedicalRecord)
-        .filter(MedicalRecord.patient_id == patient.id)
+@app.get("/medvault/records")
+async def get_medical_records(
+    user=Depends(require_patient),
+    db: Reader = Depends(get_reader)
+):
+    records = await db.run(
+        lambda session: session.query(MedicalRecord)
+        .filter(MedicalRecord.patient_id == user["patient_id"])
         .order_by(MedicalRecord.created_at.desc())
         .all()
     )
@@ -347,6 +463,8 @@ def get_medical_records(
             "id": r.id,
             "record_type": r.record_type,
             "file_path": r.file_path,
+            "file_url": file_url(r.file_path),
+            **derivatives.urls(r.file_path),
             "created_at": r.created_at,
         }
         for r in records
@@ -354,46 +472,42 @@ def get_medical_records(
 
 @app.get("/medvault/doctor/records")
 def doctor_view_records(
+    limit: int = DEFAULT_PAGE_SIZE,
+    cursor: str = None,
     user=Depends(require_role("DOCTOR")),
     db: Session = Depends(get_db)
 ):
-    records = (
+    records, next_cursor = paginate(
         db.query(MedicalRecord)
         .join(Patient)
-        .join(User, Patient.user_id == User.id)
-        .order_by(MedicalRecord.created_at.desc())
-        .all()
+        .join(User, Patient.user_id == User.id),
+        MedicalRecord.created_at,
+        MedicalRecord.id,
+        limit,
+        cursor
     )
 
-    return [
-        {
-            "id": r.id,
-            "record_type": r.record_type,
-            "file_path": r.file_path,
-            "created_at": r.created_at,
-            "patient_id": r.patient_id,
-        }
-        for r in records
-    ]
-
-
-@app.post("/medislot/appointments")
-def book_appointment(
-    appointment_date: date,
-    appointment_time: time,
-    doctor_id: str,
-    user=Depends(require_role("PATIENT")),
-    db: Session = Depends(get_db)
-):
-    patient = db.query(Patient).filter(
-        Patient.user_id == user["sub"]
-    ).first()
+    return {
+        "items": [
+            {
+                "id": r.id,
+                "record_type": r.record_type,
+                "file_path": r.file_path,
+                "file_url": file_url(r.file_path),
+                **derivatives.urls(r.file_path),
+                "created_at": r.created_at,
+                "patient_id": r.patient_id,
+            }
+            for r in records
+        ],
+        "next_cursor": next_cursor
+    }
 
-    if not patient:
-        raise HTTPException(400, "Patient profile not found")
 
+def _book_appointment(db: Session, patient_id: str, doctor_id: str,
+                      appointment_date: date, appointment_time: time):
     existing = db.query(Appointment).filter(
-        Appointment.patient_id == patient.id,
+        Appointment.patient_id == patient_id,
         Appointment.doctor_id == doctor_id,
         Appointment.status.in_(["PENDING", "APPROVED"])
     ).first()
@@ -404,17 +518,30 @@ def book_appointment(
             "You already have an active appointment with this doctor"
         )
 
+    if not slot_calendar.is_aligned(appointment_time):
+        raise HTTPException(400, "Appointment time must start on a slot boundary")
+    if not slot_calendar.in_hours(appointment_time):
+        raise HTTPException(400, "Appointment time is outside working hours")
+
+    slot = datetime.combine(appointment_date, appointment_time)
+    if slot_calendar.is_taken(db, doctor_id, slot):
+        raise HTTPException(409, "This slot is already booked")
+
     appointment = Appointment(
-        patient_id=patient.id,
+        patient_id=patient_id,
         doctor_id=doctor_id,
         appointment_date=appointment_date,
         appointment_time=appointment_time,
         status="PENDING"
     )
 
-    db.add(appointment)
-    db.commit()
-    db.refresh(appointment)
+    try:
+        with db.begin_nested():
+            db.add(appointment)
+    except IntegrityError:
+        # 🔒 Another booking won the race; the partial unique index decides
+        slot_calendar.add(doctor_id, slot)
+        raise HTTPException(409, "This slot is already booked")
 
     return {
         "message": "Appointment request sent",
@@ -423,60 +550,79 @@ def book_appointment(
     }
 
 
+@app.post("/medislot/appointments")
+async def book_appointment(
+    appointment_date: date,
+    appointment_time: time,
+    doctor_id: str,
+    user=Depends(require_patient)
+):
+    response = await write_queue.run(
+        _book_appointment, user["patient_id"], doctor_id, appointment_date, appointment_time
+    )
+    slot_calendar.add(doctor_id, datetime.combine(appointment_date, appointment_time))
+    return response
 
 
-@app.get("/medislot/my-appointments")
-def my_appointments(
-    user=Depends(require_role("PATIENT")),
+@app.get("/medislot/doctors/{doctor_id}/free-slots")
+def doctor_free_slots(
+    doctor_id: str,
+    start: date = None,
+    end: date = None,
+    user=Depends(get_current_user),
     db: Session = Depends(get_db)
 ):
-    patient = db.query(Patient).filter(
-        Patient.user_id == user["sub"]
-    ).first()
+    start = start or date.today()
+    end = end or start
 
-    if not patient:
-        raise HTTPException(status_code=400, detail="Patient profile not found")
+    if end < start:
+        raise HTTPException(400, "end must not be before start")
+    if (end - start).days >= MAX_FREE_SLOT_DAYS:
+        raise HTTPException(400, f"Date range is limited to {MAX_FREE_SLOT_DAYS} days")
 
-    return db.query(Appointment).filter(
-        Appointment.patient_id == patient.id
-    ).order_by(Appointment.created_at.desc()).all()
+    if not db.query(Doctor.id).filter(Doctor.id == doctor_id).first():
+        raise HTTPException(404, "Doctor not found")
 
+    return slot_calendar.free_slots(db, doctor_id, start, end)
 
 
-@app.get("/medislot/doctor/appointments")
-def doctor_appointments(
-    user=Depends(require_role("DOCTOR")),
-    db: Session = Depends(get_db)
+
+
+@app.get("/medislot/my-appointments")
+async def my_appointments(
+    user=Depends(require_patient),
+    db: Reader = Depends(get_reader)
 ):
-    doctor = db.query(Doctor).filter(
-        Doctor.user_id == user["sub"]
-    ).first()
+    return await db.run(
+        lambda session: session.query(Appointment).filter(
+            Appointment.patient_id == user["patient_id"]
+        ).order_by(Appointment.created_at.desc()).all()
+    )
 
-    if not doctor:
-        raise HTTPException(status_code=400, detail="Doctor profile not found")
 
-    return db.query(Appointment).filter(
-        Appointment.doctor_id == doctor.id
-    ).order_by(Appointment.created_at.desc()).all()
+
+@app.get("/medislot/doctor/appointments")
+async def doctor_appointments(
+    user=Depends(require_doctor),
+    db: Reader = Depends(get_reader)
+):
+    return await db.run(
+        lambda session: session.query(Appointment).filter(
+            Appointment.doctor_id == user["doctor_id"]
+        ).order_by(Appointment.created_at.desc()).all()
+    )
 
 
 @app.post("/medislot/appointments/{appointment_id}/status")
 def update_appointment_status(
     appointment_id: str,
     status: str,
-    user=Depends(require_role("DOCTOR")),
+    user=Depends(require_doctor),
     db: Session = Depends(get_db)
 ):
-    doctor = db.query(Doctor).filter(
-        Doctor.user_id == user["sub"]
-    ).first()
-
-    if not doctor:
-        raise HTTPException(400, "Doctor profile not found")
-
     appointment = db.query(Appointment).filter(
         Appointment.id == appointment_id,
-        Appointment.doctor_id == doctor.id
+        Appointment.doctor_id == user["doctor_id"]
     ).first()
 
     if not appointment:
@@ -485,8 +631,20 @@ def update_appointment_status(
     if status not in ["APPROVED", "CANCELLED", "COMPLETED"]:
         raise HTTPException(400, "Invalid status")
 
+    was_active = appointment.status in ACTIVE_STATUSES
+    slot = datetime.combine(appointment.appointment_date, appointment.appointment_time)
+
     appointment.status = status
-    db.commit()
+    try:
+        db.commit()
+    except IntegrityError:
+        db.rollback()
+        raise HTTPException(409, "This slot is already booked")
+
+    if status in ACTIVE_STATUSES and not was_active:
+        slot_calendar.add(user["doctor_id"], slot)
+    elif was_active and status not in ACTIVE_STATUSES:
+        slot_calendar.remove(user["doctor_id"], slot)
 
     return {"message": f"Appointment {status.lower()}"}
 
@@ -494,16 +652,12 @@ def update_appointment_status(
 @app.post("/medislot/appointments/{appointment_id}/cancel")
 def cancel_appointment(
     appointment_id: str,
-    user=Depends(require_role("PATIENT")),
+    user=Depends(require_patient),
     db: Session = Depends(get_db)
 ):
-    patient = db.query(Patient).filter(
-        Patient.user_id == user["sub"]
-    ).first()
-
     appointment = db.query(Appointment).filter(
         Appointment.id == appointment_id,
-        Appointment.patient_id == patient.id,
+        Appointment.patient_id == user["patient_id"],
         Appointment.status == "PENDING"
     ).first()
 
@@ -512,71 +666,464 @@ def cancel_appointment(
 
     appointment.status = "CANCELLED"
     db.commit()
+    slot_calendar.remove(
+        appointment.doctor_id,
+        datetime.combine(appointment.appointment_date, appointment.appointment_time)
+    )
 
     return {"message": "Appointment cancelled"}
 
 
 
+def _create_xray_prediction(db: Session, patient_id: str, stored, status: str,
+                            ai_output: dict = None):
+    prediction = AIPrediction(
+        id=str(uuid.uuid4()),
+        patient_id=patient_id,
+        image_path=stored.path,
+        doctor_verified="NO",
+        status=status,
+        **(result_columns(ai_output) if ai_output else {})
+    )
+    db.add(prediction)
+    blobstore.add_ref(db, stored.path, stored.size)
+    stats.bump(db, ai_predictions=1, pending_predictions=1)
+    return prediction.id
+
+
+async def _save_xray_upload(user, file: UploadFile, status: str):
+    # 1️⃣ Stream the X-ray to disk
+    stored = await uploads.save_upload(file, "xray")
+
+    # 2️⃣ Create AI prediction entry
+    prediction_id = await write_queue.run(
+        _create_xray_prediction, user["patient_id"], stored, status
+    )
+    return prediction_id, stored
+
+
 @app.post("/healthai/predict", response_model=AIPredictionResponse)
-def healthai_predict(
+async def healthai_predict(
     file: UploadFile = File(...),
-    user=Depends(require_role("PATIENT")),
+    user=Depends(require_patient)
+):
+    # Reject early when the inference pool is saturated
+    inference_pool.check_capacity()
+
+    # 1️⃣ Stream the X-ray to disk
+    stored = await uploads.save_upload(file, "xray")
+
+    # 2️⃣ Run AI model on the dedicated inference pool; if it fails nothing
+    # has been written (the unreferenced blob is garbage collected)
+    ai_output = await inference_pool.run(
+        run_prediction, stored.disk_path, derivatives_key=blobstore.key_of(stored.path)
+    )
+
+    # 3️⃣ Prediction with its probabilities, blob ref and counters in one transaction
+    prediction_id = await write_queue.run(
+        _create_xray_prediction, user["patient_id"], stored, "DONE", ai_output
+    )
+
+    # 4️⃣ Return structured response
+    return {
+        "prediction_id": prediction_id,
+        "results": ai_output["top_3"],
+        "all_probabilities": ai_output["all_predictions"],
+        "doctor_verified": "NO",
+        "note": "AI-assisted prediction. Doctor verification required."
+    }
+
+
+@app.post("/healthai/predict/async", status_code=202)
+async def healthai_predict_async(
+    file: UploadFile = File(...),
+    user=Depends(require_patient)
+):
+    prediction_id, stored = await _save_xray_upload(user, file, "QUEUED")
+    job_queue.enqueue(prediction_id, stored.path)
+
+    return {
+        "prediction_id": prediction_id,
+        "status": "QUEUED"
+    }
+
+
+XRAY_EXTENSIONS = (".png", ".jpg", ".jpeg", ".bmp")
+
+
+def _collect_batch_images(files, archive):
+    """(filename, file object) pairs from multipart files and/or a zip archive."""
+    images = [(f.filename, f.file) for f in files or []]
+
+    if archive is not None:
+        try:
+            bundle = zipfile.ZipFile(archive.file)
+        except zipfile.BadZipFile:
+            raise HTTPException(status_code=400, detail="Archive is not a valid zip file")
+
+        for info in bundle.infolist():
+            name = os.path.basename(info.filename)
+            if info.is_dir() or name.startswith(".") or "__MACOSX" in info.filename:
+                continue
+            if name.lower().endswith(XRAY_EXTENSIONS):
+                images.append((name, bundle.open(info)))
+
+    if not images:
+        raise HTTPException(status_code=400, detail="No X-ray images found")
+    if len(images) > BATCH_PREDICT_MAX_FILES:
+        raise HTTPException(
+            status_code=400,
+            detail=f"At most {BATCH_PREDICT_MAX_FILES} images per batch"
+        )
+    return images
+
+
+def _stage_xray_batch(db: Session, user, patient_id, images):
+    if user.get("role") == "PATIENT":
+        patient_id = resolve_profile(db, user)
+    elif patient_id:
+        patient_id = db.query(Patient.id).filter(Patient.id == patient_id).scalar()
+    else:
+        raise HTTPException(status_code=400, detail="patient_id is required")
+
+    if not patient_id:
+        raise HTTPException(status_code=400, detail="Patient profile not found")
+
+    return patient_id, [
+        (original_name, uploads.save_stream(source, "xray", original_name))
+        for original_name, source in images
+    ]
+
+
+def _save_xray_batch(db: Session, patient_id: str, staged, claimed_at: datetime):
+    saved, stored_files = [], []
+    for original_name, stored in staged:
+        stored_files.append(stored)
+
+        prediction = AIPrediction(
+            id=str(uuid.uuid4()),
+            patient_id=patient_id,
+            image_path=stored.path,
+            doctor_verified="NO",
+            # Scored by this request, not the job queue
+            status="RUNNING",
+            claimed_at=claimed_at
+        )
+        db.add(prediction)
+        saved.append((prediction.id, original_name, stored))
+
+    # One commit for the whole batch
+    blobstore.add_refs(
+        db,
+        [f.path for f in stored_files],
+        {blobstore.key_of(f.path): f.size for f in stored_files}
+    )
+    stats.bump(db, ai_predictions=len(saved), pending_predictions=len(saved))
+    return saved
+
+
+@app.post("/healthai/predict/batch")
+async def healthai_predict_batch(
+    files: List[UploadFile] = File(None),
+    archive: UploadFile = File(None),
+    patient_id: str = None,
+    user=Depends(get_current_user),
+    db: Session = Depends(get_db)
+):
+    """
+    Accepts many X-rays (multipart files and/or a zip archive) and streams
+    one NDJSON line per image as soon as its prediction finishes.
+    """
+    if user.get("role") not in ["PATIENT", "DOCTOR", "ADMIN"]:
+        raise HTTPException(status_code=403, detail="Access denied")
+
+    images = _collect_batch_images(files, archive)
+    # Files are stored in the threadpool, the rows by the single writer
+    patient_id, staged = await run_in_threadpool(
+        _stage_xray_batch, db, user, patient_id, images
+    )
+    claimed_at = datetime.utcnow()
+    saved = await write_queue.run(_save_xray_batch, patient_id, staged, claimed_at)
+
+    # Keep about one batch in flight; the batcher groups them into forward passes
+    slots = asyncio.Semaphore(inference_pool.workers)
+
+    async def score(prediction_id, filename, stored):
+        async with slots:
+            try:
+                ai_output = await inference_pool.run(
+                    run_prediction,
+                    stored.disk_path,
+                    derivatives_key=blobstore.key_of(stored.path),
+                    wait=True
+                )
+                await write_queue.run(save_prediction_results, prediction_id, ai_output, claimed_at)
+            except Exception as exc:
+                await write_queue.run(
+                    set_prediction_status, prediction_id, "FAILED", str(exc), claimed_at
+                )
+                return {
+                    "prediction_id": prediction_id,
+                    "filename": filename,
+                    "status": "FAILED",
+                    "error": str(exc)
+                }
+
+        return {
+            "prediction_id": prediction_id,
+            "filename": filename,
+            "status": "DONE",
+            "results": ai_output["top_3"]
+        }
+
+    async def results():
+        tasks = [asyncio.ensure_future(score(*item)) for item in saved]
+        for finished in asyncio.as_completed(tasks):
+            yield json.dumps(await finished) + "\n"
+
+    return StreamingResponse(results(), media_type="application/x-ndjson")
+
+
+# =========================
+# FILE DELIVERY
+# =========================
+@app.get("/files/{key:path}")
+def get_file(
+    key: str,
+    request: Request,
+    expires: int = None,
+    signature: str = None,
+    user=Depends(get_optional_user),
     db: Session = Depends(get_db)
 ):
-    # 1️⃣ Find patient
-    patient = db.query(Patient).filter(
-        Patient.user_id == user["sub"]
+    """
+    Serves a stored blob to a signed URL (as listed in file_url / image_url)
+    or to a bearer token allowed to see a record that uses it.
+    """
+    file_delivery.check_key(key)
+
+    if not file_delivery.has_valid_signature(key, expires, signature):
+        if user is None:
+            raise HTTPException(status_code=401, detail="Signed URL expired or invalid")
+        if not file_delivery.can_read(db, user, key):
+            raise HTTPException(status_code=404, detail="File not found")
+
+    return file_delivery.blob_response(request, key)
+
+
+# =========================
+# RESUMABLE UPLOADS
+# =========================
+def _get_upload_session(db: Session, user, upload_id: str):
+    upload = db.query(UploadSession).filter(
+        UploadSession.id == upload_id,
+        UploadSession.user_id == user["sub"]
     ).first()
 
-    if not patient:
-        raise HTTPException(status_code=400, detail="Patient profile not found")
+    if not upload:
+        raise HTTPException(404, "Upload session not found")
+    return upload
 
-    # 2️⃣ Save X-ray
-    BASE_DIR = os.path.dirname(os.path.abspath(__file__))
-    UPLOAD_DIR = os.path.join(BASE_DIR, "..", "uploads", "xray")
-    os.makedirs(UPLOAD_DIR, exist_ok=True)
 
-    filename = f"{uuid.uuid4()}_{file.filename}"
-    image_path = os.path.join(UPLOAD_DIR, filename)
+def _upload_session_view(upload: UploadSession):
+    return {
+        "upload_id": upload.id,
+        "kind": upload.kind,
+        "filename": upload.filename,
+        "size": upload.size,
+        "received": upload.received,
+        "chunk_size": UPLOAD_CHUNK_BYTES
+    }
 
-    with open(image_path, "wb") as buffer:
-        shutil.copyfileobj(file.file, buffer)
 
-    # 3️⃣ Create AI prediction entry
-    prediction = AIPrediction(
-        patient_id=patient.id,
-        image_path=f"uploads/xray/{filename}",
-        doctor_verified="NO"
+def _create_upload_session(db: Session, user_id: str, kind: str, filename: str,
+                           record_type: str, size: int):
+    expired = uploads.purge_expired_sessions(db)
+
+    upload = UploadSession(
+        id=str(uuid.uuid4()),
+        user_id=user_id,
+        kind=kind,
+        filename=os.path.basename(filename),
+        record_type=record_type,
+        size=size,
+        received=0
     )
-    db.add(prediction)
-    db.commit()
-    db.refresh(prediction)
+    db.add(upload)
+    return _upload_session_view(upload), expired
 
-    # 4️⃣ Run AI model
-    ai_output = predict_xray(image_path)
 
-    # 5️⃣ Store TOP-3 predictions
-    for res in ai_output["top_3"]:
-        db.add(
-            AIPredictionResult(
-                prediction_id=prediction.id,
-                disease_name=res["disease"],
-                confidence_score=str(res["confidence"])
-            )
+@app.post("/upload-sessions", status_code=201)
+async def create_upload_session(
+    kind: str,  # medvault | xray
+    filename: str,
+    size: int,
+    record_type: str = None,
+    user=Depends(require_patient)
+):
+    if kind not in uploads.KINDS:
+        raise HTTPException(400, "kind must be medvault or xray")
+    if size <= 0:
+        raise HTTPException(400, "size must be positive")
+    if size > uploads.KINDS[kind]:
+        raise uploads.too_large(kind)
+
+    view, expired = await write_queue.run(
+        _create_upload_session, user["sub"], kind, filename, record_type, size
+    )
+    for session_id in expired:
+        uploads.discard_session(session_id)
+    uploads.open_session(view["upload_id"])
+
+    return view
+
+
+@app.get("/upload-sessions/{upload_id}")
+def get_upload_session(
+    upload_id: str,
+    user=Depends(require_role("PATIENT")),
+    db: Session = Depends(get_db)
+):
+    # Clients resume from "received" after a dropped connection
+    return _upload_session_view(_get_upload_session(db, user, upload_id))
+
+
+@app.put("/upload-sessions/{upload_id}")
+async def upload_session_chunk(
+    upload_id: str,
+    offset: int,
+    request: Request,
+    user=Depends(require_role("PATIENT")),
+    db: Session = Depends(get_db)
+):
+    """Raw request body = the bytes starting at `offset`."""
+    async with uploads.session_lock(upload_id):
+        upload = await run_in_threadpool(_get_upload_session, db, user, upload_id)
+
+        length = request.headers.get("content-length")
+        if length and length.isdigit() and offset + int(length) > upload.size:
+            raise HTTPException(413, "Chunk goes past the declared upload size")
+
+        received = await uploads.append_chunk(upload, offset, request.stream())
+        await write_queue.run(_record_upload_progress, upload.id, received)
+
+    return {**_upload_session_view(upload), "received": received}
+
+
+def _record_upload_progress(db: Session, upload_id: str, received: int):
+    db.query(UploadSession).filter(UploadSession.id == upload_id).update(
+        {"received": received}, synchronize_session=False
+    )
+
+
+def _finish_upload_session(db: Session, upload_id: str, kind: str, record_type: str,
+                           patient_id: str, stored):
+    removed = db.query(UploadSession).filter(
+        UploadSession.id == upload_id
+    ).delete(synchronize_session=False)
+    if not removed:
+        raise HTTPException(404, "Upload session not found")
+
+    if kind == "medvault":
+        return _create_medical_record(db, patient_id, record_type, stored)
+    return _create_xray_prediction(db, patient_id, stored, "QUEUED")
+
+
+@app.post("/upload-sessions/{upload_id}/complete")
+async def complete_upload_session(
+    upload_id: str,
+    sha256: str = None,
+    user=Depends(require_patient),
+    db: Session = Depends(get_db)
+):
+    async with uploads.session_lock(upload_id):
+        upload = await run_in_threadpool(_get_upload_session, db, user, upload_id)
+        stored = await uploads.finish_session(upload, sha256)
+        created_id = await write_queue.run(
+            _finish_upload_session,
+            upload.id, upload.kind, upload.record_type, user["patient_id"], stored
         )
 
-    db.commit()
+    if upload.kind == "medvault":
+        derivatives.schedule(blobstore.key_of(stored.path))
+        return {"record_id": created_id, "sha256": stored.sha256}
+
+    job_queue.enqueue(created_id, stored.path)
+    return {"prediction_id": created_id, "status": "QUEUED", "sha256": stored.sha256}
+
+
+def _get_visible_prediction(db: Session, user, prediction_id: str):
+    prediction = db.query(AIPrediction).filter(
+        AIPrediction.id == prediction_id
+    ).first()
+
+    if not prediction:
+        raise HTTPException(status_code=404, detail="Prediction not found")
+
+    # Patients only see their own predictions
+    if user.get("role") == "PATIENT":
+        if prediction.patient_id != resolve_profile(db, user):
+            raise HTTPException(status_code=404, detail="Prediction not found")
 
-    # 6️⃣ Return structured response
+    return prediction
+
+
+def _prediction_job_view(prediction):
     return {
         "prediction_id": prediction.id,
-        "results": ai_output["top_3"],
-        "all_probabilities": ai_output["all_predictions"],
-        "doctor_verified": "NO",
-        "note": "AI-assisted prediction. Doctor verification required."
+        "status": prediction.status,
+        "error": prediction.error,
+        "doctor_verified": prediction.doctor_verified,
+        "created_at": prediction.created_at,
+        "results": probabilities.results(prediction)
     }
 
 
+@app.get("/healthai/predictions/{prediction_id}")
+def get_prediction(
+    prediction_id: str,
+    user=Depends(get_current_user),
+    db: Session = Depends(get_db)
+):
+    return _prediction_job_view(_get_visible_prediction(db, user, prediction_id))
+
+
+@app.get("/healthai/predictions/{prediction_id}/events")
+async def stream_prediction_events(
+    prediction_id: str,
+    user=Depends(get_current_user)
+):
+    def _snapshot():
+        db = SessionLocal()
+        try:
+            return _prediction_job_view(
+                _get_visible_prediction(db, user, prediction_id)
+            )
+        finally:
+            db.close()
+
+    # Fail with a normal 404 before the stream starts
+    first = await run_in_threadpool(_snapshot)
+
+    async def events():
+        view, last_status = first, None
+        while True:
+            if view["status"] != last_status:
+                last_status = view["status"]
+                payload = json.dumps(jsonable_encoder(view))
+                yield f"event: status\ndata: {payload}\n\n"
+            if view["status"] in TERMINAL_STATES:
+                return
+            await asyncio.sleep(PREDICTION_EVENTS_POLL_SECONDS)
+            view = await run_in_threadpool(_snapshot)
+
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache"}
+    )
+
+
 @app.patch("/healthai/verify/{prediction_id}")
 def verify_ai_prediction(
     prediction_id: str,
@@ -590,6 +1137,7 @@ def verify_ai_prediction(
     if not prediction:
         raise HTTPException(status_code=404, detail="Prediction not found")
 
+    stats.bump(db, **stats.verification_deltas(prediction.doctor_verified, "YES"))
     prediction.doctor_verified = "YES"
     db.commit()
 
@@ -599,14 +1147,22 @@ def verify_ai_prediction(
 
 @app.get("/healthai/pending")
 def get_pending_predictions(
+    limit: int = DEFAULT_PAGE_SIZE,
+    cursor: str = None,
     user=Depends(require_role("DOCTOR")),
     db: Session = Depends(get_db)
 ):
-    predictions = (
+    predictions, next_cursor = paginate(
         db.query(AIPrediction)
-        .filter(AIPrediction.doctor_verified == "NO")
-        .order_by(AIPrediction.created_at.desc())
-        .all()
+        .options(selectinload(AIPrediction.results))
+        .filter(
+            AIPrediction.doctor_verified == "NO",
+            AIPrediction.status == "DONE"
+        ),
+        AIPrediction.created_at,
+        AIPrediction.id,
+        limit,
+        cursor
     )
 
     response = []
@@ -615,17 +1171,13 @@ def get_pending_predictions(
         response.append({
             "prediction_id": p.id,
             "image_path": p.image_path,
+            "image_url": file_url(p.image_path),
+            **derivatives.urls(p.image_path),
             "created_at": p.created_at,
-            "results": [
-                {
-                    "disease": r.disease_name,
-                    "confidence": float(r.confidence_score)
-                }
-                for r in p.results
-            ]
+            "results": probabilities.results(p)
         })
 
-    return response
+    return {"items": response, "next_cursor": next_cursor}
 
 
 
@@ -647,9 +1199,9 @@ def verify_prediction(
     if not prediction:
         raise HTTPException(status_code=404, detail="Prediction not found")
 
-    prediction.doctor_verified = (
-        "YES" if action == "VERIFIED" else "REJECTED"
-    )
+    new_state = "YES" if action == "VERIFIED" else "REJECTED"
+    stats.bump(db, **stats.verification_deltas(prediction.doctor_verified, new_state))
+    prediction.doctor_verified = new_state
     prediction.doctor_notes = notes
 
     db.commit()
@@ -660,20 +1212,14 @@ def verify_prediction(
 
 
 @app.get("/healthai/my-predictions")
-def get_my_healthai_predictions(
-    user=Depends(require_role("PATIENT")),
-    db: Session = Depends(get_db)
+async def get_my_healthai_predictions(
+    user=Depends(require_patient),
+    db: Reader = Depends(get_reader)
 ):
-    patient = db.query(Patient).filter(
-        Patient.user_id == user["sub"]
-    ).first()
-
-    if not patient:
-        raise HTTPException(status_code=400, detail="Patient profile not found")
-
-    predictions = (
-        db.query(AIPrediction)
-        .filter(AIPrediction.patient_id == patient.id)
+    predictions = await db.run(
+        lambda session: session.query(AIPrediction)
+        .options(selectinload(AIPrediction.results))
+        .filter(AIPrediction.patient_id == user["patient_id"])
         .order_by(AIPrediction.created_at.desc())
         .all()
     )
@@ -683,14 +1229,11 @@ def get_my_healthai_predictions(
         response.append({
             "prediction_id": p.id,
             "image_path": p.image_path,
+            "image_url": file_url(p.image_path),
+            **derivatives.urls(p.image_path),
+            "status": p.status,
             "doctor_verified": p.doctor_verified,
-            "results": [
-                {
-                    "disease": r.disease_name,
-                    "confidence": float(r.confidence_score)
-                }
-                for r in p.results
-            ],
+            "results": probabilities.results(p),
             "doctor_verified": p.doctor_verified,
             "doctor_notes": p.doctor_notes,          
             "verified_by": p.verified_by,             
@@ -703,29 +1246,52 @@ def get_my_healthai_predictions(
 
 @app.get("/admin/healthai/predictions")
 def get_all_predictions(
+    limit: int = DEFAULT_PAGE_SIZE,
+    cursor: str = None,
     admin=Depends(require_role("ADMIN")),
     db: Session = Depends(get_db)
 ):
-    predictions = db.query(AIPrediction).all()
+    # Results for the page come back in one extra IN query
+    predictions, next_cursor = paginate(
+        db.query(AIPrediction).options(selectinload(AIPrediction.results)),
+        AIPrediction.created_at,
+        AIPrediction.id,
+        limit,
+        cursor
+    )
 
-    return [
+    items = [
         {
             "prediction_id": p.id,
             "patient_id": p.patient_id,
             "image_path": p.image_path,
+            "image_url": file_url(p.image_path),
+            **derivatives.urls(p.image_path),
             "doctor_verified": p.doctor_verified,
             "doctor_notes": p.doctor_notes,
             "created_at": p.created_at,
-            "results": [
-                {
-                    "disease": r.disease_name,
-                    "confidence": float(r.confidence_score)
-                }
-                for r in p.results
-            ]
+            "results": probabilities.results(p)
         }
         for p in predictions
     ]
+    return {"items": items, "next_cursor": next_cursor}
+
+
+@app.get("/admin/healthai/metrics")
+def healthai_inference_metrics(
+    admin=Depends(require_role("ADMIN"))
+):
+    from .ml.predictor import batcher, cache
+
+    # In process mode the batcher and cache live in each worker, so these
+    # figures only cover this process
+    return {
+        "model": inference_model_status(),
+        "executor": inference_pool.stats(),
+        "jobs": job_queue.stats(),
+        "batching": batcher.metrics(),
+        "cache": cache.stats()
+    }
 
 
 @app.get("/admin/stats")
@@ -733,24 +1299,50 @@ def admin_stats(
     admin=Depends(require_role("ADMIN")),
     db: Session = Depends(get_db)
 ):
-    return {
-        "total_users": db.query(User).count(),
-        "patients": db.query(User).filter(User.role == "PATIENT").count(),
-        "doctors": db.query(User).filter(User.role == "DOCTOR").count(),
-
-        "medvault_records": db.query(MedicalRecord).count(),
-
-        "ai_predictions": db.query(AIPrediction).count(),
-        "pending_predictions": db.query(AIPrediction)
-            .filter(AIPrediction.doctor_verified == "NO")
-            .count(),
-        "verified_predictions": db.query(AIPrediction)
-            .filter(AIPrediction.doctor_verified.in_(["VERIFIED", "YES"]))
-            .count(),
-        "rejected_predictions": db.query(AIPrediction)
-            .filter(AIPrediction.doctor_verified == "REJECTED")
-            .count(),
-    }
+    # Counters are maintained on every write; one small read here
+    return stats.read_counters(db)
+
+
+@app.post("/admin/stats/reconcile")
+def reconcile_admin_stats(
+    fix: bool = True,
+    admin=Depends(require_role("ADMIN")),
+    db: Session = Depends(get_db)
+):
+    return stats.reconcile(db, fix=fix)
+
+
+def _reconcile_stats():
+    db = SessionLocal()
+    try:
+        stats.reconcile(db)
+    finally:
+        db.close()
+
+
+stats_reconciler = PeriodicTask("stats_reconcile", STATS_RECONCILE_SECONDS, _reconcile_stats)
+
+
+@app.on_event("startup")
+async def start_stats_reconciler():
+    stats_reconciler.start()
+
+
+def _collect_blob_garbage():
+    db = SessionLocal()
+    try:
+        blobstore.collect_garbage(db)
+    finally:
+        db.close()
+
+
+blob_gc = PeriodicTask("blob_gc", BLOB_GC_SECONDS, _collect_blob_garbage)
+
+
+@app.on_event("startup")
+async def start_blob_gc():
+    blob_gc.start()
+
 
 @app.get("/admin/recent/healthai")
 def recent_healthai_activity(
@@ -799,23 +1391,13 @@ def recent_medvault_activity(
 
 @app.get("/admin/analytics/healthai/daily")
 def healthai_daily_trends(
+    start: date = None,
+    end: date = None,
     admin=Depends(require_role("ADMIN")),
     db: Session = Depends(get_db)
 ):
-    data = (
-        db.query(
-            func.date(AIPrediction.created_at).label("date"),
-            func.count().label("count")
-        )
-        .group_by(func.date(AIPrediction.created_at))
-        .order_by(func.date(AIPrediction.created_at))
-        .all()
-    )
-
-    return [
-        {"date": str(d.date), "count": d.count}
-        for d in data
-    ]
+    # O(days): closed days come from the rollup table, only today is counted
+    return analytics.daily_counts(db, "healthai", start, end)
 
 @app.get("/admin/analytics/healthai/status")
 def healthai_status_distribution(
@@ -836,25 +1418,26 @@ def healthai_status_distribution(
         for s in data
     ]
 
+@app.get("/admin/analytics/healthai/findings")
+def healthai_findings(
+    start: date = None,
+    end: date = None,
+    threshold: float = 0.5,
+    admin=Depends(require_role("ADMIN")),
+    db: Session = Depends(get_db)
+):
+    # Mean probability and positive count for all 14 findings at once
+    return analytics.finding_summary(db, start, end, threshold)
+
 @app.get("/admin/analytics/medvault/daily")
 def medvault_daily_uploads(
+    start: date = None,
+    end: date = None,
     admin=Depends(require_role("ADMIN")),
     db: Session = Depends(get_db)
 ):
-    data = (
-        db.query(
-            func.date(MedicalRecord.created_at).label("date"),
-            func.count().label("count")
-        )
-        .group_by(func.date(MedicalRecord.created_at))
-        .order_by(func.date(MedicalRecord.created_at))
-        .all()
-    )
-
-    return [
-        {"date": str(d.date), "count": d.count}
-        for d in data
-    ]
+    # O(days): closed days come from the rollup table, only today is counted
+    return analytics.daily_counts(db, "medvault", start, end)
 
 @app.get("/admin/analytics/medvault/types")
 def medvault_type_distribution(
@@ -896,23 +1479,13 @@ def user_role_distribution(
 
 @app.get("/admin/analytics/users/daily")
 def user_growth_daily(
+    start: date = None,
+    end: date = None,
     admin=Depends(require_role("ADMIN")),
     db: Session = Depends(get_db)
 ):
-    data = (
-        db.query(
-            func.date(User.created_at).label("date"),
-            func.count().label("count")
-        )
-        .group_by(func.date(User.created_at))
-        .order_by(func.date(User.created_at))
-        .all()
-    )
-
-    return [
-        {"date": str(d.date), "count": d.count}
-        for d in data
-    ]
+    # O(days): closed days come from the rollup table, only today is counted
+    return analytics.daily_counts(db, "users", start, end)
 
 
 
@@ -924,23 +1497,61 @@ def add_bed(
     admin=Depends(require_role("ADMIN")),
     db: Session = Depends(get_db)
 ):
-    bed = Bed(ward=ward, bed_number=bed_number, is_available=True)
-    db.add(bed)
-    db.commit()
-    db.refresh(bed)
+    bed_id = str(uuid.uuid4())
+    with unit_of_work(db):
+        db.add(Bed(id=bed_id, ward=ward, bed_number=bed_number, is_available=True))
+    bed_inventory.add(bed_id, ward, bed_number)
+    response_cache.invalidate("beds")
 
     return {
-        "id": bed.id,
-        "ward": bed.ward,
-        "bed_number": bed.bed_number,
-        "is_available": bed.is_available
+        "id": bed_id,
+        "ward": ward,
+        "bed_number": bed_number,
+        "is_available": True
     }
 
 #PUBLIC LIST ALL BEDS
 @app.get("/medislot/beds")
-def list_beds(db: Session = Depends(get_db)):
-    beds = db.query(Bed).all()
-    return beds
+def list_beds(
+    request: Request,
+    limit: int = DEFAULT_PAGE_SIZE,
+    cursor: str = None,
+    db: Session = Depends(get_db)
+):
+    def build():
+        beds, next_cursor = paginate(
+            db.query(Bed), Bed.created_at, Bed.id, limit, cursor, descending=False
+        )
+        return {"items": beds, "next_cursor": next_cursor}
+
+    return response_cache.respond(
+        request, "beds", build, params=(page_size(limit), cursor)
+    )
+
+
+@app.on_event("startup")
+def load_bed_inventory():
+    db = SessionLocal()
+    try:
+        bed_inventory.rebuild(db)
+    finally:
+        db.close()
+
+#PUBLIC NEXT FREE BED IN A WARD
+@app.get("/medislot/wards/{ward}/next-free-bed")
+def next_free_bed(ward: str, db: Session = Depends(get_db)):
+    # 🛏️ O(1) lookup in the in-memory index, no table scan
+    bed_inventory.ensure_fresh(db)
+    bed = bed_inventory.next_free(ward)
+    if not bed:
+        raise HTTPException(404, "No free bed in this ward")
+    return bed
+
+#PUBLIC WARD OCCUPANCY
+@app.get("/medislot/wards/occupancy")
+def ward_occupancy(db: Session = Depends(get_db)):
+    bed_inventory.ensure_fresh(db)
+    return bed_inventory.occupancy()
 
 
 #PATIENT REQUEST BED
@@ -958,6 +1569,12 @@ def request_bed(
     if existing:
         raise HTTPException(400, "You already have a bed request or allocation")
 
+    bed = db.query(Bed.is_available).filter(Bed.id == bed_id).first()
+    if not bed:
+        raise HTTPException(404, "Bed not found")
+    if not bed.is_available:
+        raise HTTPException(409, "Bed is not available")
+
     allocation = BedAllocation(
         bed_id=bed_id,
         patient_id=user["sub"],
@@ -972,27 +1589,35 @@ def request_bed(
 #ADMIN VIEW BED REQUESTS
 @app.get("/medislot/bed-requests")
 def bed_requests(
+    limit: int = DEFAULT_PAGE_SIZE,
+    cursor: str = None,
     admin=Depends(require_role("ADMIN")),
     db: Session = Depends(get_db)
 ):
-    data = (
+    data, next_cursor = paginate(
         db.query(BedAllocation, Bed, User)
         .join(Bed)
-        .join(User)
-        .order_by(BedAllocation.allocated_at.desc())
-        .all()
+        .join(User),
+        BedAllocation.allocated_at,
+        BedAllocation.id,
+        limit,
+        cursor,
+        key=lambda row: (row[0].allocated_at, row[0].id)
     )
 
-    return [
-        {
-            "allocation_id": a.id,
-            "patient_name": u.name,
-            "ward": b.ward,
-            "bed_number": b.bed_number,
-            "status": a.status
-        }
-        for a, b, u in data
-    ]
+    return {
+        "items": [
+            {
+                "allocation_id": a.id,
+                "patient_name": u.name,
+                "ward": b.ward,
+                "bed_number": b.bed_number,
+                "status": a.status
+            }
+            for a, b, u in data
+        ],
+        "next_cursor": next_cursor
+    }
 
 #ADMIN: APPROVE/REJECT BED REQUEST
 @app.post("/medislot/bed-requests/{allocation_id}/decision")
@@ -1002,6 +1627,9 @@ def decide_bed_request(
     admin=Depends(require_role("ADMIN")),
     db: Session = Depends(get_db)
 ):
+    if action not in ("APPROVE", "REJECT"):
+        raise HTTPException(400, "Invalid action")
+
     allocation = db.query(BedAllocation).filter(
         BedAllocation.id == allocation_id
     ).first()
@@ -1009,17 +1637,28 @@ def decide_bed_request(
     if not allocation:
         raise HTTPException(404, "Request not found")
 
-    bed = db.query(Bed).filter(Bed.id == allocation.bed_id).first()
+    # 🔒 Compare-and-set on both rows: a request is decided once, and a bed
+    # goes to exactly one patient even when admins approve concurrently
+    decided = (
+        db.query(BedAllocation)
+        .filter(BedAllocation.id == allocation_id, BedAllocation.status == "REQUESTED")
+        .update(
+            {"status": "ACTIVE" if action == "APPROVE" else "REJECTED"},
+            synchronize_session=False
+        )
+    )
+    if not decided:
+        db.rollback()
+        raise HTTPException(409, "Request has already been decided")
 
-    if action == "APPROVE":
-        allocation.status = "ACTIVE"
-        bed.is_available = False
-    elif action == "REJECT":
-        allocation.status = "REJECTED"
-    else:
-        raise HTTPException(400, "Invalid action")
+    if action == "APPROVE" and not bed_inventory.take(db, allocation.bed_id):
+        db.rollback()
+        raise HTTPException(409, "Bed is no longer available")
 
     db.commit()
+    if action == "APPROVE":
+        bed_inventory.mark_taken(allocation.bed_id)
+        response_cache.invalidate("beds")
     return {"message": f"Request {action.lower()}ed"}
 
 
@@ -1063,11 +1702,20 @@ def release_bed_allocation(
     if not allocation:
         raise HTTPException(404, "Active allocation not found")
 
-    bed = db.query(Bed).filter(Bed.id == allocation.bed_id).first()
-
-    allocation.status = "RELEASED"
-    allocation.released_at = datetime.utcnow()
-    bed.is_available = True
+    released = (
+        db.query(BedAllocation)
+        .filter(BedAllocation.id == allocation_id, BedAllocation.status == "ACTIVE")
+        .update(
+            {"status": "RELEASED", "released_at": datetime.utcnow()},
+            synchronize_session=False
+        )
+    )
+    if not released:
+        db.rollback()
+        raise HTTPException(409, "Allocation has already been released")
 
+    bed_inventory.give_back(db, allocation.bed_id)
     db.commit()
+    bed_inventory.mark_free(allocation.bed_id)
+    response_cache.invalidate("beds")
     return {"message": "Bed released successfully"}
@@ -0,0 +1,389 @@
+"""
+Versioned schema migrations, applied in order at startup and recorded in
+the schema_migrations table:
+
+    python -m app.migrations          # apply pending migrations
+    python -m app.migrations status   # list applied / pending versions
+
+Every migration must be idempotent: databases created before this runner
+existed already have some of the objects a migration creates.
+"""
+import sys
+from datetime import datetime
+
+from dotenv import load_dotenv
+load_dotenv()
+
+from sqlalchemy import (
+    BigInteger,
+    Boolean,
+    Column,
+    Date,
+    DateTime,
+    ForeignKey,
+    Index,
+    Integer,
+    LargeBinary,
+    MetaData,
+    String,
+    Table,
+    Time,
+    inspect,
+    text,
+)
+from sqlalchemy.schema import CreateColumn
+
+_meta = MetaData()
+schema_migrations = Table(
+    "schema_migrations",
+    _meta,
+    Column("version", Integer, primary_key=True),
+    Column("description", String, nullable=False),
+    Column("applied_at", DateTime, nullable=False),
+)
+
+MIGRATIONS = []
+
+
+def migration(version: int, description: str):
+    def register(fn):
+        MIGRATIONS.append((version, description, fn))
+        return fn
+    return register
+
+
+# =========================
+# HELPERS
+# =========================
+# Migrations spell out their tables, columns and indexes as they were at
+# their own version and never read app.models: an index or column added to
+# a model later must not change what an old migration does.
+def add_column_if_missing(conn, table_name: str, column: Column):
+    existing = {c["name"] for c in inspect(conn).get_columns(table_name)}
+    if column.name in existing:
+        return
+
+    Table(table_name, MetaData(), column)
+    ddl = CreateColumn(column).compile(dialect=conn.dialect)
+    conn.execute(text(f"ALTER TABLE {table_name} ADD COLUMN {ddl}"))
+
+
+def create_index(conn, name: str, table_name: str, *columns: str, unique=False, where=None):
+    table = Table(table_name, MetaData(), *(Column(c) for c in columns))
+    partial = {"sqlite_where": text(where), "postgresql_where": text(where)} if where else {}
+    Index(name, *table.c, unique=unique, **partial).create(conn, checkfirst=True)
+
+
+def create_table(conn, name: str, *columns, references=()):
+    """Create a table (and its column indexes) unless it exists."""
+    meta = MetaData()
+    for target in references:
+        # Stand-ins so foreign keys resolve; never created
+        Table(target, meta, Column("id", String, primary_key=True))
+    Table(name, meta, *columns).create(conn, checkfirst=True)
+
+
+# =========================
+# MIGRATIONS
+# =========================
+# The schema the app created with create_all before migrations existed
+_baseline_schema = MetaData()
+
+Table(
+    "users", _baseline_schema,
+    Column("id", String, primary_key=True),
+    Column("name", String, nullable=False),
+    Column("email", String, nullable=False),
+    Column("password_hash", String, nullable=False),
+    Column("role", String, nullable=False),
+    Column("created_at", DateTime),
+    Index("ix_users_email", "email", unique=True),
+)
+Table(
+    "patients", _baseline_schema,
+    Column("id", String, primary_key=True),
+    Column("user_id", String, ForeignKey("users.id"), nullable=False),
+    Column("age", String),
+    Column("gender", String),
+    Column("contact_number", String),
+)
+Table(
+    "doctors", _baseline_schema,
+    Column("id", String, primary_key=True),
+    Column("user_id", String, ForeignKey("users.id"), nullable=False),
+    Column("specialization", String),
+    Column("experience_years", String),
+    Column("availability_status", String),
+)
+Table(
+    "appointments", _baseline_schema,
+    Column("id", String, primary_key=True),
+    Column("patient_id", String, ForeignKey("patients.id"), nullable=False),
+    Column("doctor_id", String, ForeignKey("doctors.id"), nullable=False),
+    Column("appointment_date", Date, nullable=False),
+    Column("appointment_time", Time, nullable=False),
+    Column("status", String),
+    Column("notes", String),
+    Column("created_at", DateTime),
+)
+Table(
+    "beds", _baseline_schema,
+    Column("id", String, primary_key=True),
+    Column("ward", String, nullable=False),
+    Column("bed_number", String, nullable=False),
+    Column("is_available", Boolean),
+    Column("created_at", DateTime),
+)
+Table(
+    "bed_allocations", _baseline_schema,
+    Column("id", String, primary_key=True),
+    Column("patient_id", String, ForeignKey("users.id"), nullable=False),
+    Column("bed_id", String, ForeignKey("beds.id"), nullable=False),
+    Column("allocated_at", DateTime),
+    Column("released_at", DateTime),
+    Column("status", String),
+)
+Table(
+    "bed_status", _baseline_schema,
+    Column("id", String, primary_key=True),
+    Column("hospital_name", String, nullable=False),
+    Column("total_beds", String, nullable=False),
+    Column("available_beds", String, nullable=False),
+    Column("last_updated", DateTime),
+)
+Table(
+    "medical_records", _baseline_schema,
+    Column("id", String, primary_key=True),
+    Column("patient_id", String, ForeignKey("patients.id"), nullable=False),
+    Column("doctor_id", String, ForeignKey("doctors.id")),
+    Column("record_type", String),
+    Column("file_path", String, nullable=False),
+    Column("notes", String),
+    Column("created_at", DateTime),
+)
+Table(
+    "ai_predictions", _baseline_schema,
+    Column("id", String, primary_key=True),
+    Column("patient_id", String, ForeignKey("patients.id"), nullable=False),
+    Column("image_path", String, nullable=False),
+    Column("doctor_verified", String),
+    Column("doctor_notes", String),
+    Column("verified_by", String, ForeignKey("users.id")),
+    Column("verified_at", DateTime),
+    Column("created_at", DateTime),
+)
+Table(
+    "ai_prediction_results", _baseline_schema,
+    Column("id", String, primary_key=True),
+    Column("prediction_id", String, ForeignKey("ai_predictions.id"), nullable=False),
+    Column("disease_name", String, nullable=False),
+    Column("confidence_score", String, nullable=False),
+)
+
+
+@migration(1, "baseline schema")
+def _baseline(conn):
+    _baseline_schema.create_all(bind=conn)
+
+
+@migration(2, "ai_predictions job status columns")
+def _prediction_job_status(conn):
+    add_column_if_missing(conn, "ai_predictions", Column("status", String, server_default="DONE"))
+    add_column_if_missing(conn, "ai_predictions", Column("error", String))
+
+
+# Hot filter / pagination indexes of migration 3: (name, table, columns)
+HOT_FILTER_INDEXES = [
+    ("ix_users_created_at", "users", ("created_at",)),
+    ("ix_patients_user_id", "patients", ("user_id",)),
+    ("ix_doctors_user_id", "doctors", ("user_id",)),
+    ("ix_appointments_patient_created", "appointments", ("patient_id", "created_at")),
+    ("ix_appointments_doctor_created", "appointments", ("doctor_id", "created_at")),
+    ("ix_appointments_patient_doctor_status", "appointments", ("patient_id", "doctor_id", "status")),
+    ("ix_beds_created_at", "beds", ("created_at",)),
+    ("ix_bed_allocations_patient_status", "bed_allocations", ("patient_id", "status")),
+    ("ix_bed_allocations_allocated", "bed_allocations", ("allocated_at",)),
+    ("ix_medical_records_patient_created", "medical_records", ("patient_id", "created_at")),
+    ("ix_medical_records_created", "medical_records", ("created_at",)),
+    ("ix_ai_predictions_verified_created", "ai_predictions", ("doctor_verified", "created_at")),
+    ("ix_ai_predictions_patient_created", "ai_predictions", ("patient_id", "created_at")),
+    ("ix_ai_predictions_created", "ai_predictions", ("created_at",)),
+    ("ix_ai_prediction_results_prediction_id", "ai_prediction_results", ("prediction_id",)),
+]
+
+
+@migration(3, "indexes for hot filter columns")
+def _hot_filter_indexes(conn):
+    for name, table_name, columns in HOT_FILTER_INDEXES:
+        create_index(conn, name, table_name, *columns)
+
+
+@migration(4, "stat_counters for /admin/stats")
+def _stat_counters(conn):
+    create_table(
+        conn, "stat_counters",
+        Column("name", String, primary_key=True),
+        Column("value", Integer, nullable=False),
+        Column("updated_at", DateTime),
+    )
+
+    # Seed the counters from the source tables
+    counts = dict.fromkeys([
+        "total_users", "patients", "doctors", "medvault_records", "ai_predictions",
+        "pending_predictions", "verified_predictions", "rejected_predictions",
+    ], 0)
+    roles = {"PATIENT": "patients", "DOCTOR": "doctors"}
+    states = {
+        "NO": "pending_predictions",
+        "YES": "verified_predictions",
+        "VERIFIED": "verified_predictions",
+        "REJECTED": "rejected_predictions",
+    }
+    for role, count in conn.execute(text("SELECT role, COUNT(*) FROM users GROUP BY role")):
+        counts["total_users"] += count
+        if role in roles:
+            counts[roles[role]] += count
+    counts["medvault_records"] = conn.execute(text("SELECT COUNT(*) FROM medical_records")).scalar()
+    for state, count in conn.execute(text(
+        "SELECT doctor_verified, COUNT(*) FROM ai_predictions GROUP BY doctor_verified"
+    )):
+        counts["ai_predictions"] += count
+        if state in states:
+            counts[states[state]] += count
+
+    existing = {row[0] for row in conn.execute(text("SELECT name FROM stat_counters"))}
+    now = datetime.utcnow()
+    for name, value in counts.items():
+        if name not in existing:
+            conn.execute(
+                text("INSERT INTO stat_counters (name, value, updated_at) VALUES (:name, :value, :now)"),
+                {"name": name, "value": value, "now": now}
+            )
+
+
+@migration(5, "daily analytics rollups")
+def _daily_rollups(conn):
+    create_table(
+        conn, "daily_rollups",
+        Column("domain", String, primary_key=True),
+        Column("day", Date, primary_key=True),
+        Column("count", Integer, nullable=False),
+    )
+    create_table(
+        conn, "rollup_watermarks",
+        Column("domain", String, primary_key=True),
+        Column("closed_through", Date, nullable=False),
+    )
+
+
+@migration(6, "unique active appointment per doctor slot")
+def _doctor_slot_unique(conn):
+    clashes = conn.execute(text(
+        "SELECT doctor_id, appointment_date, appointment_time, COUNT(*) "
+        "FROM appointments WHERE status IN ('PENDING', 'APPROVED') "
+        "GROUP BY doctor_id, appointment_date, appointment_time "
+        "HAVING COUNT(*) > 1"
+    )).fetchall()
+    if clashes:
+        raise RuntimeError(
+            f"{len(clashes)} doctor slots have more than one PENDING/APPROVED "
+            "appointment; cancel the duplicates before running migration 6"
+        )
+    create_index(
+        conn, "uq_appointments_doctor_slot", "appointments",
+        "doctor_id", "appointment_date", "appointment_time",
+        unique=True,
+        where="status IN ('PENDING', 'APPROVED')"
+    )
+
+
+@migration(7, "resumable upload sessions")
+def _upload_sessions(conn):
+    create_table(
+        conn, "upload_sessions",
+        Column("id", String, primary_key=True),
+        Column("user_id", String, ForeignKey("users.id"), nullable=False),
+        Column("kind", String, nullable=False),
+        Column("filename", String, nullable=False),
+        Column("record_type", String),
+        Column("size", BigInteger, nullable=False),
+        Column("received", BigInteger, nullable=False),
+        Column("created_at", DateTime, index=True),
+        references=["users"]
+    )
+
+
+@migration(8, "content-addressed blob refcounts")
+def _blobs(conn):
+    create_table(
+        conn, "blobs",
+        Column("key", String, primary_key=True),
+        Column("size", BigInteger),
+        Column("refcount", Integer, nullable=False),
+        Column("created_at", DateTime),
+        Column("updated_at", DateTime),
+    )
+
+
+@migration(9, "indexes on stored file paths")
+def _file_path_indexes(conn):
+    create_index(conn, "ix_medical_records_file_path", "medical_records", "file_path")
+    create_index(conn, "ix_ai_predictions_image_path", "ai_predictions", "image_path")
+
+
+@migration(10, "ai_predictions probability vector")
+def _prediction_probabilities(conn):
+    # Existing predictions keep their ai_prediction_results rows; only the
+    # top 3 was ever stored, so there is no full vector to backfill
+    add_column_if_missing(conn, "ai_predictions", Column("probabilities", LargeBinary))
+    add_column_if_missing(conn, "ai_predictions", Column("model_version", String))
+
+
+@migration(11, "ai_predictions job claims")
+def _prediction_job_claims(conn):
+    add_column_if_missing(conn, "ai_predictions", Column("claimed_at", DateTime))
+
+
+# =========================
+# RUNNER
+# =========================
+def _applied_versions(conn):
+    _meta.create_all(bind=conn)
+    return {row.version for row in conn.execute(schema_migrations.select())}
+
+
+def run_migrations(engine):
+    with engine.begin() as conn:
+        # Several workers may boot at once; only one migrates
+        if conn.dialect.name == "postgresql":
+            conn.execute(text("SELECT pg_advisory_xact_lock(7405112)"))
+
+        applied = _applied_versions(conn)
+        for version, description, fn in sorted(MIGRATIONS, key=lambda m: m[0]):
+            if version in applied:
+                continue
+            fn(conn)
+            conn.execute(schema_migrations.insert().values(
+                version=version,
+                description=description,
+                applied_at=datetime.utcnow()
+            ))
+
+
+def migration_status(engine):
+    with engine.begin() as conn:
+        applied = _applied_versions(conn)
+    return [
+        (version, description, version in applied)
+        for version, description, _ in sorted(MIGRATIONS, key=lambda m: m[0])
+    ]
+
+
+if __name__ == "__main__":
+    from .database import engine
+
+    if sys.argv[1:] == ["status"]:
+        for version, description, applied in migration_status(engine):
+            print(f"{version:>4}  {'applied' if applied else 'pending':<8} {description}")
+    else:
+        run_migrations(engine)
@@ -0,0 +1,131 @@
+import argparse
+import copy
+import os
+import time
+
+import torch
+
+from .model import INPUT_SHAPE, load_model
+from ..config import (
+    INFERENCE_CALIBRATION_DIR,
+    INFERENCE_PARITY_TOLERANCE
+)
+
+BACKENDS = ["eager", "torchscript", "quantized_dynamic", "quantized_static"]
+IMAGE_EXTENSIONS = (".png", ".jpg", ".jpeg", ".bmp")
+
+
+def sample_inputs(count: int = 8, image_dir: str = INFERENCE_CALIBRATION_DIR):
+    """Preprocessed X-rays from image_dir, or seeded noise when none are available."""
+    if image_dir and os.path.isdir(image_dir):
+        from .predictor import load_image, preprocess
+
+        files = sorted(
+            f for f in os.listdir(image_dir)
+            if f.lower().endswith(IMAGE_EXTENSIONS)
+        )[:count]
+        if files:
+            return torch.stack([
+                preprocess(load_image(os.path.join(image_dir, f))) for f in files
+            ])
+
+    generator = torch.Generator().manual_seed(0)
+    return torch.randn((count,) + INPUT_SHAPE[1:], generator=generator)
+
+
+def _torchscript(model):
+    with torch.no_grad():
+        traced = torch.jit.trace(model, torch.zeros(INPUT_SHAPE))
+    return torch.jit.optimize_for_inference(torch.jit.freeze(traced.eval()))
+
+
+def _quantized_dynamic(model):
+    # Only the classifier is Linear; the conv trunk stays float32
+    return torch.ao.quantization.quantize_dynamic(
+        model, {torch.nn.Linear}, dtype=torch.qint8
+    )
+
+
+def _quantized_static(model):
+    from torch.ao.quantization import get_default_qconfig_mapping
+    from torch.ao.quantization.quantize_fx import convert_fx, prepare_fx
+
+    engine = "x86" if "x86" in torch.backends.quantized.supported_engines else "qnnpack"
+    torch.backends.quantized.engine = engine
+
+    prepared = prepare_fx(
+        model,
+        get_default_qconfig_mapping(engine),
+        example_inputs=(torch.zeros(INPUT_SHAPE),)
+    )
+    with torch.no_grad():
+        for batch in sample_inputs(count=32).split(8):
+            prepared(batch)
+    return convert_fx(prepared)
+
+
+_BUILDERS = {
+    "eager": lambda model: model,
+    "torchscript": _torchscript,
+    "quantized_dynamic": _quantized_dynamic,
+    "quantized_static": _quantized_static,
+}
+
+
+def build_backend(model, name: str):
+    if name not in _BUILDERS:
+        raise ValueError(f"Unknown inference backend '{name}'. Choose from {BACKENDS}")
+    # Quantization rewrites modules in place; keep the eager model intact
+    source = model if name in ("eager", "torchscript") else copy.deepcopy(model)
+    return _BUILDERS[name](source)
+
+
+def check_parity(baseline, candidate, inputs, tolerance: float = INFERENCE_PARITY_TOLERANCE):
+    """Compare the 14 sigmoid outputs of candidate against the eager baseline."""
+    with torch.no_grad():
+        expected = baseline(inputs)
+        actual = candidate(inputs)
+
+    max_abs_diff = float((expected - actual).abs().max())
+    return {
+        "max_abs_diff": round(max_abs_diff, 5),
+        "tolerance": tolerance,
+        "ok": max_abs_diff <= tolerance,
+    }
+
+
+def _latency_ms(model, repeats: int = 10):
+    sample = torch.zeros(INPUT_SHAPE)
+    with torch.no_grad():
+        model(sample)
+        started = time.perf_counter()
+        for _ in range(repeats):
+            model(sample)
+    return round((time.perf_counter() - started) * 1000 / repeats, 2)
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description="Check every inference backend against the eager model"
+    )
+    parser.add_argument("--images", default=INFERENCE_CALIBRATION_DIR)
+    parser.add_argument("--tolerance", type=float, default=INFERENCE_PARITY_TOLERANCE)
+    parser.add_argument("--repeats", type=int, default=10)
+    args = parser.parse_args()
+
+    eager = load_model()
+    inputs = sample_inputs(image_dir=args.images)
+    failed = False
+
+    for name in BACKENDS:
+        candidate = build_backend(eager, name)
+        report = check_parity(eager, candidate, inputs, args.tolerance)
+        report["latency_ms"] = _latency_ms(candidate, args.repeats)
+        failed = failed or not report["ok"]
+        print(f"{name:<18} {report}")
+
+    raise SystemExit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,112 @@
+import queue
+import threading
+import time
+from concurrent.futures import Future
+
+import torch
+
+
+class BatchingPredictor:
+    """
+    Gathers concurrent single-image requests into batches and runs one
+    forward pass per batch on a background thread.
+    """
+
+    def __init__(self, forward, max_batch_size: int = 8, max_wait_ms: float = 10,
+                 collate=torch.stack):
+        self.forward = forward
+        self.collate = collate
+        self.max_batch_size = max(1, max_batch_size)
+        self.max_wait = max(0.0, max_wait_ms) / 1000.0
+
+        self._queue = queue.Queue()
+        self._thread = None
+        self._start_lock = threading.Lock()
+        self._metrics_lock = threading.Lock()
+
+        # 📊 Tuning metrics
+        self.batches_run = 0
+        self.items_processed = 0
+        self.batch_sizes = {}  # batch size -> number of batches
+        self.total_wait_ms = 0.0
+        self.total_forward_ms = 0.0
+
+    def _ensure_started(self):
+        if self._thread is not None:
+            return
+        with self._start_lock:
+            if self._thread is None:
+                self._thread = threading.Thread(
+                    target=self._run, name="healthai-batcher", daemon=True
+                )
+                self._thread.start()
+
+    def submit(self, tensor: torch.Tensor) -> Future:
+        """Queue one preprocessed input; resolves to its output row."""
+        self._ensure_started()
+        future = Future()
+        self._queue.put((tensor, future, time.monotonic()))
+        return future
+
+    def predict(self, tensor: torch.Tensor, timeout: float = None):
+        return self.submit(tensor).result(timeout=timeout)
+
+    def _collect(self):
+        batch = [self._queue.get()]
+        deadline = time.monotonic() + self.max_wait
+
+        while len(batch) < self.max_batch_size:
+            remaining = deadline - time.monotonic()
+            try:
+                if remaining <= 0:
+                    batch.append(self._queue.get_nowait())
+                else:
+                    batch.append(self._queue.get(timeout=remaining))
+            except queue.Empty:
+                break
+
+        return batch
+
+    def _run(self):
+        while True:
+            batch = self._collect()
+            started = time.monotonic()
+
+            try:
+                with torch.no_grad():
+                    outputs = self.forward(self.collate([t for t, _, _ in batch]))
+                outputs = outputs.numpy()
+            except Exception as exc:
+                for _, future, _ in batch:
+                    future.set_exception(exc)
+                continue
+
+            finished = time.monotonic()
+            for row, (_, future, _) in zip(outputs, batch):
+                future.set_result(row)
+
+            with self._metrics_lock:
+                size = len(batch)
+                self.batches_run += 1
+                self.items_processed += size
+                self.batch_sizes[size] = self.batch_sizes.get(size, 0) + 1
+                self.total_wait_ms += sum(
+                    (started - queued_at) * 1000 for _, _, queued_at in batch
+                )
+                self.total_forward_ms += (finished - started) * 1000
+
+    def metrics(self) -> dict:
+        with self._metrics_lock:
+            batches = self.batches_run or 1
+            items = self.items_processed or 1
+            return {
+                "queue_depth": self._queue.qsize(),
+                "max_batch_size": self.max_batch_size,
+                "max_wait_ms": self.max_wait * 1000,
+                "batches_run": self.batches_run,
+                "items_processed": self.items_processed,
+                "avg_batch_size": round(self.items_processed / batches, 2),
+                "batch_size_histogram": dict(sorted(self.batch_sizes.items())),
+                "avg_queue_wait_ms": round(self.total_wait_ms / items, 2),
+                "avg_forward_ms": round(self.total_forward_ms / batches, 2),
+            }
@@ -0,0 +1,103 @@
+import hashlib
+import json
+import os
+import threading
+from collections import OrderedDict
+
+
+def image_key(image, model_version: str) -> str:
+    """Content hash of a decoded PIL image plus the model that scored it."""
+    digest = hashlib.sha256()
+    digest.update(f"{model_version}|{image.mode}|{image.size}|".encode())
+    digest.update(image.tobytes())
+    return digest.hexdigest()
+
+
+class PredictionCache:
+    """
+    In-memory LRU of model outputs with an optional on-disk tier that
+    survives restarts and is shared between workers on the same host.
+    """
+
+    def __init__(self, max_entries: int = 1024, disk_dir: str = ""):
+        self.max_entries = max_entries
+        self.disk_dir = disk_dir or None
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+        self.memory_hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self.evictions = 0
+
+        if self.disk_dir:
+            os.makedirs(self.disk_dir, exist_ok=True)
+
+    @property
+    def enabled(self) -> bool:
+        return self.max_entries > 0 or self.disk_dir is not None
+
+    def _disk_path(self, key: str) -> str:
+        return os.path.join(self.disk_dir, key[:2], f"{key}.json")
+
+    def get(self, key: str):
+        with self._lock:
+            value = self._entries.get(key)
+            if value is not None:
+                self._entries.move_to_end(key)
+                self.memory_hits += 1
+                return value
+
+        if self.disk_dir:
+            try:
+                with open(self._disk_path(key)) as f:
+                    value = json.load(f)
+            except (OSError, ValueError):
+                value = None
+
+            if value is not None:
+                with self._lock:
+                    self.disk_hits += 1
+                self._remember(key, value)
+                return value
+
+        with self._lock:
+            self.misses += 1
+        return None
+
+    def put(self, key: str, value):
+        self._remember(key, value)
+
+        if self.disk_dir:
+            path = self._disk_path(key)
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            tmp_path = f"{path}.{threading.get_ident()}.tmp"
+            with open(tmp_path, "w") as f:
+                json.dump(value, f)
+            os.replace(tmp_path, path)
+
+    def _remember(self, key: str, value):
+        if self.max_entries <= 0:
+            return
+        with self._lock:
+            self._entries[key] = value
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+                self.evictions += 1
+
+    def stats(self) -> dict:
+        with self._lock:
+            hits = self.memory_hits + self.disk_hits
+            lookups = hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "max_entries": self.max_entries,
+                "disk_tier": self.disk_dir is not None,
+                "hits": hits,
+                "memory_hits": self.memory_hits,
+                "disk_hits": self.disk_hits,
+                "misses": self.misses,
+                "evictions": self.evictions,
+                "hit_ratio": round(hits / lookups, 3) if lookups else 0.0,
+            }
@@ -1,17 +1,75 @@
+import os
+import re
+
 import torch
 import torchvision.models as models
 
-def load_model():
-    model = models.densenet121(pretrained=True)
+from ..config import MODEL_CHECKPOINT_PATH, MODEL_ALLOW_DOWNLOAD
+
+NUM_CLASSES = 14
+INPUT_SHAPE = (1, 3, 224, 224)
+
+# Old torchvision DenseNet checkpoints use "norm.1" style keys
+_LEGACY_KEY = re.compile(
+    r"^(.*denselayer\d+\.(?:norm|relu|conv))\.((?:[12])\.(?:weight|bias|running_mean|running_var))$"
+)
+
+
+def build_model(pretrained: bool = False):
+    weights = models.DenseNet121_Weights.IMAGENET1K_V1 if pretrained else None
+    model = models.densenet121(weights=weights)
 
     # Modify classifier for multi-label output (14 diseases)
     num_features = model.classifier.in_features
     model.classifier = torch.nn.Sequential(
-        torch.nn.Linear(num_features, 14),
+        torch.nn.Linear(num_features, NUM_CLASSES),
         torch.nn.Sigmoid()  # multi-label probabilities
     )
+    return model
+
+
+def _load_checkpoint(model, checkpoint_path: str):
+    state = torch.load(checkpoint_path, map_location="cpu", weights_only=True)
+    if "state_dict" in state:
+        state = state["state_dict"]
+
+    own = model.state_dict()
+    loaded = {}
+    for key, value in state.items():
+        key = key.removeprefix("module.")
+        match = _LEGACY_KEY.match(key)
+        if match:
+            key = match.group(1) + match.group(2)
+        # A plain ImageNet backbone checkpoint has a 1000-class head; keep ours
+        if key in own and own[key].shape == value.shape:
+            loaded[key] = value
+
+    missing = [k for k in own if k not in loaded]
+    if len(missing) == len(own):
+        raise RuntimeError(f"No usable weights found in {checkpoint_path}")
+
+    model.load_state_dict(loaded, strict=False)
+    return missing
+
+
+def load_model(checkpoint_path: str = MODEL_CHECKPOINT_PATH):
+    if checkpoint_path and os.path.exists(checkpoint_path):
+        model = build_model()
+        _load_checkpoint(model, checkpoint_path)
+    elif MODEL_ALLOW_DOWNLOAD:
+        model = build_model(pretrained=True)
+    else:
+        raise RuntimeError(
+            "Model checkpoint not found. Set MODEL_CHECKPOINT_PATH "
+            "(or MODEL_ALLOW_DOWNLOAD=true to fetch ImageNet weights)."
+        )
 
     model.eval()  # inference mode
     return model
 
-model = load_model()
+
+def warm_up(model, passes: int = 2):
+    # TorchScript specializes its graph during the first couple of calls
+    with torch.no_grad():
+        for _ in range(passes):
+            model(torch.zeros(INPUT_SHAPE))
@@ -1,26 +1,53 @@
-import torch
-import numpy as np
-from PIL import Image
-from torchvision import transforms
-from .model import model
+from .registry import get_model
 from .labels import DISEASE_LABELS
+from .batcher import BatchingPredictor
+from .cache import PredictionCache, image_key
+from .preprocess import BatchPreprocessor, load_grayscale, resize, to_tensor
+from ..config import (
+    BATCH_MAX_SIZE,
+    BATCH_MAX_WAIT_MS,
+    INFERENCE_BACKEND,
+    MODEL_VERSION,
+    PREDICTION_CACHE_SIZE,
+    PREDICTION_CACHE_DIR
+)
 
-# Image preprocessing pipeline
-transform = transforms.Compose([
-    transforms.Resize((224, 224)),
-    transforms.Grayscale(num_output_channels=3),
-    transforms.ToTensor(),
-    transforms.Normalize(mean=[0.485, 0.456, 0.406],
-                         std=[0.229, 0.224, 0.225])
-])
 
-def predict_xray(image_path: str, top_k: int = 3):
-    image = Image.open(image_path).convert("RGB")
-    image = transform(image).unsqueeze(0)  # shape: [1, 3, 224, 224]
+def _forward(batch):
+    return get_model()(batch)
+
+
+# Requests hand over resized uint8 pixels; the batching thread normalizes the
+# whole batch into one reusable buffer before the forward pass
+preprocessor = BatchPreprocessor(max_batch_size=BATCH_MAX_SIZE)
+
+# Concurrent requests share one forward pass per batch
+batcher = BatchingPredictor(
+    _forward,
+    max_batch_size=BATCH_MAX_SIZE,
+    max_wait_ms=BATCH_MAX_WAIT_MS,
+    collate=preprocessor.collate
+)
+
+# Backends differ slightly in their outputs, so each gets its own cache keys
+CACHE_VERSION = f"{MODEL_VERSION}/{INFERENCE_BACKEND}"
+
+# Re-uploads of the same X-ray skip the forward pass
+cache = PredictionCache(
+    max_entries=PREDICTION_CACHE_SIZE,
+    disk_dir=PREDICTION_CACHE_DIR
+)
+
+
+def load_image(image_path: str):
+    return load_grayscale(image_path)
+
 
-    with torch.no_grad():
-        outputs = model(image)[0].numpy()
+def preprocess(image):
+    return to_tensor(resize(image))  # shape: [3, 224, 224]
 
+
+def format_predictions(outputs, top_k: int = 3):
     predictions = []
     for idx, prob in enumerate(outputs):
         predictions.append({
@@ -33,5 +60,24 @@ def predict_xray(image_path: str, top_k: int = 3):
 
     return {
         "all_predictions": predictions,
-        "top_3": predictions[:top_k]
+        "top_3": predictions[:top_k],
+        # Raw vector in DISEASE_LABELS order, for storage
+        "probabilities": [float(p) for p in outputs],
+        "model_version": CACHE_VERSION
     }
+
+
+def predict_xray(image_path: str, top_k: int = 3):
+    return predict_image(load_image(image_path), top_k)
+
+
+def predict_image(image, top_k: int = 3):
+    key = image_key(image, CACHE_VERSION) if cache.enabled else None
+    outputs = cache.get(key) if key else None
+
+    if outputs is None:
+        outputs = batcher.predict(resize(image)).tolist()
+        if key:
+            cache.put(key, outputs)
+
+    return format_predictions(outputs, top_k)
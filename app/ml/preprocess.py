@@ -0,0 +1,126 @@
+import argparse
+import threading
+import time
+
+import numpy as np
+import torch
+from PIL import Image
+
+IMAGE_SIZE = (224, 224)
+MEAN = np.array([0.485, 0.456, 0.406], dtype=np.float32).reshape(3, 1, 1)
+STD = np.array([0.229, 0.224, 0.225], dtype=np.float32).reshape(3, 1, 1)
+
+# ToTensor + Normalize folded into one multiply-add on raw uint8 pixels:
+# (x / 255 - mean) / std == x * SCALE + BIAS, up to float32 rounding (the
+# two differ by a few ULPs, under 1e-6; see tests/test_preprocess.py)
+SCALE = (1.0 / (255.0 * STD)).astype(np.float32)
+BIAS = (-MEAN / STD).astype(np.float32)
+
+
+def load_grayscale(image_path: str):
+    """Decode straight to a single channel; X-rays carry no colour."""
+    return Image.open(image_path).convert("L")
+
+
+def resize(image) -> np.ndarray:
+    """Single bilinear resize to the model input size, as uint8 [224, 224]."""
+    return np.asarray(image.resize(IMAGE_SIZE, Image.BILINEAR), dtype=np.uint8)
+
+
+def normalize_into(pixels: np.ndarray, out: np.ndarray):
+    """
+    Broadcast [N, H, W] uint8 grayscale into [N, 3, H, W] normalized float32,
+    writing into out without temporaries.
+    """
+    np.multiply(pixels[:, None, :, :], SCALE, out=out)
+    np.add(out, BIAS, out=out)
+    return out
+
+
+class BatchPreprocessor:
+    """
+    Owns a preallocated [max_batch, 3, 224, 224] float32 buffer that each
+    batch is normalized into. Only the batching thread may call collate,
+    and a returned tensor is valid until the next collate call.
+    """
+
+    def __init__(self, max_batch_size: int = 8):
+        self._buffer = np.empty((max(1, max_batch_size), 3) + IMAGE_SIZE, dtype=np.float32)
+        self._owner = None
+
+    def collate(self, items):
+        if self._owner is None:
+            self._owner = threading.get_ident()
+        assert self._owner == threading.get_ident(), "collate is single-threaded"
+
+        if len(items) > len(self._buffer):
+            self._buffer = np.empty((len(items), 3) + IMAGE_SIZE, dtype=np.float32)
+
+        out = self._buffer[:len(items)]
+        normalize_into(np.stack(items), out)
+        return torch.from_numpy(out)
+
+
+def to_tensor(pixels: np.ndarray):
+    """Normalize one resized image into a fresh [3, 224, 224] tensor."""
+    out = np.empty((1, 3) + IMAGE_SIZE, dtype=np.float32)
+    return torch.from_numpy(normalize_into(pixels[None], out)[0])
+
+
+def reference_transform():
+    """The original torchvision pipeline, kept for comparison."""
+    from torchvision import transforms
+
+    return transforms.Compose([
+        transforms.Resize(IMAGE_SIZE),
+        transforms.Grayscale(num_output_channels=3),
+        transforms.ToTensor(),
+        transforms.Normalize(mean=[0.485, 0.456, 0.406],
+                             std=[0.229, 0.224, 0.225])
+    ])
+
+
+def benchmark(image_path: str = None, repeats: int = 50):
+    if image_path:
+        with Image.open(image_path) as source:
+            source.load()
+            original = source.copy()
+    else:
+        rng = np.random.default_rng(0)
+        original = Image.fromarray(rng.integers(0, 256, (2048, 2048), dtype=np.uint8))
+
+    transform = reference_transform()
+
+    started = time.perf_counter()
+    for _ in range(repeats):
+        expected = transform(original.convert("RGB"))
+    reference_ms = (time.perf_counter() - started) * 1000 / repeats
+
+    started = time.perf_counter()
+    for _ in range(repeats):
+        actual = to_tensor(resize(original.convert("L")))
+    vectorized_ms = (time.perf_counter() - started) * 1000 / repeats
+
+    # One grey level after normalization, the rounding gap between
+    # "resize RGB then grey" and "grey then resize"
+    one_level = float((1.0 / (255.0 * STD)).max())
+    max_abs_diff = float((expected - actual).abs().max())
+
+    return {
+        "image_size": original.size,
+        "reference_ms": round(reference_ms, 3),
+        "vectorized_ms": round(vectorized_ms, 3),
+        "speedup": round(reference_ms / vectorized_ms, 2),
+        "max_abs_diff": round(max_abs_diff, 6),
+        "max_grey_levels": round(max_abs_diff / one_level, 3),
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Compare the vectorized preprocessing with the torchvision transform"
+    )
+    parser.add_argument("image", nargs="?")
+    parser.add_argument("--repeats", type=int, default=50)
+    args = parser.parse_args()
+    print(benchmark(args.image, args.repeats))
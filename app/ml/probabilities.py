@@ -0,0 +1,50 @@
+"""
+Compact storage for the model's 14 finding probabilities.
+
+Each prediction keeps its full output vector in ai_predictions.probabilities
+as little-endian float32 in DISEASE_LABELS order (56 bytes), instead of
+three ai_prediction_results rows of strings. Top-k is derived on read, and
+many vectors stack into one matrix for analytics. Predictions stored before
+the column existed still read from their result rows.
+"""
+import numpy as np
+
+from .labels import DISEASE_LABELS
+
+DTYPE = np.dtype("<f4")
+WIDTH = len(DISEASE_LABELS)
+
+
+def encode(probabilities) -> bytes:
+    vector = np.asarray(probabilities, dtype=DTYPE)
+    if vector.shape != (WIDTH,):
+        raise ValueError(f"Expected {WIDTH} probabilities, got shape {vector.shape}")
+    return vector.tobytes()
+
+
+def decode(blob: bytes) -> np.ndarray:
+    return np.frombuffer(blob, dtype=DTYPE)
+
+
+def matrix(blobs) -> np.ndarray:
+    """(n, 14) array from an iterable of stored vectors."""
+    return np.frombuffer(b"".join(blobs), dtype=DTYPE).reshape(-1, WIDTH)
+
+
+def top_k(vector: np.ndarray, k: int = 3) -> list:
+    # Stable sort keeps label order among ties, like format_predictions
+    order = np.argsort(-vector, kind="stable")[:k]
+    return [
+        {"disease": DISEASE_LABELS[i], "confidence": round(float(vector[i]), 3)}
+        for i in order
+    ]
+
+
+def results(prediction, k: int = 3) -> list:
+    """Top-k findings of an AIPrediction, from its vector or legacy result rows."""
+    if prediction.probabilities is not None:
+        return top_k(decode(prediction.probabilities), k)
+    return [
+        {"disease": r.disease_name, "confidence": float(r.confidence_score)}
+        for r in prediction.results
+    ]
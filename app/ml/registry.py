@@ -0,0 +1,91 @@
+import threading
+import time
+
+
+class ModelRegistry:
+    """
+    Loads the HealthAI model on first use (or from a startup hook) and
+    tracks readiness. Importing this module does not import torch.
+    """
+
+    def __init__(self):
+        self._model = None
+        self._lock = threading.Lock()
+        self.state = "NOT_LOADED"  # NOT_LOADED | LOADING | READY | FAILED
+        self.error = None
+        self.load_seconds = None
+        self.warmup_seconds = None
+        self.backend = None
+        self.parity = None
+
+    @property
+    def ready(self) -> bool:
+        return self._model is not None
+
+    def get(self):
+        if self._model is None:
+            with self._lock:
+                if self._model is None:
+                    self._load()
+        return self._model
+
+    def _load(self):
+        from .model import load_model, warm_up
+        from .backends import build_backend, check_parity, sample_inputs
+        from ..config import INFERENCE_BACKEND, INFERENCE_PARITY_CHECK
+
+        self.state = "LOADING"
+        self.error = None
+        try:
+            started = time.monotonic()
+            model = load_model()
+            backend = INFERENCE_BACKEND
+
+            if backend != "eager":
+                optimized = build_backend(model, backend)
+                if INFERENCE_PARITY_CHECK:
+                    self.parity = check_parity(model, optimized, sample_inputs(count=4))
+                    if not self.parity["ok"]:
+                        optimized, backend = model, "eager"
+                model = optimized
+
+            loaded = time.monotonic()
+            warm_up(model)
+            self.load_seconds = round(loaded - started, 3)
+            self.warmup_seconds = round(time.monotonic() - loaded, 3)
+        except Exception as exc:
+            self.state = "FAILED"
+            self.error = str(exc)
+            raise
+
+        self._model = model
+        self.backend = backend
+        self.state = "READY"
+
+    def preload(self):
+        """Start loading in a background thread so startup is not blocked."""
+        def _run():
+            try:
+                self.get()
+            except Exception:
+                pass  # surfaced through status()
+
+        threading.Thread(target=_run, name="healthai-model-loader", daemon=True).start()
+
+    def status(self) -> dict:
+        return {
+            "state": self.state,
+            "ready": self.ready,
+            "error": self.error,
+            "backend": self.backend,
+            "parity": self.parity,
+            "load_seconds": self.load_seconds,
+            "warmup_seconds": self.warmup_seconds,
+        }
+
+
+model_registry = ModelRegistry()
+
+
+def get_model():
+    return model_registry.get()
@@ -0,0 +1,28 @@
+# Entry points submitted to the inference pool. Kept free of torch imports
+# so they can be pickled into worker processes without loading the model
+# in the API process.
+
+
+def predict(image_path: str, top_k: int = 3, derivatives_key: str = None):
+    from .predictor import load_image, predict_image
+
+    image = load_image(image_path)
+    if derivatives_key:
+        # Thumbnails reuse this decode instead of reading the upload again
+        from ..derivatives import schedule
+        schedule(derivatives_key, image)
+
+    return predict_image(image, top_k)
+
+
+def warm_up():
+    from .registry import model_registry
+    try:
+        model_registry.get()
+    except Exception:
+        pass  # surfaced through model_status()
+
+
+def model_status():
+    from .registry import model_registry
+    return model_registry.status()
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, String, DateTime, ForeignKey, Date, Time, Boolean
+from sqlalchemy import Column, String, DateTime, ForeignKey, Date, Time, Boolean, Index, Integer, BigInteger, LargeBinary, text
 from sqlalchemy.orm import relationship
 from datetime import datetime
 import uuid
@@ -20,7 +20,7 @@ class User(Base):
     email = Column(String, unique=True, index=True, nullable=False)
     password_hash = Column(String, nullable=False)
     role = Column(String, nullable=False)  # PATIENT | DOCTOR | ADMIN
-    created_at = Column(DateTime, default=datetime.utcnow)
+    created_at = Column(DateTime, default=datetime.utcnow, index=True)
 
     patient = relationship("Patient", back_populates="user", uselist=False)
     doctor = relationship("Doctor", back_populates="user", uselist=False)
@@ -33,7 +33,7 @@ class Patient(Base):
     __tablename__ = "patients"
 
     id = Column(String, primary_key=True, default=lambda: str(uuid.uuid4()))
-    user_id = Column(String, ForeignKey("users.id"), nullable=False)
+    user_id = Column(String, ForeignKey("users.id"), nullable=False, index=True)
 
     age = Column(String)
     gender = Column(String)
@@ -51,7 +51,7 @@ class Doctor(Base):
     __tablename__ = "doctors"
 
     id = Column(String, primary_key=True, default=lambda: str(uuid.uuid4()))
-    user_id = Column(String, ForeignKey("users.id"), nullable=False)
+    user_id = Column(String, ForeignKey("users.id"), nullable=False, index=True)
 
     specialization = Column(String)
     experience_years = Column(String)
@@ -84,6 +84,20 @@ class Appointment(Base):
     patient = relationship("Patient", back_populates="appointments")
     doctor = relationship("Doctor", back_populates="appointments")
 
+    __table_args__ = (
+        Index("ix_appointments_patient_created", "patient_id", "created_at"),
+        Index("ix_appointments_doctor_created", "doctor_id", "created_at"),
+        Index("ix_appointments_patient_doctor_status", "patient_id", "doctor_id", "status"),
+        # One active booking per doctor slot
+        Index(
+            "uq_appointments_doctor_slot",
+            "doctor_id", "appointment_date", "appointment_time",
+            unique=True,
+            sqlite_where=text("status IN ('PENDING', 'APPROVED')"),
+            postgresql_where=text("status IN ('PENDING', 'APPROVED')"),
+        ),
+    )
+
 
 # =========================
 # BED MANAGEMENT (MediSlot)
@@ -96,7 +110,7 @@ class Bed(Base):
     bed_number = Column(String, nullable=False)
 
     is_available = Column(Boolean, default=True)
-    created_at = Column(DateTime, default=datetime.utcnow)
+    created_at = Column(DateTime, default=datetime.utcnow, index=True)
 
 
 class BedAllocation(Base):
@@ -113,6 +127,11 @@ class BedAllocation(Base):
     status = Column(String, default="ACTIVE")  
     # ACTIVE | RELEASED
 
+    __table_args__ = (
+        Index("ix_bed_allocations_patient_status", "patient_id", "status"),
+        Index("ix_bed_allocations_allocated", "allocated_at"),
+    )
+
 
 class BedStatus(Base):
     __tablename__ = "bed_status"
@@ -141,6 +160,13 @@ class MedicalRecord(Base):
 
     patient = relationship("Patient", back_populates="records")
 
+    __table_args__ = (
+        Index("ix_medical_records_patient_created", "patient_id", "created_at"),
+        Index("ix_medical_records_created", "created_at"),
+        # Blob access checks and refcount recounts
+        Index("ix_medical_records_file_path", "file_path"),
+    )
+
 
 
 
@@ -162,15 +188,33 @@ class AIPrediction(Base):
     verified_by = Column(String, ForeignKey("users.id"), nullable=True)
     verified_at = Column(DateTime, nullable=True)
 
+    # ⏳ Inference job state
+    status = Column(String, default="DONE", server_default="DONE")  # QUEUED / RUNNING / DONE / FAILED
+    error = Column(String, nullable=True)
+    claimed_at = Column(DateTime, nullable=True)  # when a worker took the job (RUNNING)
+
+    # 📊 All 14 probabilities as float32 in DISEASE_LABELS order (see
+    # app/ml/probabilities.py); NULL for predictions stored as result rows
+    probabilities = Column(LargeBinary, nullable=True)
+    model_version = Column(String, nullable=True)
+
     created_at = Column(DateTime, default=datetime.utcnow)
 
     # 🔗 Relationships
+    # Legacy top-3 rows; new predictions only store `probabilities`
     results = relationship(
         "AIPredictionResult",
         back_populates="prediction",
         cascade="all, delete"
     )
 
+    __table_args__ = (
+        Index("ix_ai_predictions_verified_created", "doctor_verified", "created_at"),
+        Index("ix_ai_predictions_patient_created", "patient_id", "created_at"),
+        Index("ix_ai_predictions_image_path", "image_path"),
+        Index("ix_ai_predictions_created", "created_at"),
+    )
+
 
 
 
@@ -178,8 +222,71 @@ class AIPredictionResult(Base):
     __tablename__ = "ai_prediction_results"
 
     id = Column(String, primary_key=True, default=lambda: str(uuid.uuid4()))
-    prediction_id = Column(String, ForeignKey("ai_predictions.id"), nullable=False)
+    prediction_id = Column(String, ForeignKey("ai_predictions.id"), nullable=False, index=True)
     disease_name = Column(String, nullable=False)
     confidence_score = Column(String, nullable=False)
 
     prediction = relationship("AIPrediction", back_populates="results")
+
+
+
+# =========================
+# ADMIN STATS
+# =========================
+class StatCounter(Base):
+    __tablename__ = "stat_counters"
+
+    name = Column(String, primary_key=True)
+    value = Column(Integer, nullable=False, default=0)
+    updated_at = Column(DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+
+# =========================
+# ANALYTICS ROLLUPS
+# =========================
+class DailyRollup(Base):
+    __tablename__ = "daily_rollups"
+
+    domain = Column(String, primary_key=True)  # healthai | medvault | users
+    day = Column(Date, primary_key=True)
+    count = Column(Integer, nullable=False, default=0)
+
+
+class RollupWatermark(Base):
+    __tablename__ = "rollup_watermarks"
+
+    domain = Column(String, primary_key=True)
+    # Every day up to and including this one is rolled up and immutable
+    closed_through = Column(Date, nullable=False)
+
+
+# =========================
+# RESUMABLE UPLOAD SESSIONS
+# =========================
+class UploadSession(Base):
+    __tablename__ = "upload_sessions"
+
+    id = Column(String, primary_key=True, default=lambda: str(uuid.uuid4()))
+    user_id = Column(String, ForeignKey("users.id"), nullable=False)
+
+    kind = Column(String, nullable=False)  # medvault | xray
+    filename = Column(String, nullable=False)
+    record_type = Column(String, nullable=True)
+    size = Column(BigInteger, nullable=False)
+    received = Column(BigInteger, nullable=False, default=0)
+    created_at = Column(DateTime, default=datetime.utcnow, index=True)
+
+
+# =========================
+# CONTENT-ADDRESSED BLOBS
+# =========================
+class Blob(Base):
+    __tablename__ = "blobs"
+
+    # "ab/cd/<sha256><ext>", relative to the blob store root
+    key = Column(String, primary_key=True)
+    size = Column(BigInteger, nullable=True)
+    # Rows in medical_records / ai_predictions pointing at this blob
+    refcount = Column(Integer, nullable=False, default=0)
+    created_at = Column(DateTime, default=datetime.utcnow)
+    updated_at = Column(DateTime, default=datetime.utcnow)
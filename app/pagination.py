@@ -0,0 +1,68 @@
+import base64
+import json
+from datetime import datetime
+
+from fastapi import HTTPException
+from sqlalchemy import and_, or_
+
+from .config import DEFAULT_PAGE_SIZE, MAX_PAGE_SIZE
+
+
+def encode_cursor(created_at: datetime, row_id: str) -> str:
+    raw = json.dumps([created_at.isoformat(), row_id]).encode()
+    return base64.urlsafe_b64encode(raw).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str):
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        created_at, row_id = json.loads(base64.urlsafe_b64decode(padded))
+        return datetime.fromisoformat(created_at), str(row_id)
+    except (ValueError, TypeError):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+
+def page_size(limit: int) -> int:
+    return max(1, min(limit or DEFAULT_PAGE_SIZE, MAX_PAGE_SIZE))
+
+
+def paginate(query, created_col, id_col, limit: int = DEFAULT_PAGE_SIZE,
+             cursor: str = None, descending: bool = True, key=None):
+    """
+    Keyset pagination on (created_col, id_col). The id breaks ties between
+    rows created in the same instant, so pages never skip or repeat rows.
+
+    key extracts (created_at, id) from a result row; by default the row
+    itself is the mapped object.
+
+    Returns (items, next_cursor); next_cursor is None on the last page.
+    """
+    limit = page_size(limit)
+    key = key or (lambda row: (getattr(row, created_col.key), getattr(row, id_col.key)))
+
+    if cursor:
+        created_at, row_id = decode_cursor(cursor)
+        if descending:
+            query = query.filter(or_(
+                created_col < created_at,
+                and_(created_col == created_at, id_col < row_id)
+            ))
+        else:
+            query = query.filter(or_(
+                created_col > created_at,
+                and_(created_col == created_at, id_col > row_id)
+            ))
+
+    if descending:
+        query = query.order_by(created_col.desc(), id_col.desc())
+    else:
+        query = query.order_by(created_col.asc(), id_col.asc())
+
+    rows = query.limit(limit + 1).all()
+
+    next_cursor = None
+    if len(rows) > limit:
+        rows = rows[:limit]
+        next_cursor = encode_cursor(*key(rows[-1]))
+
+    return rows, next_cursor
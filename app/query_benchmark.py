@@ -0,0 +1,217 @@
+"""
+p50/p95 of the hot query shapes before and after the indexes of migration 3:
+
+    python -m app.query_benchmark                 # 1M rows per hot table
+    python -m app.query_benchmark --rows 100000 --repeats 100
+
+Builds a scratch SQLite database (never DATABASE_URL) with the schema of
+migrations 1-2, seeds it, times every query, applies migration 3 and times
+them again.
+"""
+import argparse
+import os
+import random
+import tempfile
+import time
+import uuid
+from datetime import datetime, timedelta
+
+from sqlalchemy import create_engine, text
+
+from .migrations import MIGRATIONS
+
+# (label, SQL, parameters drawn per run)
+QUERIES = [
+    ("patient by user_id",
+     "SELECT id FROM patients WHERE user_id = :user_id",
+     lambda d: {"user_id": random.choice(d["patient_users"])}),
+    ("doctor by user_id",
+     "SELECT id FROM doctors WHERE user_id = :user_id",
+     lambda d: {"user_id": random.choice(d["doctor_users"])}),
+    ("my appointments",
+     "SELECT * FROM appointments WHERE patient_id = :patient_id "
+     "ORDER BY created_at DESC LIMIT 50",
+     lambda d: {"patient_id": random.choice(d["patients"])}),
+    ("doctor appointments",
+     "SELECT * FROM appointments WHERE doctor_id = :doctor_id "
+     "ORDER BY created_at DESC LIMIT 50",
+     lambda d: {"doctor_id": random.choice(d["doctors"])}),
+    ("existing booking check",
+     "SELECT id FROM appointments WHERE patient_id = :patient_id "
+     "AND doctor_id = :doctor_id AND status = 'PENDING' LIMIT 1",
+     lambda d: {"patient_id": random.choice(d["patients"]), "doctor_id": random.choice(d["doctors"])}),
+    ("pending predictions",
+     "SELECT * FROM ai_predictions WHERE doctor_verified = 'NO' "
+     "ORDER BY created_at LIMIT 50",
+     lambda d: {}),
+    ("my predictions",
+     "SELECT * FROM ai_predictions WHERE patient_id = :patient_id "
+     "ORDER BY created_at DESC",
+     lambda d: {"patient_id": random.choice(d["patients"])}),
+    ("my records",
+     "SELECT * FROM medical_records WHERE patient_id = :patient_id "
+     "ORDER BY created_at DESC LIMIT 50",
+     lambda d: {"patient_id": random.choice(d["patients"])}),
+    ("my active bed",
+     "SELECT * FROM bed_allocations WHERE patient_id = :user_id AND status = 'ACTIVE'",
+     lambda d: {"user_id": random.choice(d["patient_users"])}),
+]
+
+
+def _ids(n):
+    return [str(uuid.uuid4()) for _ in range(n)]
+
+
+def _migrate(engine, versions):
+    with engine.begin() as conn:
+        for version, _, fn in sorted(MIGRATIONS, key=lambda m: m[0]):
+            if version in versions:
+                fn(conn)
+
+
+def seed(engine, rows: int, chunk: int = 50_000):
+    random.seed(0)
+    n_patients = max(1, rows // 100)
+    n_doctors = max(1, rows // 1000)
+    data = {
+        "patient_users": _ids(n_patients),
+        "doctor_users": _ids(n_doctors),
+        "patients": _ids(n_patients),
+        "doctors": _ids(n_doctors),
+    }
+    start = datetime(2024, 1, 1)
+
+    def insert(sql, make):
+        with engine.begin() as conn:
+            for offset in range(0, rows, chunk):
+                conn.execute(text(sql), [make(i) for i in range(offset, min(rows, offset + chunk))])
+
+    with engine.begin() as conn:
+        conn.execute(
+            text("INSERT INTO users (id, name, email, password_hash, role, created_at) "
+                 "VALUES (:id, 'u', :email, 'x', :role, :at)"),
+            [
+                {"id": user_id, "email": f"{user_id}@example.com", "role": role, "at": start}
+                for role, key in (("PATIENT", "patient_users"), ("DOCTOR", "doctor_users"))
+                for user_id in data[key]
+            ]
+        )
+        conn.execute(
+            text("INSERT INTO patients (id, user_id) VALUES (:id, :user_id)"),
+            [{"id": p, "user_id": u} for p, u in zip(data["patients"], data["patient_users"])]
+        )
+        conn.execute(
+            text("INSERT INTO doctors (id, user_id) VALUES (:id, :user_id)"),
+            [{"id": d, "user_id": u} for d, u in zip(data["doctors"], data["doctor_users"])]
+        )
+
+    at = lambda i: start + timedelta(seconds=i * 30)
+    insert(
+        "INSERT INTO appointments (id, patient_id, doctor_id, appointment_date, "
+        "appointment_time, status, created_at) "
+        "VALUES (:id, :patient_id, :doctor_id, :day, '09:00:00.000000', :status, :at)",
+        lambda i: {
+            "id": str(uuid.uuid4()),
+            "patient_id": random.choice(data["patients"]),
+            "doctor_id": random.choice(data["doctors"]),
+            "day": at(i).date().isoformat(),
+            "status": random.choice(("PENDING", "APPROVED", "COMPLETED", "CANCELLED")),
+            "at": at(i),
+        }
+    )
+    insert(
+        "INSERT INTO ai_predictions (id, patient_id, image_path, doctor_verified, created_at) "
+        "VALUES (:id, :patient_id, :path, :state, :at)",
+        lambda i: {
+            "id": str(uuid.uuid4()),
+            "patient_id": random.choice(data["patients"]),
+            "path": f"xray/{i}.png",
+            # Most predictions get reviewed; the pending queue is the tail
+            "state": "NO" if random.random() < 0.02 else random.choice(("YES", "REJECTED")),
+            "at": at(i),
+        }
+    )
+    insert(
+        "INSERT INTO medical_records (id, patient_id, record_type, file_path, created_at) "
+        "VALUES (:id, :patient_id, 'REPORT', :path, :at)",
+        lambda i: {
+            "id": str(uuid.uuid4()),
+            "patient_id": random.choice(data["patients"]),
+            "path": f"records/{i}.pdf",
+            "at": at(i),
+        }
+    )
+    insert(
+        "INSERT INTO bed_allocations (id, patient_id, bed_id, allocated_at, status) "
+        "VALUES (:id, :user_id, 'bed', :at, :status)",
+        lambda i: {
+            "id": str(uuid.uuid4()),
+            "user_id": random.choice(data["patient_users"]),
+            "at": at(i),
+            "status": "ACTIVE" if random.random() < 0.01 else "RELEASED",
+        }
+    )
+    with engine.begin() as conn:
+        conn.execute(text("ANALYZE"))
+    return data
+
+
+def time_queries(engine, data, repeats: int) -> dict:
+    timings = {}
+    with engine.connect() as conn:
+        for label, sql, params in QUERIES:
+            statement = text(sql)
+            samples = []
+            for _ in range(repeats):
+                started = time.perf_counter()
+                conn.execute(statement, params(data)).fetchall()
+                samples.append((time.perf_counter() - started) * 1000)
+            samples.sort()
+            timings[label] = {
+                "p50_ms": round(samples[len(samples) // 2], 3),
+                "p95_ms": round(samples[min(len(samples) - 1, int(len(samples) * 0.95))], 3),
+            }
+    return timings
+
+
+def benchmark(rows: int = 1_000_000, repeats: int = 50, path: str = None) -> dict:
+    path = path or os.path.join(tempfile.mkdtemp(), "query_benchmark.db")
+    engine = create_engine(f"sqlite:///{path}")
+
+    _migrate(engine, {1, 2})
+    data = seed(engine, rows)
+    before = time_queries(engine, data, repeats)
+
+    _migrate(engine, {3})
+    with engine.begin() as conn:
+        conn.execute(text("ANALYZE"))
+    after = time_queries(engine, data, repeats)
+
+    engine.dispose()
+    return {
+        "rows_per_table": rows,
+        "queries": {
+            label: {
+                "before": before[label],
+                "after": after[label],
+                "p95_speedup": round(before[label]["p95_ms"] / max(after[label]["p95_ms"], 1e-3), 1),
+            }
+            for label in before
+        },
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(
+        description="Time the hot query shapes without and with the migration 3 indexes"
+    )
+    parser.add_argument("--rows", type=int, default=1_000_000)
+    parser.add_argument("--repeats", type=int, default=50)
+    parser.add_argument("--db", help="scratch SQLite file (default: a temp file)")
+    args = parser.parse_args()
+
+    result = benchmark(args.rows, args.repeats, args.db)
+    print(f"{result['rows_per_table']:,} rows per hot table")
+    print(f"{'query':<24}{'p95 before':>12}{'p95 after':>12}{'speedup':>10}")
+    for label, r in result["queries"].items():
+        print(f"{label:<24}{r['before']['p95_ms']:>10.3f}ms{r['after']['p95_ms']:>10.3f}ms{r['p95_speedup']:>9}x")
@@ -0,0 +1,143 @@
+from datetime import datetime
+
+from sqlalchemy import func
+from sqlalchemy.exc import DBAPIError
+from sqlalchemy.orm import Session
+
+from .models import AIPrediction, MedicalRecord, StatCounter, User
+
+COUNTERS = [
+    "total_users",
+    "patients",
+    "doctors",
+    "medvault_records",
+    "ai_predictions",
+    "pending_predictions",
+    "verified_predictions",
+    "rejected_predictions",
+]
+
+_ROLE_COUNTERS = {"PATIENT": "patients", "DOCTOR": "doctors"}
+_VERIFICATION_COUNTERS = {
+    "NO": "pending_predictions",
+    "YES": "verified_predictions",
+    "VERIFIED": "verified_predictions",
+    "REJECTED": "rejected_predictions",
+}
+
+
+def bump(db: Session, **deltas):
+    """
+    Adjust counters inside the caller's transaction, so they commit (or roll
+    back) together with the write they describe.
+    """
+    for name, delta in deltas.items():
+        if delta:
+            db.query(StatCounter).filter(StatCounter.name == name).update(
+                {"value": StatCounter.value + delta, "updated_at": datetime.utcnow()},
+                synchronize_session=False
+            )
+
+
+def role_deltas(old_role: str = None, new_role: str = None) -> dict:
+    deltas = {}
+    if old_role in _ROLE_COUNTERS:
+        deltas[_ROLE_COUNTERS[old_role]] = -1
+    if new_role in _ROLE_COUNTERS:
+        name = _ROLE_COUNTERS[new_role]
+        deltas[name] = deltas.get(name, 0) + 1
+    return deltas
+
+
+def verification_deltas(old_state: str = None, new_state: str = None) -> dict:
+    deltas = {}
+    if old_state in _VERIFICATION_COUNTERS:
+        deltas[_VERIFICATION_COUNTERS[old_state]] = -1
+    if new_state in _VERIFICATION_COUNTERS:
+        name = _VERIFICATION_COUNTERS[new_state]
+        deltas[name] = deltas.get(name, 0) + 1
+    return deltas
+
+
+def read_counters(db: Session) -> dict:
+    values = dict(db.query(StatCounter.name, StatCounter.value).all())
+    return {name: values.get(name, 0) for name in COUNTERS}
+
+
+def compute_from_source(db: Session) -> dict:
+    """Recount everything from the source tables (three GROUP BY scans)."""
+    counts = dict.fromkeys(COUNTERS, 0)
+
+    for role, count in db.query(User.role, func.count()).group_by(User.role):
+        counts["total_users"] += count
+        if role in _ROLE_COUNTERS:
+            counts[_ROLE_COUNTERS[role]] += count
+
+    counts["medvault_records"] = db.query(func.count(MedicalRecord.id)).scalar()
+
+    for state, count in db.query(
+        AIPrediction.doctor_verified, func.count()
+    ).group_by(AIPrediction.doctor_verified):
+        counts["ai_predictions"] += count
+        if state in _VERIFICATION_COUNTERS:
+            counts[_VERIFICATION_COUNTERS[state]] += count
+
+    return counts
+
+
+def _begin_snapshot(db: Session):
+    """
+    Open db's transaction so the recount and the counter read that follow
+    see the same committed state.
+    """
+    if db.get_bind().dialect.name == "sqlite":
+        # Plain SQLite reads each see the latest commit; taking the write
+        # lock first keeps every writer out until this transaction ends
+        db.query(StatCounter).update(
+            {"updated_at": StatCounter.updated_at}, synchronize_session=False
+        )
+    else:
+        db.connection(execution_options={"isolation_level": "REPEATABLE READ"})
+
+
+def _reconcile_once(db: Session, fix: bool) -> dict:
+    _begin_snapshot(db)
+    actual = compute_from_source(db)
+    current = dict(db.query(StatCounter.name, StatCounter.value).all())
+
+    drift = {
+        name: {"counter": current.get(name), "actual": actual[name]}
+        for name in COUNTERS
+        if current.get(name) != actual[name]
+    }
+
+    if fix and drift:
+        for name, values in drift.items():
+            if values["counter"] is None:
+                db.add(StatCounter(name=name, value=values["actual"]))
+            else:
+                # No write reached this counter since the snapshot: SQLite
+                # holds the write lock, and on Postgres a concurrent bump
+                # fails this update with a serialization error
+                bump(db, **{name: values["actual"] - values["counter"]})
+        db.commit()
+    else:
+        db.rollback()
+
+    return {
+        "checked_at": datetime.utcnow(),
+        "drift": drift,
+        "fixed": fix and bool(drift),
+    }
+
+
+def reconcile(db: Session, fix: bool = True, attempts: int = 3) -> dict:
+    """Compare counters with the source tables, report drift and reset them."""
+    for attempt in range(attempts):
+        try:
+            return _reconcile_once(db, fix)
+        except DBAPIError as exc:
+            db.rollback()
+            # Postgres: a write landed on a drifted counter mid-reconcile
+            if getattr(exc.orig, "pgcode", None) != "40001" or attempt == attempts - 1:
+                raise
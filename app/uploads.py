@@ -0,0 +1,311 @@
+"""
+Streaming upload storage for MedVault records and HealthAI X-rays.
+
+Uploads are written chunk by chunk to a staging file while a SHA-256 is
+computed, so nothing is read into memory whole and the size limit for the
+upload type is enforced as soon as it is crossed. The finished file is
+then handed to the content-addressed blob store under that hash.
+
+Large files can also go through a resumable session: the client declares
+the size, PUTs chunks at increasing offsets (resuming from the offset
+reported by GET after a dropped connection) and completes the session,
+at which point the partial file goes into the blob store the same way.
+"""
+import asyncio
+import hashlib
+import os
+import uuid
+from datetime import datetime, timedelta
+from typing import NamedTuple
+
+from fastapi import HTTPException, UploadFile
+from fastapi.concurrency import run_in_threadpool
+from fastapi.responses import JSONResponse
+from sqlalchemy.orm import Session
+
+from . import blobstore
+from .blobstore import blob_key, blob_path, blob_store, key_of
+from .config import (
+    BATCH_MAX_UPLOAD_MB,
+    MEDVAULT_MAX_UPLOAD_MB,
+    UPLOAD_CHUNK_BYTES,
+    UPLOAD_DIR,
+    UPLOAD_SESSION_DIR,
+    UPLOAD_SESSION_TTL_HOURS,
+    XRAY_MAX_UPLOAD_MB,
+)
+from .models import UploadSession
+
+MB = 1024 * 1024
+
+# Upload type -> size limit
+KINDS = {
+    "medvault": MEDVAULT_MAX_UPLOAD_MB * MB,
+    "xray": XRAY_MAX_UPLOAD_MB * MB,
+}
+
+# Multipart endpoints -> request body limit
+ROUTE_LIMITS = {
+    "/medvault/upload": KINDS["medvault"],
+    "/healthai/predict": KINDS["xray"],
+    "/healthai/predict/async": KINDS["xray"],
+    "/healthai/predict/batch": BATCH_MAX_UPLOAD_MB * MB,
+}
+# Room for multipart boundaries and the other form fields
+MULTIPART_OVERHEAD = 64 * 1024
+
+
+class StoredFile(NamedTuple):
+    path: str  # "uploads/blobs/..." path as stored in the database
+    disk_path: str
+    sha256: str
+    size: int
+
+
+def disk_path(path: str) -> str:
+    """Local file for a stored "uploads/..." path (blob or legacy upload)."""
+    key = key_of(path)
+    if key:
+        return blob_store.local_path(key)
+
+    relative = path.split("/", 1)[1] if path.startswith("uploads/") else path
+    return os.path.join(UPLOAD_DIR, relative)
+
+
+def too_large(kind: str) -> HTTPException:
+    return HTTPException(
+        status_code=413,
+        detail=f"File exceeds the {KINDS[kind] // MB} MB limit for {kind} uploads"
+    )
+
+
+def _store(staged: str, sha256: str, size: int, filename: str) -> StoredFile:
+    key = blob_key(sha256, filename)
+    blobstore.put(staged, key, size)
+    return StoredFile(blob_path(key), blob_store.local_path(key), sha256, size)
+
+
+def _discard(path: str):
+    try:
+        os.remove(path)
+    except FileNotFoundError:
+        pass
+
+
+class _Sink:
+    """Stages one upload on disk, hashing and size-checking each chunk."""
+
+    def __init__(self, kind: str, filename: str):
+        self.kind = kind
+        self.limit = KINDS.get(kind)
+        self.filename = filename
+        os.makedirs(UPLOAD_SESSION_DIR, exist_ok=True)
+        self.partial = os.path.join(UPLOAD_SESSION_DIR, f"{uuid.uuid4()}.incoming.part")
+        self.digest = hashlib.sha256()
+        self.size = 0
+        self.out = open(self.partial, "wb")
+
+    def check(self, chunk: bytes):
+        self.size += len(chunk)
+        if self.limit is not None and self.size > self.limit:
+            raise too_large(self.kind)
+        self.digest.update(chunk)
+
+    def finish(self) -> StoredFile:
+        self.out.close()
+        return _store(self.partial, self.digest.hexdigest(), self.size, self.filename)
+
+    def abort(self):
+        self.out.close()
+        _discard(self.partial)
+
+
+async def save_upload(file: UploadFile, kind: str) -> StoredFile:
+    sink = _Sink(kind, file.filename)
+    try:
+        while chunk := await file.read(UPLOAD_CHUNK_BYTES):
+            sink.check(chunk)
+            await run_in_threadpool(sink.out.write, chunk)
+        return await run_in_threadpool(sink.finish)
+    except BaseException:
+        sink.abort()
+        raise
+
+
+def save_stream(source, kind: str, filename: str) -> StoredFile:
+    """Blocking variant for file objects that are not UploadFiles (zip members)."""
+    sink = _Sink(kind, filename)
+    try:
+        while chunk := source.read(UPLOAD_CHUNK_BYTES):
+            sink.check(chunk)
+            sink.out.write(chunk)
+        return sink.finish()
+    except BaseException:
+        sink.abort()
+        raise
+
+
+def store_file(path: str, filename: str) -> StoredFile:
+    """Copy a file that is already on disk into the store (no size limit)."""
+    with open(path, "rb") as source:
+        return save_stream(source, None, filename)
+
+
+# =========================
+# EARLY SIZE LIMITS
+# =========================
+class UploadLimitMiddleware:
+    """
+    Rejects oversized multipart uploads before the body is parsed: from
+    Content-Length when the client sends it, otherwise as soon as the
+    streamed body crosses the limit.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        limit = None
+        if scope["type"] == "http" and scope["method"] == "POST":
+            limit = ROUTE_LIMITS.get(scope["path"])
+        if limit is None:
+            await self.app(scope, receive, send)
+            return
+
+        limit += MULTIPART_OVERHEAD
+        detail = f"Request body exceeds {limit // MB} MB"
+
+        length = dict(scope["headers"]).get(b"content-length")
+        if length is not None and length.isdigit() and int(length) > limit:
+            await JSONResponse({"detail": detail}, status_code=413)(scope, receive, send)
+            return
+
+        received = 0
+
+        async def limited_receive():
+            nonlocal received
+            message = await receive()
+            if message["type"] == "http.request":
+                received += len(message.get("body", b""))
+                if received > limit:
+                    raise HTTPException(status_code=413, detail=detail)
+            return message
+
+        await self.app(scope, limited_receive, send)
+
+
+# =========================
+# RESUMABLE SESSIONS
+# =========================
+_hashes = {}  # session id -> (offset, sha256 of the bytes before it)
+_locks = {}  # session id -> asyncio.Lock, one writer per session
+
+
+def _part_path(session_id: str) -> str:
+    return os.path.join(UPLOAD_SESSION_DIR, f"{session_id}.part")
+
+
+def session_lock(session_id: str) -> asyncio.Lock:
+    return _locks.setdefault(session_id, asyncio.Lock())
+
+
+def open_session(session_id: str):
+    os.makedirs(UPLOAD_SESSION_DIR, exist_ok=True)
+    open(_part_path(session_id), "wb").close()
+    _hashes[session_id] = (0, hashlib.sha256())
+
+
+def discard_session(session_id: str):
+    _discard(_part_path(session_id))
+    _hashes.pop(session_id, None)
+    _locks.pop(session_id, None)
+
+
+def purge_expired_sessions(db: Session):
+    """
+    Delete expired sessions' rows inside the caller's transaction and return
+    their ids; pass those to discard_session once it has committed.
+    """
+    cutoff = datetime.utcnow() - timedelta(hours=UPLOAD_SESSION_TTL_HOURS)
+    expired = [
+        session_id for (session_id,) in
+        db.query(UploadSession.id).filter(UploadSession.created_at < cutoff)
+    ]
+    if expired:
+        db.query(UploadSession).filter(
+            UploadSession.id.in_(expired)
+        ).delete(synchronize_session=False)
+    return expired
+
+
+async def _hash_at(session_id: str, offset: int):
+    entry = _hashes.get(session_id)
+    if entry and entry[0] == offset:
+        return entry[1]
+
+    # Restarted process (or a failed chunk): rehash what was accepted so far
+    def rehash():
+        digest = hashlib.sha256()
+        remaining = offset
+        with open(_part_path(session_id), "rb") as src:
+            while remaining:
+                chunk = src.read(min(UPLOAD_CHUNK_BYTES, remaining))
+                if not chunk:
+                    break
+                digest.update(chunk)
+                remaining -= len(chunk)
+        return digest
+
+    digest = await run_in_threadpool(rehash)
+    _hashes[session_id] = (offset, digest)
+    return digest
+
+
+async def append_chunk(upload: UploadSession, offset: int, chunks) -> int:
+    """Write a streamed chunk at `offset`; returns the new received count."""
+    if offset != upload.received:
+        raise HTTPException(
+            status_code=409,
+            detail=f"Upload is at offset {upload.received}, not {offset}"
+        )
+
+    digest = await _hash_at(upload.id, offset)
+    end = offset
+    try:
+        with open(_part_path(upload.id), "r+b") as out:
+            # Drop the tail of any chunk that was cut off mid-write
+            out.truncate(offset)
+            out.seek(offset)
+            async for chunk in chunks:
+                end += len(chunk)
+                if end > upload.size:
+                    raise HTTPException(
+                        status_code=413,
+                        detail="Chunk goes past the declared upload size"
+                    )
+                digest.update(chunk)
+                await run_in_threadpool(out.write, chunk)
+    except BaseException:
+        _hashes.pop(upload.id, None)
+        raise
+
+    _hashes[upload.id] = (end, digest)
+    return end
+
+
+async def finish_session(upload: UploadSession, expected_sha256: str = None) -> StoredFile:
+    if upload.received != upload.size:
+        raise HTTPException(
+            status_code=409,
+            detail=f"Upload incomplete: {upload.received} of {upload.size} bytes"
+        )
+
+    sha256 = (await _hash_at(upload.id, upload.received)).hexdigest()
+    if expected_sha256 and expected_sha256.lower() != sha256:
+        raise HTTPException(status_code=400, detail="Checksum mismatch")
+
+    stored = await run_in_threadpool(
+        _store, _part_path(upload.id), sha256, upload.size, upload.filename
+    )
+    discard_session(upload.id)
+    return stored
@@ -0,0 +1,118 @@
+"""
+Single-writer queue with group commit for SQLite.
+
+SQLite has one write lock per database, so request threads that each run
+their own write transaction queue up on it and, past the busy timeout,
+fail with "database is locked". In SQLite production mode the hot write
+paths hand their work to one writer thread instead. It takes whatever is
+queued, runs each write in its own SAVEPOINT inside one transaction and
+commits the group once: one fsync for the lot, and a failing write only
+rolls back its own savepoint. Reads keep running in parallel on the pool.
+
+On other databases run() simply executes the write on its own session in
+the threadpool and commits it.
+"""
+import asyncio
+import queue
+import threading
+from concurrent.futures import Future
+
+from fastapi.concurrency import run_in_threadpool
+
+from .config import WRITE_QUEUE_MAX_BATCH
+from .database import SQLITE_TUNED, SessionLocal, WriterSession, unit_of_work
+
+
+def _run_alone(fn, args):
+    db = SessionLocal()
+    try:
+        with unit_of_work(db):
+            return fn(db, *args)
+    finally:
+        db.close()
+
+
+class WriteQueue:
+    def __init__(self, enabled: bool, max_batch: int = 64):
+        self.enabled = enabled
+        self.max_batch = max(1, max_batch)
+        self._queue = queue.Queue()
+        self._thread = None
+        self._lock = threading.Lock()
+        self.groups = 0
+        self.writes = 0
+        self.largest_group = 0
+
+    def _ensure_started(self):
+        if self._thread is None:
+            with self._lock:
+                if self._thread is None:
+                    self._thread = threading.Thread(
+                        target=self._writer, name="db-writer", daemon=True
+                    )
+                    self._thread.start()
+
+    async def run(self, fn, *args):
+        """
+        Run fn(session, *args) as one write and return its result once it
+        is committed. fn must not commit; it should return plain values,
+        since ORM objects are expired by the commit.
+        """
+        if not self.enabled:
+            return await run_in_threadpool(_run_alone, fn, args)
+
+        self._ensure_started()
+        future = Future()
+        self._queue.put((fn, args, future))
+        return await asyncio.wrap_future(future)
+
+    def _take_group(self):
+        group = [self._queue.get()]
+        while len(group) < self.max_batch:
+            try:
+                group.append(self._queue.get_nowait())
+            except queue.Empty:
+                break
+        return group
+
+    def _writer(self):
+        while True:
+            group = self._take_group()
+            db = WriterSession()
+            done = []
+            try:
+                for fn, args, future in group:
+                    if not future.set_running_or_notify_cancel():
+                        continue
+                    try:
+                        with db.begin_nested():
+                            result = fn(db, *args)
+                    except BaseException as exc:
+                        future.set_exception(exc)
+                    else:
+                        done.append((future, result))
+                db.commit()
+            except BaseException as exc:
+                db.rollback()
+                for future, _ in done:
+                    future.set_exception(exc)
+            else:
+                for future, result in done:
+                    future.set_result(result)
+                self.groups += 1
+                self.writes += len(done)
+                self.largest_group = max(self.largest_group, len(done))
+            finally:
+                db.close()
+
+    def stats(self) -> dict:
+        return {
+            "enabled": self.enabled,
+            "queued": self._queue.qsize(),
+            "groups": self.groups,
+            "writes": self.writes,
+            "largest_group": self.largest_group
+        }
+
+
+write_queue = WriteQueue(SQLITE_TUNED, WRITE_QUEUE_MAX_BATCH)
@@ -0,0 +1,67 @@
+import os
+import tempfile
+import uuid
+
+# The app reads its settings at import time, so point it at a scratch
+# database and upload area before anything imports it
+_TMP = tempfile.mkdtemp(prefix="healthsphere-tests-")
+os.environ.setdefault("DATABASE_URL", f"sqlite:///{_TMP}/healthsphere.db")
+os.environ.setdefault("UPLOAD_DIR", os.path.join(_TMP, "uploads"))
+os.environ.setdefault("UPLOAD_SESSION_DIR", os.path.join(_TMP, "upload_sessions"))
+os.environ.setdefault("BLOB_CACHE_DIR", os.path.join(_TMP, "blob_cache"))
+os.environ.setdefault("SECRET_KEY", "test-secret")
+os.environ.setdefault("ALGORITHM", "HS256")
+os.environ.setdefault("ACCESS_TOKEN_EXPIRE_MINUTES", "60")
+os.environ.setdefault("MODEL_PRELOAD", "false")
+
+from contextlib import contextmanager
+
+import pytest
+from fastapi.testclient import TestClient
+from sqlalchemy import event
+
+from app.database import engine
+from app.main import app
+
+
+@pytest.fixture(scope="session")
+def client():
+    return TestClient(app)
+
+
+@pytest.fixture
+def login(client):
+    """login(role) registers a fresh user and returns (user_id, auth headers)."""
+
+    def _login(role: str):
+        email = f"{role.lower()}-{uuid.uuid4().hex[:12]}@example.com"
+        response = client.post("/auth/register", json={
+            "name": role.title(), "email": email, "password": "pw", "role": role
+        })
+        assert response.status_code == 200, response.text
+        response = client.post("/auth/login", json={"email": email, "password": "pw"})
+        assert response.status_code == 200, response.text
+        body = response.json()
+        return body["user"]["id"], {"Authorization": f"Bearer {body['access_token']}"}
+
+    return _login
+
+
+@contextmanager
+def _count_queries():
+    statements = []
+
+    def before_cursor_execute(conn, cursor, statement, *args):
+        statements.append(statement)
+
+    event.listen(engine, "before_cursor_execute", before_cursor_execute)
+    try:
+        yield statements
+    finally:
+        event.remove(engine, "before_cursor_execute", before_cursor_execute)
+
+
+@pytest.fixture
+def count_queries():
+    """`with count_queries() as statements:` collects what the engine sends."""
+    return _count_queries
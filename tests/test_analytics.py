@@ -0,0 +1,55 @@
+import uuid
+from datetime import date, datetime, time, timedelta
+
+from sqlalchemy import create_engine
+from sqlalchemy.orm import Session
+
+from app import analytics
+from app.database import Base
+from app.models import DailyRollup, RollupWatermark, User
+
+
+def _session():
+    engine = create_engine("sqlite://")
+    Base.metadata.create_all(bind=engine)
+    return Session(bind=engine)
+
+
+def _user(db: Session, created_at: datetime):
+    db.add(User(
+        id=str(uuid.uuid4()), name="U", email=f"{uuid.uuid4().hex}@example.com",
+        password_hash="x", role="PATIENT", created_at=created_at
+    ))
+    db.commit()
+
+
+def test_row_committed_after_midnight_still_lands_in_its_day():
+    db = _session()
+    today = date(2026, 5, 10)
+    before_midnight = datetime.combine(today - timedelta(days=1), time(23, 59, 59))
+
+    analytics.close_days(db, "users", today=today, lag_days=2)
+    # Stamped before midnight, committed after the close above
+    _user(db, before_midnight)
+    analytics.close_days(db, "users", today=today + timedelta(days=1), lag_days=2)
+
+    assert db.get(RollupWatermark, "users").closed_through == before_midnight.date()
+    assert db.get(DailyRollup, ("users", before_midnight.date())).count == 1
+    db.close()
+
+
+def test_days_inside_the_lag_are_counted_live():
+    db = _session()
+    today = datetime.utcnow().date()
+    for days_ago in (0, 1, 1, 3):
+        _user(db, datetime.combine(today - timedelta(days=days_ago), time(12)))
+
+    counts = analytics.daily_counts(db, "users")
+
+    assert counts == [
+        {"date": str(today - timedelta(days=3)), "count": 1},
+        {"date": str(today - timedelta(days=1)), "count": 2},
+        {"date": str(today), "count": 1},
+    ]
+    assert db.get(DailyRollup, ("users", today - timedelta(days=1))) is None
+    db.close()
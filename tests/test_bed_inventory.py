@@ -0,0 +1,171 @@
+import random
+import threading
+import uuid
+
+from app.bed_inventory import BedInventory
+from app.database import SessionLocal
+from app.models import Bed
+
+
+def _add_beds(ward: str, count: int):
+    bed_ids = [str(uuid.uuid4()) for _ in range(count)]
+    db = SessionLocal()
+    db.add_all(Bed(id=bed_id, ward=ward, bed_number=str(i)) for i, bed_id in enumerate(bed_ids))
+    db.commit()
+    db.close()
+    return bed_ids
+
+
+def _free_in_db(ward: str):
+    db = SessionLocal()
+    try:
+        return {
+            bed_id for bed_id, in
+            db.query(Bed.id).filter(Bed.ward == ward, Bed.is_available.is_(True))
+        }
+    finally:
+        db.close()
+
+
+def _free_in_index(inventory: BedInventory, ward: str):
+    with inventory._lock:
+        return set(inventory._free.get(ward, ()))
+
+
+def _run_threads(target, count: int):
+    errors = []
+
+    def guarded(*args):
+        try:
+            target(*args)
+        except BaseException as exc:
+            errors.append(exc)
+
+    threads = [threading.Thread(target=guarded, args=(i,)) for i in range(count)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert not errors, errors
+
+
+def test_other_workers_allocations_show_up_after_refresh():
+    ward = f"ward-{uuid.uuid4().hex[:8]}"
+    first, second = _add_beds(ward, 2)
+    this_worker, other_worker = BedInventory(refresh_seconds=3600), BedInventory(refresh_seconds=0)
+    db = SessionLocal()
+    this_worker.ensure_fresh(db)
+    other_worker.ensure_fresh(db)
+
+    assert this_worker.take(db, first)
+    db.commit()
+    this_worker.mark_taken(first)
+
+    # The other worker rebuilds because its index is past refresh_seconds
+    other_worker.ensure_fresh(db)
+    db.close()
+    assert other_worker.next_free(ward)["bed_id"] == second
+
+
+def test_concurrent_claims_hand_each_bed_out_once():
+    ward = f"ward-{uuid.uuid4().hex[:8]}"
+    bed_ids = _add_beds(ward, 20)
+    inventory = BedInventory(refresh_seconds=0)
+    claims = {bed_id: [] for bed_id in bed_ids}
+
+    def claimer(worker: int):
+        db = SessionLocal()
+        try:
+            for bed_id in random.sample(bed_ids, len(bed_ids)):
+                if inventory.take(db, bed_id):
+                    db.commit()
+                    inventory.mark_taken(bed_id)
+                    claims[bed_id].append(worker)
+                else:
+                    db.rollback()
+        finally:
+            db.close()
+
+    _run_threads(claimer, 8)
+
+    assert all(len(workers) == 1 for workers in claims.values())
+    assert _free_in_db(ward) == set()
+
+
+def test_index_matches_database_after_allocations_racing_rebuilds():
+    ward = f"ward-{uuid.uuid4().hex[:8]}"
+    workers = 6
+    bed_ids = _add_beds(ward, workers * 5)
+    inventory = BedInventory(refresh_seconds=0)
+    db = SessionLocal()
+    inventory.ensure_fresh(db)
+    db.close()
+    done = threading.Event()
+
+    def allocator(worker: int):
+        # Each allocator owns its own beds, so only rebuilds race with it
+        own = bed_ids[worker::workers]
+        db = SessionLocal()
+        try:
+            for _ in range(100):
+                bed_id = random.choice(own)
+                if inventory.take(db, bed_id):
+                    db.commit()
+                    inventory.mark_taken(bed_id)
+                else:
+                    db.rollback()
+                    inventory.give_back(db, bed_id)
+                    db.commit()
+                    inventory.mark_free(bed_id)
+        finally:
+            db.close()
+
+    def rebuilder():
+        db = SessionLocal()
+        try:
+            while not done.is_set():
+                inventory.ensure_fresh(db)
+                db.rollback()
+        finally:
+            db.close()
+
+    rebuilders = [threading.Thread(target=rebuilder) for _ in range(2)]
+    for thread in rebuilders:
+        thread.start()
+    try:
+        _run_threads(allocator, workers)
+    finally:
+        done.set()
+        for thread in rebuilders:
+            thread.join()
+
+    assert inventory.rebuilds > 1
+    assert _free_in_index(inventory, ward) == _free_in_db(ward)
+
+
+def test_release_during_rebuild_is_not_lost():
+    ward = f"ward-{uuid.uuid4().hex[:8]}"
+    bed_id, = _add_beds(ward, 1)
+    inventory = BedInventory(refresh_seconds=0)
+    db = SessionLocal()
+    assert inventory.take(db, bed_id)
+    db.commit()
+    inventory.rebuild(db)
+    assert inventory.next_free(ward) is None
+
+    index_row = inventory._add
+
+    def release_after_the_read(state, *row):
+        # The rebuild has read the bed as taken; now it is released
+        if not getattr(release_after_the_read, "done", False):
+            release_after_the_read.done = True
+            inventory.give_back(db, bed_id)
+            db.commit()
+            inventory.mark_free(bed_id)
+        index_row(state, *row)
+
+    inventory._add = release_after_the_read
+    inventory.rebuild(db)
+    db.close()
+
+    assert inventory.next_free(ward)["bed_id"] == bed_id
@@ -0,0 +1,102 @@
+import os
+import threading
+import time
+import uuid
+from datetime import datetime, timedelta
+
+from app import blobstore
+from app.database import SessionLocal
+from app.models import Blob
+
+LONG_AGO = datetime.utcnow() - timedelta(days=2)
+
+
+def _staged(content: bytes) -> str:
+    path = os.path.join(os.environ["UPLOAD_SESSION_DIR"], f"{uuid.uuid4()}.part")
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, "wb") as out:
+        out.write(content)
+    return path
+
+
+def _unreferenced_old_blob() -> str:
+    """A stored blob whose last reference went away two days ago."""
+    key = blobstore.blob_key(uuid.uuid4().hex * 2, "scan.png")
+    blobstore.blob_store.put_file(_staged(b"scan"), key)
+    old = time.time() - 2 * 86400
+    os.utime(blobstore.blob_store.local_path(key), (old, old))
+
+    db = SessionLocal()
+    db.add(Blob(key=key, size=4, refcount=0, created_at=LONG_AGO, updated_at=LONG_AGO))
+    db.commit()
+    db.close()
+    return key
+
+
+def _collect():
+    db = SessionLocal()
+    try:
+        return blobstore.collect_garbage(db, grace_hours=1)
+    finally:
+        db.close()
+
+
+def _row(key: str):
+    db = SessionLocal()
+    try:
+        return db.query(Blob).filter(Blob.key == key).first()
+    finally:
+        db.close()
+
+
+def test_old_unreferenced_blob_is_collected():
+    key = _unreferenced_old_blob()
+    _collect()
+
+    assert _row(key) is None
+    assert not blobstore.blob_store.exists(key)
+
+
+def test_blob_reused_by_a_new_upload_survives_gc():
+    key = _unreferenced_old_blob()
+
+    # The upload has stored its file but its rows (and add_refs) are not
+    # committed yet when GC runs
+    blobstore.put(_staged(b"scan"), key, 4)
+    _collect()
+
+    assert _row(key) is not None
+    assert blobstore.blob_store.exists(key)
+
+
+def test_fresh_file_is_kept_even_when_its_row_is_collected():
+    key = _unreferenced_old_blob()
+    os.utime(blobstore.blob_store.local_path(key))
+
+    _collect()
+
+    assert _row(key) is None
+    assert blobstore.blob_store.exists(key)
+
+
+def test_upload_racing_the_file_delete_keeps_its_blob(monkeypatch):
+    key = _unreferenced_old_blob()
+    delete = blobstore.blob_store.delete
+    uploads = []
+
+    def delete_while_uploading(target):
+        # GC has deleted the row (uncommitted) and is about to drop the
+        # file; an upload of the same content arrives now
+        if target == key and not uploads:
+            upload = threading.Thread(target=blobstore.put, args=(_staged(b"scan"), key, 4))
+            uploads.append(upload)
+            upload.start()
+            upload.join(timeout=0.5)
+        delete(target)
+
+    monkeypatch.setattr(blobstore.blob_store, "delete", delete_while_uploading)
+    _collect()
+    uploads[0].join()
+
+    assert _row(key) is not None
+    assert blobstore.blob_store.exists(key)
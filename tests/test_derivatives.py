@@ -0,0 +1,36 @@
+import io
+import os
+import uuid
+
+from PIL import Image
+
+from app import blobstore, derivatives
+
+
+def _stored_gif() -> str:
+    # Multi-frame images keep their file open after decoding until closed
+    key = blobstore.blob_key(uuid.uuid4().hex * 2, "xray.gif")
+    path = blobstore.blob_store.local_path(key)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    frames = [Image.new("L", (600, 400), shade) for shade in (64, 192)]
+    frames[0].save(path, save_all=True, append_images=frames[1:])
+    return key
+
+
+def test_generate_closes_the_decoded_blob(monkeypatch):
+    key = _stored_gif()
+    handles = []
+    open_image = Image.open
+
+    def tracking_open(*args, **kwargs):
+        image = open_image(*args, **kwargs)
+        handles.append(image.fp)
+        return image
+
+    monkeypatch.setattr(derivatives.Image, "open", tracking_open)
+    derivatives.generate(key)
+
+    assert len(handles) == 1 and handles[0].closed
+    for variant in derivatives.VARIANTS:
+        with open(blobstore.blob_store.local_path(derivatives.derivative_key(key, variant)), "rb") as out:
+            assert max(Image.open(io.BytesIO(out.read())).size) <= derivatives.VARIANTS[variant][0]
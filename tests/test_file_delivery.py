@@ -0,0 +1,31 @@
+import os
+import uuid
+
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from app import blobstore
+from app.file_delivery import LegacyUploads
+
+
+def test_uploads_mount_is_off_by_default(client):
+    key = blobstore.blob_key(uuid.uuid4().hex * 2, "scan.png")
+    path = blobstore.blob_store.local_path(key)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, "wb") as out:
+        out.write(b"scan")
+
+    assert client.get(f"/{blobstore.blob_path(key)}").status_code == 404
+
+
+def test_legacy_uploads_mount_never_serves_blobs(tmp_path):
+    (tmp_path / "blobs" / "ab").mkdir(parents=True)
+    (tmp_path / "blobs" / "ab" / "scan.png").write_bytes(b"scan")
+    (tmp_path / "legacy.png").write_bytes(b"old")
+    app = FastAPI()
+    app.mount("/uploads", LegacyUploads(directory=str(tmp_path)), name="uploads")
+    http = TestClient(app)
+
+    assert http.get("/uploads/legacy.png").content == b"old"
+    assert http.get("/uploads/blobs/ab/scan.png").status_code == 404
+    assert http.get("/uploads/./blobs/ab/scan.png").status_code == 404
@@ -0,0 +1,94 @@
+import asyncio
+import uuid
+from datetime import datetime, timedelta
+
+from app import jobs
+from app.database import SessionLocal
+from app.jobs import PredictionJobQueue
+from app.ml.probabilities import WIDTH
+from app.models import AIPrediction
+
+OUTPUT = {"probabilities": [0.5] * WIDTH, "model_version": "test"}
+
+
+class _Inference:
+    def __init__(self):
+        self.calls = []
+
+    async def run(self, fn, path, **kwargs):
+        self.calls.append(path)
+        await asyncio.sleep(0.05)
+        return OUTPUT
+
+
+def _prediction(status: str, claimed_at: datetime = None) -> str:
+    prediction_id = str(uuid.uuid4())
+    db = SessionLocal()
+    db.add(AIPrediction(
+        id=prediction_id, patient_id="p", image_path=f"uploads/{prediction_id}.png",
+        status=status, claimed_at=claimed_at
+    ))
+    db.commit()
+    db.close()
+    return prediction_id
+
+
+def _status(prediction_id: str) -> str:
+    db = SessionLocal()
+    try:
+        return db.get(AIPrediction, prediction_id).status
+    finally:
+        db.close()
+
+
+def _recover_in_workers(monkeypatch, count: int):
+    inference = _Inference()
+    monkeypatch.setattr(jobs, "inference_pool", inference)
+    monkeypatch.setattr(jobs, "disk_path", lambda path: path)
+
+    async def run():
+        workers = [PredictionJobQueue(2) for _ in range(count)]
+        for worker in workers:
+            await worker.recover()
+        for worker in workers:
+            if worker._queue:
+                await worker._queue.join()
+
+    asyncio.run(run())
+    return inference.calls
+
+
+def test_job_recovered_by_several_workers_runs_once(monkeypatch):
+    prediction_id = _prediction("QUEUED")
+
+    calls = _recover_in_workers(monkeypatch, 3)
+
+    assert calls.count(f"uploads/{prediction_id}.png") == 1
+    assert _status(prediction_id) == "DONE"
+
+
+def test_only_stale_running_jobs_are_requeued(monkeypatch):
+    live = _prediction("RUNNING", datetime.utcnow())
+    stale = _prediction("RUNNING", datetime.utcnow() - timedelta(hours=2))
+
+    calls = _recover_in_workers(monkeypatch, 2)
+
+    assert f"uploads/{live}.png" not in calls
+    assert calls.count(f"uploads/{stale}.png") == 1
+    assert _status(live) == "RUNNING"
+    assert _status(stale) == "DONE"
+
+
+def test_result_of_a_lost_claim_is_discarded():
+    old_claim = datetime.utcnow() - timedelta(hours=2)
+    prediction_id = _prediction("RUNNING", old_claim)
+    db = SessionLocal()
+    jobs.release_stale_claims(db)
+    assert jobs.claim_prediction(db, prediction_id, datetime.utcnow())
+
+    # The first worker finishes late, after its job was handed on
+    jobs.save_prediction_results(db, prediction_id, OUTPUT, old_claim)
+    db.commit()
+    db.close()
+
+    assert _status(prediction_id) == "RUNNING"
@@ -0,0 +1,68 @@
+from datetime import date, datetime, time
+
+import pytest
+from sqlalchemy import create_engine, inspect, text
+
+from app.database import Base
+from app.migrations import MIGRATIONS, _baseline_schema, run_migrations
+
+
+def _schema(engine):
+    inspector = inspect(engine)
+    schema = {}
+    for table in inspector.get_table_names():
+        if table == "schema_migrations":
+            continue
+        schema[table] = {
+            "columns": {c["name"]: (str(c["type"]), c["nullable"]) for c in inspector.get_columns(table)},
+            "indexes": {
+                i["name"]: (tuple(i["column_names"]), bool(i["unique"]))
+                for i in inspector.get_indexes(table)
+            },
+        }
+    return schema
+
+
+def test_fresh_database_matches_models(tmp_path):
+    migrated = create_engine(f"sqlite:///{tmp_path}/migrated.db")
+    run_migrations(migrated)
+
+    expected = create_engine(f"sqlite:///{tmp_path}/models.db")
+    Base.metadata.create_all(bind=expected)
+
+    assert _schema(migrated) == _schema(expected)
+
+
+def test_rerun_is_a_no_op(tmp_path):
+    engine = create_engine(f"sqlite:///{tmp_path}/healthsphere.db")
+    run_migrations(engine)
+    run_migrations(engine)
+
+    with engine.connect() as conn:
+        versions = [row[0] for row in conn.execute(text("SELECT version FROM schema_migrations"))]
+    assert sorted(versions) == sorted(version for version, _, _ in MIGRATIONS)
+
+
+def test_double_booked_baseline_stops_at_slot_migration(tmp_path):
+    # A database from before migrations, with two pending bookings of one slot
+    engine = create_engine(f"sqlite:///{tmp_path}/healthsphere.db")
+    _baseline_schema.create_all(bind=engine)
+    tables = _baseline_schema.tables
+    with engine.begin() as conn:
+        conn.execute(tables["users"].insert(), [
+            {"id": "u1", "name": "P", "email": "p@example.com", "password_hash": "x", "role": "PATIENT"},
+            {"id": "u2", "name": "D", "email": "d@example.com", "password_hash": "x", "role": "DOCTOR"},
+        ])
+        conn.execute(tables["patients"].insert(), {"id": "p1", "user_id": "u1"})
+        conn.execute(tables["doctors"].insert(), {"id": "d1", "user_id": "u2"})
+        conn.execute(tables["appointments"].insert(), [
+            {
+                "id": f"a{i}", "patient_id": "p1", "doctor_id": "d1", "status": "PENDING",
+                "appointment_date": date(2026, 1, 5), "appointment_time": time(9),
+                "created_at": datetime(2026, 1, 1)
+            }
+            for i in range(2)
+        ])
+
+    with pytest.raises(RuntimeError, match="migration 6"):
+        run_migrations(engine)
@@ -0,0 +1,28 @@
+import asyncio
+
+from app.core.periodic import PeriodicTask
+
+
+def test_failed_round_is_recorded_and_next_round_runs():
+    calls = []
+
+    def flaky():
+        calls.append(1)
+        if len(calls) == 1:
+            raise ValueError("boom")
+
+    task = PeriodicTask("flaky", 60, flaky)
+    asyncio.run(task.run_once())
+    assert task.stats()["last_error"] == "ValueError: boom"
+    assert task.stats()["last_success_at"] is None
+
+    asyncio.run(task.run_once())
+    report = task.stats()
+    assert report["runs"] == 2 and report["failures"] == 1
+    assert report["last_success_at"] is not None
+
+
+def test_health_reports_periodic_tasks(client):
+    tasks = client.get("/health").json()["periodic_tasks"]
+    assert set(tasks) == {"stats_reconcile", "blob_gc"}
+    assert set(tasks["stats_reconcile"]) >= {"last_error", "last_success_at", "failures"}
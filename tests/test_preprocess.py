@@ -0,0 +1,33 @@
+import numpy as np
+import torch
+from PIL import Image
+
+from app.ml import preprocess
+
+# The folded multiply-add rounds differently from ToTensor + Normalize in
+# float32; the gap is a few ULPs, far below one grey level (~0.017)
+PARITY_ATOL = 1e-6
+
+
+def _grayscale_xray(size=(640, 512)):
+    rng = np.random.default_rng(7)
+    return Image.fromarray(rng.integers(0, 256, size[::-1], dtype=np.uint8), mode="L")
+
+
+def test_grayscale_matches_the_torchvision_transform():
+    image = _grayscale_xray()
+
+    expected = preprocess.reference_transform()(image.convert("RGB"))
+    actual = preprocess.to_tensor(preprocess.resize(image))
+
+    assert actual.shape == expected.shape == (3,) + preprocess.IMAGE_SIZE
+    torch.testing.assert_close(actual, expected, rtol=0, atol=PARITY_ATOL)
+
+
+def test_batch_collate_matches_single_image_normalization():
+    images = [preprocess.resize(_grayscale_xray((300 + 50 * i, 400))) for i in range(3)]
+
+    batch = preprocess.BatchPreprocessor(max_batch_size=2).collate(images)
+
+    for i, pixels in enumerate(images):
+        assert torch.equal(batch[i], preprocess.to_tensor(pixels))
@@ -0,0 +1,69 @@
+"""
+The prediction listings must not issue a query per prediction (N+1):
+the statement count for one prediction and for many must be the same.
+"""
+import uuid
+
+import pytest
+
+from app.database import SessionLocal
+from app.ml import probabilities
+from app.models import AIPrediction, AIPredictionResult, Patient
+
+MANY = 25
+
+
+@pytest.fixture(autouse=True)
+def no_predictions():
+    db = SessionLocal()
+    db.query(AIPredictionResult).delete()
+    db.query(AIPrediction).delete()
+    db.commit()
+    db.close()
+
+
+def _add_predictions(patient_user_id: str, count: int):
+    db = SessionLocal()
+    patient_id = db.query(Patient.id).filter(Patient.user_id == patient_user_id).scalar()
+    for i in range(count):
+        prediction = AIPrediction(
+            id=str(uuid.uuid4()), patient_id=patient_id, image_path=f"xray-{i}.png"
+        )
+        if i % 2:
+            # Rows stored before the vector column still load their results
+            prediction.results = [
+                AIPredictionResult(disease_name="Effusion", confidence_score="0.5")
+                for _ in range(3)
+            ]
+        else:
+            prediction.probabilities = probabilities.encode([0.1] * probabilities.WIDTH)
+        db.add(prediction)
+    db.commit()
+    db.close()
+
+
+@pytest.mark.parametrize("path, reader_role", [
+    ("/healthai/pending", "DOCTOR"),
+    ("/healthai/my-predictions", "PATIENT"),
+    ("/admin/healthai/predictions", "ADMIN"),
+])
+def test_listing_query_count_is_constant(client, login, count_queries, path, reader_role):
+    patient_user_id, patient_headers = login("PATIENT")
+    headers = patient_headers if reader_role == "PATIENT" else login(reader_role)[1]
+
+    def queries_for_listing(expected_items):
+        with count_queries() as statements:
+            response = client.get(path, headers=headers)
+        assert response.status_code == 200, response.text
+        body = response.json()
+        items = body if isinstance(body, list) else body["items"]
+        assert len(items) == expected_items
+        return len(statements)
+
+    _add_predictions(patient_user_id, 1)
+    one = queries_for_listing(1)
+
+    _add_predictions(patient_user_id, MANY - 1)
+    many = queries_for_listing(MANY)
+
+    assert many == one
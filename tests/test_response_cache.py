@@ -0,0 +1,59 @@
+from starlette.requests import Request
+
+from app.core.response_cache import ResponseCache
+
+
+def _request(query: str = "", if_none_match: str = None) -> Request:
+    headers = [(b"if-none-match", if_none_match.encode())] if if_none_match else []
+    return Request({"type": "http", "query_string": query.encode(), "headers": headers})
+
+
+def test_unused_query_parameters_share_one_entry():
+    cache = ResponseCache(ttl=60)
+    builds = []
+
+    for junk in range(20):
+        cache.respond(_request(f"junk={junk}"), "doctors", lambda: builds.append(1) or [])
+
+    assert len(builds) == 1
+    assert cache.stats()["entries"] == 1
+
+
+def test_least_recently_used_entry_is_evicted():
+    cache = ResponseCache(ttl=60, max_entries=2)
+    build = lambda: {"items": []}
+
+    cache.respond(_request(), "beds", build, params=(50, "a"))
+    cache.respond(_request(), "beds", build, params=(50, "b"))
+    cache.respond(_request(), "beds", build, params=(50, "a"))  # a is now the newest
+    cache.respond(_request(), "beds", build, params=(50, "c"))
+
+    assert cache.stats()["entries"] == 2
+    assert cache.stats()["evictions"] == 1
+    assert ("beds", (50, "a")) in cache._entries
+    assert ("beds", (50, "b")) not in cache._entries
+
+
+def test_expired_entry_is_dropped_on_lookup():
+    cache = ResponseCache(ttl=0)
+    cache.respond(_request(), "doctors", lambda: [])
+    assert cache.stats()["entries"] == 1
+
+    assert cache._lookup(("doctors", ())) is None
+    assert cache.stats()["entries"] == 0
+
+
+def test_clients_revalidate_and_see_invalidations_at_once():
+    cache = ResponseCache(ttl=60)
+    doctors = [{"name": "A"}]
+
+    first = cache.respond(_request(), "doctors", lambda: list(doctors))
+    assert first.headers["cache-control"] == "private, no-cache"
+    etag = first.headers["etag"]
+    assert cache.respond(_request(if_none_match=etag), "doctors", lambda: list(doctors)).status_code == 304
+
+    doctors.append({"name": "B"})
+    cache.invalidate("doctors")
+    fresh = cache.respond(_request(if_none_match=etag), "doctors", lambda: list(doctors))
+    assert fresh.status_code == 200
+    assert fresh.headers["etag"] != etag
@@ -0,0 +1,113 @@
+import random
+from datetime import date, datetime, time, timedelta
+
+from sqlalchemy import create_engine, event
+from sqlalchemy.orm import Session
+
+from app import slots
+from app.database import Base, SessionLocal
+from app.models import Appointment, Doctor
+
+DAY_START, DAY_END = time(9), time(17)
+
+
+def _doctor_with_appointments(count: int):
+    engine = create_engine("sqlite://")
+    Base.metadata.create_all(bind=engine)
+    calendar = slots.SlotCalendar(30, DAY_START, DAY_END, refresh_seconds=3600)
+
+    rng = random.Random(1)
+    grid = [
+        datetime.combine(date(2026, 3, 1) + timedelta(days=d), DAY_START) + timedelta(minutes=30 * s)
+        for d in range(count // 8)
+        for s in range(16)
+    ]
+    booked = sorted(rng.sample(grid, count))
+    with engine.begin() as conn:
+        conn.execute(Appointment.__table__.insert(), [
+            {
+                "id": f"a{i}", "patient_id": "p", "doctor_id": "d",
+                "appointment_date": start.date(), "appointment_time": start.time(),
+                "status": rng.choice(slots.ACTIVE_STATUSES)
+            }
+            for i, start in enumerate(booked)
+        ])
+    return engine, calendar, grid, set(booked)
+
+
+def test_free_slots_with_thousands_of_appointments_skip_the_database():
+    engine, calendar, grid, booked = _doctor_with_appointments(5000)
+    db = Session(bind=engine)
+    calendar.free_slots(db, "d", date(2026, 3, 1), date(2026, 3, 1))  # loads the calendar
+
+    statements = []
+    event.listen(engine, "before_cursor_execute", lambda *args: statements.append(args[2]))
+    first, last = date(2026, 4, 10), date(2026, 5, 10)
+    free = calendar.free_slots(db, "d", first, last)
+    db.close()
+
+    assert statements == []
+    expected = [
+        {"date": start.date(), "time": start.time()}
+        for start in grid
+        if first <= start.date() <= last and start not in booked
+    ]
+    assert free == expected
+
+
+def test_free_slot_search_costs_at_most_one_query_when_reloading():
+    # Timing lives in `python -m app.slots`; here the cost is bounded in
+    # statements: a stale calendar reloads with a single query
+    engine, _, grid, booked = _doctor_with_appointments(5000)
+    calendar = slots.SlotCalendar(30, DAY_START, DAY_END, refresh_seconds=0)
+    db = Session(bind=engine)
+    statements = []
+    event.listen(engine, "before_cursor_execute", lambda *args: statements.append(args[2]))
+
+    for offset in range(0, 600, 60):
+        first = date(2026, 3, 1) + timedelta(days=offset)
+        last = first + timedelta(days=6)
+        before = len(statements)
+        free = calendar.free_slots(db, "d", first, last)
+
+        assert len(statements) - before <= 1
+        assert free == [
+            {"date": start.date(), "time": start.time()}
+            for start in grid
+            if first <= start.date() <= last and start not in booked
+        ]
+    db.close()
+
+
+def test_off_grid_appointment_blocks_the_slots_it_overlaps():
+    engine = create_engine("sqlite://")
+    Base.metadata.create_all(bind=engine)
+    calendar = slots.SlotCalendar(30, DAY_START, DAY_END, refresh_seconds=3600)
+    day = date(2026, 3, 2)
+    with engine.begin() as conn:
+        conn.execute(Appointment.__table__.insert(), [{
+            "id": "legacy", "patient_id": "p", "doctor_id": "d",
+            "appointment_date": day, "appointment_time": time(9, 15), "status": "APPROVED"
+        }])
+    db = Session(bind=engine)
+
+    free = [slot["time"] for slot in calendar.free_slots(db, "d", day, day)]
+    assert free[0] == time(10)
+    assert calendar.is_taken(db, "d", datetime.combine(day, time(9)))
+    assert calendar.is_taken(db, "d", datetime.combine(day, time(9, 30)))
+    assert not calendar.is_taken(db, "d", datetime.combine(day, time(10)))
+    db.close()
+
+
+def test_booking_outside_working_hours_is_rejected(client, login):
+    doctor_user_id, _ = login("DOCTOR")
+    _, patient = login("PATIENT")
+    db = SessionLocal()
+    doctor_id, = db.query(Doctor.id).filter(Doctor.user_id == doctor_user_id).one()
+    db.close()
+
+    response = client.post("/medislot/appointments", params={
+        "doctor_id": doctor_id, "appointment_date": "2030-01-07", "appointment_time": "23:00"
+    }, headers=patient)
+    assert response.status_code == 400
+    assert "working hours" in response.json()["detail"]
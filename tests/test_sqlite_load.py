@@ -0,0 +1,103 @@
+"""
+Mixed concurrent load on file-backed SQLite in production mode (WAL and
+the single-writer queue). Before, concurrent writers failed with
+"database is locked"; every request here must succeed.
+"""
+import asyncio
+import uuid
+from datetime import date, datetime, timedelta
+
+import httpx
+
+from app.config import SLOT_MINUTES, WORKDAY_START
+from app.database import SQLITE_TUNED, SessionLocal
+from app.main import app
+from app.models import BedAllocation, Doctor
+from app.write_queue import write_queue
+
+PATIENTS = 8
+DOCTORS = 6
+
+
+def test_mixed_concurrent_writes_do_not_lock_the_database(client, login):
+    assert SQLITE_TUNED and write_queue.enabled
+
+    doctor_user_ids = [login("DOCTOR")[0] for _ in range(DOCTORS)]
+    _, admin = login("ADMIN")
+    patients = [login("PATIENT") for _ in range(PATIENTS)]
+
+    db = SessionLocal()
+    doctor_ids = [
+        d for d, in db.query(Doctor.id).filter(Doctor.user_id.in_(doctor_user_ids))
+    ]
+    db.close()
+
+    # One free bed per patient, each already requested
+    for i, (_, headers) in enumerate(patients):
+        bed = client.post("/medislot/beds", params={"ward": "load", "bed_number": str(i)}, headers=admin)
+        response = client.post(f"/medislot/beds/{bed.json()['id']}/request", headers=headers)
+        assert response.status_code == 200, response.text
+    db = SessionLocal()
+    allocation_ids = [
+        a for a, in db.query(BedAllocation.id).filter(
+            BedAllocation.patient_id.in_([user_id for user_id, _ in patients]),
+            BedAllocation.status == "REQUESTED"
+        )
+    ]
+    db.close()
+
+    # Resumable uploads waiting to be completed
+    sessions = []
+    for _, headers in patients:
+        created = client.post("/upload-sessions", params={
+            "kind": "medvault", "filename": "report.pdf", "size": 5, "record_type": "REPORT"
+        }, headers=headers).json()
+        client.put(f"/upload-sessions/{created['upload_id']}", params={"offset": 0},
+                   content=b"%PDF-", headers=headers)
+        sessions.append((created["upload_id"], headers))
+
+    first_slot = datetime.combine(date(2030, 1, 7), datetime.strptime(WORKDAY_START, "%H:%M").time())
+    groups_before, writes_before = write_queue.groups, write_queue.writes
+
+    async def burst():
+        transport = httpx.ASGITransport(app=app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://test") as http:
+            requests = []
+            for p, (_, headers) in enumerate(patients):
+                # One appointment per doctor, each in its own slot
+                for doctor_id in doctor_ids:
+                    slot = first_slot + timedelta(minutes=SLOT_MINUTES * p)
+                    requests.append(http.post("/medislot/appointments", params={
+                        "doctor_id": doctor_id,
+                        "appointment_date": slot.date().isoformat(),
+                        "appointment_time": slot.time().isoformat()
+                    }, headers=headers))
+                for k in range(4):
+                    requests.append(http.post(
+                        "/medvault/upload",
+                        params={"record_type": "REPORT"},
+                        files={"file": (f"r{k}.txt", f"{uuid.uuid4()}".encode(), "text/plain")},
+                        headers=headers
+                    ))
+                requests.append(http.get("/medislot/my-appointments", headers=headers))
+                requests.append(http.get("/medvault/records", headers=headers))
+                requests.append(http.get("/auth/me", headers=headers))
+            for upload_id, headers in sessions:
+                requests.append(http.post(f"/upload-sessions/{upload_id}/complete", headers=headers))
+            for allocation_id in allocation_ids:
+                requests.append(http.post(
+                    f"/medislot/bed-requests/{allocation_id}/decision",
+                    params={"action": "APPROVE"}, headers=admin
+                ))
+            for i in range(PATIENTS):
+                requests.append(http.post(
+                    "/medislot/beds", params={"ward": "load-2", "bed_number": str(i)}, headers=admin
+                ))
+            return await asyncio.gather(*requests)
+
+    responses = asyncio.run(burst())
+
+    failures = [(r.request.url.path, r.status_code, r.text) for r in responses if r.status_code >= 300]
+    assert not failures, failures
+    # Queued writes went out in shared commits
+    assert write_queue.groups - groups_before < write_queue.writes - writes_before
@@ -0,0 +1,65 @@
+import threading
+import uuid
+
+from app import stats
+from app.database import SessionLocal
+from app.models import StatCounter, User
+
+
+def _register_user():
+    db = SessionLocal()
+    try:
+        user_id = str(uuid.uuid4())
+        db.add(User(id=user_id, name="U", email=f"{user_id}@example.com", password_hash="x", role="ADMIN"))
+        stats.bump(db, total_users=1)
+        db.commit()
+    finally:
+        db.close()
+
+
+def _counters_match_source():
+    db = SessionLocal()
+    try:
+        return stats.read_counters(db) == stats.compute_from_source(db)
+    finally:
+        db.close()
+
+
+def test_reconcile_fixes_drift():
+    db = SessionLocal()
+    db.query(StatCounter).filter(StatCounter.name == "total_users").update(
+        {"value": StatCounter.value + 5}, synchronize_session=False
+    )
+    db.commit()
+
+    report = stats.reconcile(db)
+    db.close()
+
+    assert report["fixed"]
+    assert report["drift"]["total_users"]["counter"] - report["drift"]["total_users"]["actual"] == 5
+    assert _counters_match_source()
+
+
+def test_write_during_recount_does_not_create_drift(monkeypatch):
+    db = SessionLocal()
+    stats.reconcile(db)
+    assert _counters_match_source()
+
+    recount = stats.compute_from_source
+    writer = threading.Thread(target=_register_user)
+
+    def recount_with_concurrent_write(session):
+        counts = recount(session)
+        # A registration commits between the recount and the counter read,
+        # unless reconcile keeps writers out until it is done
+        writer.start()
+        writer.join(timeout=0.5)
+        return counts
+
+    monkeypatch.setattr(stats, "compute_from_source", recount_with_concurrent_write)
+    stats.reconcile(db)
+    db.close()
+    writer.join()
+
+    monkeypatch.undo()
+    assert _counters_match_source()
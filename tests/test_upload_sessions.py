@@ -0,0 +1,55 @@
+import os
+from datetime import datetime, timedelta
+
+from app.database import SessionLocal
+from app.models import UploadSession
+from app.write_queue import write_queue
+
+
+def test_session_writes_go_through_the_writer(client, login, monkeypatch):
+    _, headers = login("PATIENT")
+    queued = []
+    run = write_queue.run
+
+    async def recording_run(fn, *args):
+        queued.append(fn.__name__)
+        return await run(fn, *args)
+
+    monkeypatch.setattr(write_queue, "run", recording_run)
+
+    created = client.post("/upload-sessions", params={
+        "kind": "medvault", "filename": "report.pdf", "size": 5, "record_type": "REPORT"
+    }, headers=headers)
+    assert created.status_code == 201, created.text
+    upload_id = created.json()["upload_id"]
+    chunk = client.put(f"/upload-sessions/{upload_id}", params={"offset": 0},
+                       content=b"%PDF-", headers=headers)
+    assert chunk.json()["received"] == 5
+    assert client.get(f"/upload-sessions/{upload_id}", headers=headers).json()["received"] == 5
+    done = client.post(f"/upload-sessions/{upload_id}/complete", headers=headers)
+    assert done.status_code == 200, done.text
+
+    assert queued == ["_create_upload_session", "_record_upload_progress", "_finish_upload_session"]
+
+
+def test_expired_sessions_are_purged_on_create(client, login):
+    user_id, headers = login("PATIENT")
+    db = SessionLocal()
+    db.add(UploadSession(
+        id="expired-session", user_id=user_id, kind="medvault", filename="old.pdf",
+        size=5, received=0, created_at=datetime.utcnow() - timedelta(days=30)
+    ))
+    db.commit()
+    db.close()
+    part = os.path.join(os.environ["UPLOAD_SESSION_DIR"], "expired-session.part")
+    os.makedirs(os.path.dirname(part), exist_ok=True)
+    open(part, "wb").close()
+
+    client.post("/upload-sessions", params={
+        "kind": "medvault", "filename": "new.pdf", "size": 5
+    }, headers=headers)
+
+    db = SessionLocal()
+    assert db.get(UploadSession, "expired-session") is None
+    db.close()
+    assert not os.path.exists(part)